@@ -1,13 +1,26 @@
 """
 This module communicate with the Open Targets REST API with a simple client, and requires not knowledge of the API.
 """
-from opentargets.conn import Connection, IterableResult
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+
+from future.utils import string_types
+from requests.exceptions import HTTPError
+
+from opentargets.cache import LRUCache, SQLiteCache
+from opentargets.conn import Connection, IterableResult, HTTPMethods
+from opentargets.replica import AssociationReplica, ReplicaResult
 
 import logging
 logging.getLogger('opentargets').addHandler(logging.NullHandler())
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+DISEASE_ID = re.compile(r'^[A-Za-z]+_\d+$')
+
 
 class OpenTargetsClient(object):
     """
@@ -30,15 +43,48 @@ class OpenTargetsClient(object):
     _relation_disease_endpoint = '/platform/private/relation/disease'
 
     def __init__(self,
+                 prefetch = 0,
+                 stream = False,
+                 resolve_cache = None,
+                 replica = None,
                  **kwargs
                  ):
         """
         Init the client and start a connection
 
+        Args:
+            prefetch (int): number of result pages to fetch in a background thread while the current one is
+                consumed. Defaults to 0 (disabled)
+            stream (bool): if True result pages are decoded while they are read, so that results are returned
+                as soon as they are decoded and pages are never held whole in memory. Requires ijson and
+                cannot be used with `prefetch`. Streamed pages are not cached
+            resolve_cache: cache for the IDs resolved from target and disease names, either a ``cachecontrol``
+                cache instance or the path of a ``opentargets.cache.SQLiteCache`` file, where resolved IDs are
+                kept for the current data release. Defaults to an in memory ``opentargets.cache.LRUCache``
+            replica: an ``opentargets.replica.AssociationReplica`` or the path of its database. Association queries
+                using only the filters it supports are answered from it, as long as it holds the data release
+                served by the REST API
         Keyword Args:
             **kwargs: all params forwarded to ``opentargets.conn.Connection`` object
+        Raises:
+            AttributeError: if both `prefetch` and `stream` are set
         """
+        if prefetch and stream:
+            raise AttributeError('pages cannot be prefetched when they are streamed')
+        self.prefetch = prefetch
+        self.stream = stream
         self.conn = Connection(**kwargs)
+        if resolve_cache is None:
+            resolve_cache = LRUCache(max_entries=100000, max_bytes=None)
+        elif isinstance(resolve_cache, string_types):
+            resolve_cache = SQLiteCache(resolve_cache)
+        self.resolve_cache = resolve_cache
+        self._resolve_lock = threading.Lock()
+        if isinstance(replica, string_types):
+            replica = AssociationReplica(replica, codec=self.conn.codec)
+        self.replica = replica
+        self._replica_current = None
+        self._replica_checked = None
 
     def __enter__(self):
         pass
@@ -48,6 +94,134 @@ class OpenTargetsClient(object):
 
     def close(self):
         self.conn.close()
+        if hasattr(self.resolve_cache, 'close'):
+            self.resolve_cache.close()
+        if self.replica is not None:
+            self.replica.close()
+
+    def _use_replica(self, params):
+        """
+        Check if an association query can be answered by the replica. The data release of the replica is
+        checked again each time the connection fetches the version of the REST API, i.e. every `version_ttl`
+        seconds, to notice a new data release or a replica synchronised meanwhile
+
+        Args:
+            params (dict): parameters of the query
+
+        Returns:
+            bool: True if the replica is current and supports the parameters
+        """
+        if self.replica is None or not self.replica.supports(params):
+            return False
+        remote_version = self.conn._get_remote_version()
+        if self._replica_checked != self.conn._version_checked:
+            self._replica_checked = self.conn._version_checked
+            current = self.replica.is_current(remote_version)
+            if not current and self._replica_current is not False:
+                logger.warning('replica {} holds data release {} but the REST API serves {}, querying the REST API '
+                               'until it is synchronised'.format(self.replica.path, self.replica.version,
+                                                                 remote_version))
+            self._replica_current = current
+        return self._replica_current
+
+    def resolve_targets(self, targets, workers=8):
+        """
+        Map many gene symbols or names to Ensembl Gene identifiers, firing a search for each one concurrently.
+        Ensembl Gene identifiers are returned as they are, and answers are reused from ``resolve_cache``
+
+        Args:
+            targets (iterable): Ensembl Gene identifiers or strings to search for a gene mapping
+            workers (int): number of searches running at the same time
+
+        Returns:
+            OrderedDict: Ensembl Gene identifier for each target, None if it cannot be found
+        """
+        return self._resolve_many(targets, 'target', workers)
+
+    def resolve_diseases(self, diseases, workers=8):
+        """
+        Map many disease names to disease identifiers, firing a search for each one concurrently.
+        Disease identifiers (e.g. EFO_0000270) are returned as they are, and answers are reused from
+        ``resolve_cache``
+
+        Args:
+            diseases (iterable): disease identifiers or strings to search for a disease mapping
+            workers (int): number of searches running at the same time
+
+        Returns:
+            OrderedDict: disease identifier for each disease, None if it cannot be found
+        """
+        return self._resolve_many(diseases, 'disease', workers)
+
+    def _resolve_many(self, queries, filter, workers):
+        resolved = OrderedDict((query, query if self._is_id(query, filter) else None) for query in queries)
+        to_search = [query for query, resolved_id in resolved.items() if resolved_id is None]
+        if to_search:
+            self._set_resolve_namespace()
+        if len(to_search) > 1:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            try:
+                resolved.update(zip(to_search, executor.map(lambda q: self._resolve(q, filter), to_search)))
+            finally:
+                executor.shutdown()
+        else:
+            resolved.update((query, self._resolve(query, filter)) for query in to_search)
+        return resolved
+
+    @staticmethod
+    def _is_id(query, filter):
+        if filter == 'target':
+            return query.startswith('ENSG')
+        return DISEASE_ID.match(query) is not None
+
+    def _resolve(self, query, filter):
+        """
+        Get the identifier of the best search hit for a string, from the cache if it was resolved before
+
+        Args:
+            query (str): string to search for
+            filter (str): type of object to search, either `target` or `disease`
+
+        Returns:
+            str: identifier, None if nothing is found
+        """
+        self._set_resolve_namespace()
+        key = '{}:{}'.format(filter, query)
+        cached = self.resolve_cache.get(key)
+        if cached is not None:
+            return cached.decode('utf-8') or None
+        search_result = next(self.search(query, size=1, filter=filter), None)
+        resolved_id = search_result['id'] if search_result else None
+        self.resolve_cache.set(key, (resolved_id or '').encode('utf-8'))
+        if resolved_id:
+            logger.debug('{} resolved to id {}'.format(query, resolved_id))
+        return resolved_id
+
+    def _set_resolve_namespace(self):
+        """
+        Namespace the persisted resolved IDs by the data release served by the REST API, which they are valid for.
+        Called from many threads by ``_resolve_many``
+        """
+        if not hasattr(self.resolve_cache, 'set_namespace'):
+            return
+        remote_version = str(self.conn._get_remote_version())
+        with self._resolve_lock:
+            if self.resolve_cache.namespace != remote_version:
+                self.resolve_cache.set_namespace(remote_version)
+
+    def _resolve_target_id(self, target):
+        if not target.startswith('ENSG'):
+            target_id = self._resolve(target, 'target')
+            if not target_id:
+                raise AttributeError('cannot find an ensembl gene id for target {}'.format(target))
+            return target_id
+        return target
+
+    def _resolve_disease_id(self, disease):
+        disease_id = self._resolve(disease, 'disease')
+        if not disease_id:
+            raise AttributeError('cannot find an disease id for disease {}'.format(disease))
+        return disease_id
 
     def search(self, query,**kwargs):
         """
@@ -63,7 +237,7 @@ class OpenTargetsClient(object):
             IterableResult: Result of the query
         """
         kwargs['q']=query
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._search_endpoint,**kwargs)
         return result
 
@@ -80,7 +254,7 @@ class OpenTargetsClient(object):
              IterableResult: Result of the query
         """
         kwargs['id']= association_id
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._get_associations_endpoint, **kwargs)
         return result
 
@@ -92,9 +266,13 @@ class OpenTargetsClient(object):
             **kwargs: are passed as parameters to the /public/association/filterby method of the REST API
 
         Returns:
-            IterableResult: Result of the query
+            IterableResult: Result of the query, read from the replica if the client has a current one
+                supporting the parameters
         """
-        result = IterableResult(self.conn)
+        if self._use_replica(kwargs):
+            result = ReplicaResult(self.replica, self.conn, prefetch=self.prefetch)
+        else:
+            result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._filter_associations_endpoint, **kwargs)
         return result
 
@@ -112,14 +290,7 @@ class OpenTargetsClient(object):
         """
         if not isinstance(target, str):
             raise AttributeError('target must be of type str')
-        if not target.startswith('ENSG'):
-            search_result = next(self.search(target, size=1, filter='target'))
-            if not search_result:
-                raise AttributeError('cannot find an ensembl gene id for target {}'.format(target))
-            target_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(target, target_id))
-        else:
-            target_id = target
+        target_id = self._resolve_target_id(target)
         return self.filter_associations(target=target_id,**kwargs)
 
     def get_associations_for_disease(self, disease, **kwargs):
@@ -138,11 +309,7 @@ class OpenTargetsClient(object):
             raise AttributeError('disease must be of type str')
         results = self.filter_associations(disease=disease)
         if not results:
-            search_result = next(self.search(disease, size=1, filter='disease'))
-            if not search_result:
-                raise AttributeError('cannot find an disease id for disease {}'.format(disease))
-            disease_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(disease, disease_id))
+            disease_id = self._resolve_disease_id(disease)
             results = self.filter_associations(disease=disease_id, **kwargs)
         return results
 
@@ -159,7 +326,7 @@ class OpenTargetsClient(object):
              IterableResult: Result of the query
         """
         kwargs['id']= evidence_id
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._get_evidence_endpoint, **kwargs)
         return result
 
@@ -175,7 +342,7 @@ class OpenTargetsClient(object):
         Returns:
              IterableResult: Result of the query
         """
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._get_target + '/' + target_id, **kwargs)
         return result
 
@@ -191,10 +358,93 @@ class OpenTargetsClient(object):
         Returns:
              IterableResult: Result of the query
         """
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._get_disease + '/' + disease_id, **kwargs)
         return result
 
+    def get_targets(self, target_ids, ordered=True, workers=8, batch_size=100, **kwargs):
+        """
+        Retrieve many target objects from the REST API provided their IDs. Each ID is fetched once, in batched
+        POST requests if the REST API supports them, otherwise with concurrent requests for each ID
+
+        Args:
+            target_ids (iterable): Ensembl IDs
+            ordered (bool): if True targets are returned in the order of `target_ids`, otherwise as soon as
+                they are fetched. Defaults to True
+            workers (int): number of requests running at the same time
+            batch_size (int): number of IDs fetched by each batched request
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /private/target method of the REST API
+
+        Returns:
+            generator: (target ID, target object) tuples, the target object is None if the ID is not found
+        """
+        return self._get_many(self._get_target, target_ids, ordered, workers, batch_size, **kwargs)
+
+    def get_diseases(self, disease_ids, ordered=True, workers=8, batch_size=100, **kwargs):
+        """
+        Retrieve many disease objects from the REST API provided their IDs. Each ID is fetched once, in batched
+        POST requests if the REST API supports them, otherwise with concurrent requests for each ID
+
+        Args:
+            disease_ids (iterable): OT disease IDs (EFO, Orphanet, ...)
+            ordered (bool): if True diseases are returned in the order of `disease_ids`, otherwise as soon as
+                they are fetched. Defaults to True
+            workers (int): number of requests running at the same time
+            batch_size (int): number of IDs fetched by each batched request
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /private/disease method of the REST API
+
+        Returns:
+            generator: (disease ID, disease object) tuples, the disease object is None if the ID is not found
+        """
+        return self._get_many(self._get_disease, disease_ids, ordered, workers, batch_size, **kwargs)
+
+    def _get_many(self, endpoint, ids, ordered, workers, batch_size, **kwargs):
+        """
+        Fetch objects by ID with a pool of threads, keeping at most twice `workers` requests queued so that
+        results are streamed back while the next ones are fetched
+        """
+        ids = list(OrderedDict((i, None) for i in ids))
+        if batch_size > 1 and self.conn.supports_method(endpoint, HTTPMethods.POST):
+            batches = (ids[i:i + batch_size] for i in range(0, len(ids), batch_size))
+            fetch = self._fetch_batch
+        else:
+            batches = ([i] for i in ids)
+            fetch = self._fetch_single
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = deque(executor.submit(fetch, endpoint, batch, kwargs) for batch in islice(batches, 2 * workers))
+        try:
+            while pending:
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    future = next(iter(wait(pending, return_when=FIRST_COMPLETED).done))
+                    pending.remove(future)
+                for batch in islice(batches, 1):
+                    pending.append(executor.submit(fetch, endpoint, batch, kwargs))
+                for item in future.result():
+                    yield item
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_batch(self, endpoint, ids, params):
+        data = dict(params)
+        data['id'] = ids
+        found = dict((obj['id'], obj) for obj in self.conn.post(endpoint, data=data).data)
+        return [(i, found.get(i)) for i in ids]
+
+    def _fetch_single(self, endpoint, ids, params):
+        try:
+            data = self.conn.get(endpoint + '/' + ids[0], params=params).data
+        except HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return [(ids[0], None)]
+            raise
+        return [(ids[0], data[0] if data else None)]
+
     def filter_evidence(self,**kwargs):
         """
         Retrieve a set of evidence by applying a set of filters
@@ -205,7 +455,7 @@ class OpenTargetsClient(object):
         Returns:
             IterableResult: Result of the query
         """
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._filter_evidence_endpoint, **kwargs)
         return result
 
@@ -223,14 +473,7 @@ class OpenTargetsClient(object):
         """
         if not isinstance(target, str):
             raise AttributeError('target must be of type str')
-        if not target.startswith('ENSG'):
-            search_result = next(self.search(target, size=1, filter='target'))
-            if not search_result:
-                raise AttributeError('cannot find an ensembl gene id for target {}'.format(target))
-            target_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(target, target_id))
-        else:
-            target_id = target
+        target_id = self._resolve_target_id(target)
         return self.filter_evidence(target=target_id,**kwargs)
 
     def get_evidence_for_disease(self, disease, **kwargs):
@@ -249,11 +492,7 @@ class OpenTargetsClient(object):
             raise AttributeError('disease must be of type str')
         results = self.filter_evidence(disease=disease, **kwargs)
         if not results:
-            search_result = next(self.search(disease, size=1, filter='disease'))
-            if not search_result:
-                raise AttributeError('cannot find an disease id for disease {}'.format(disease))
-            disease_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(disease, disease_id))
+            disease_id = self._resolve_disease_id(disease)
             results = self.filter_evidence(disease=disease_id)
         return results
 
@@ -271,16 +510,9 @@ class OpenTargetsClient(object):
         """
         if not isinstance(target, str):
             raise AttributeError('target must be of type str')
-        if not target.startswith('ENSG'):
-            search_result = next(self.search(target, size=1, filter='target'))
-            if not search_result:
-                raise AttributeError('cannot find an ensembl gene id for target {}'.format(target))
-            target_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(target, target_id))
-        else:
-            target_id = target
+        target_id = self._resolve_target_id(target)
 
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._relation_target_endpoint+'/'+target_id, **kwargs)
         return result
 
@@ -298,15 +530,11 @@ class OpenTargetsClient(object):
         """
         if not isinstance(disease, str):
             raise AttributeError('disease must be of type str')
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._relation_disease_endpoint+'/'+disease, **kwargs)
         if not result:
-            search_result = next(self.search(disease, size=1, filter='disease'))
-            if not search_result:
-                raise AttributeError('cannot find an disease id for disease {}'.format(disease))
-            disease_id = search_result['id']
-            logger.debug('{} resolved to id {}'.format(disease, disease_id))
-            result = IterableResult(self.conn)
+            disease_id = self._resolve_disease_id(disease)
+            result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
             result(self._relation_disease_endpoint + '/' + disease_id, **kwargs)
         return result
 
@@ -317,7 +545,7 @@ class OpenTargetsClient(object):
         Returns:
             IterableResult: Result of the query
         """
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._stats_endpoint)
         return result
 
@@ -328,6 +556,6 @@ class OpenTargetsClient(object):
         Returns:
             IterableResult: Result of the query
         """
-        result = IterableResult(self.conn)
+        result = IterableResult(self.conn, prefetch=self.prefetch, stream=self.stream)
         result(self._metrics_endpoint)
         return result
@@ -0,0 +1,818 @@
+"""
+This module provides an asyncio based version of the client, allowing to run many concurrent queries to the
+Open Targets REST API from a single event loop.
+Requires Python 3.5 or higher and the ``aiohttp`` library.
+"""
+import asyncio
+import collections
+import json
+import logging
+import ssl
+import time
+
+from opentargets import OpenTargetsClient
+from opentargets.conn import BaseConnection, HTTPMethods, Response, DEFAULT_SPEC_CACHE_DIR
+from opentargets.ratelimit import RateLimiter
+
+try:
+    import aiohttp
+    aiohttp_available = True
+except ImportError:
+    aiohttp_available = False
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_FORCELIST = (500, 502, 504)
+# statuses also retried when their response has a `Retry-After` header, 429 is handled by the rate limiter
+RETRY_AFTER_STATUS_CODES = (413, 503)
+
+
+class _BufferedResponse(object):
+    """
+    Minimal stand in for a ``requests`` response, built from an already read aiohttp response so that it can be
+    handled by ``opentargets.conn.Response``
+    """
+
+    def __init__(self, body, headers, encoding='utf-8'):
+        self.content = body
+        self.headers = headers
+        self.text = body.decode(encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncConnection(BaseConnection):
+    """
+    Handler for asynchronous connection and calls to the Open Targets Validation Platform REST API
+    """
+
+    def __init__(self,
+                 host='https://api.opentargets.io',
+                 port=443,
+                 api_version='v3',
+                 verify=True,
+                 proxies={},
+                 connection_limit=100,
+                 max_retries=10,
+                 backoff_factor=.5,
+                 spec_cache_dir=DEFAULT_SPEC_CACHE_DIR,
+                 rate_limit=None,
+                 rate_limit_fail=False,
+                 max_throttle_retries=10,
+                 max_throttle_wait=600,
+                 json_codec=None,
+                 hooks=None,
+                 ):
+        """
+        Args:
+            host (str): host serving the API
+            port (int): port to use for connection to the API
+            api_version (str): api version to point to, default to 'latest'
+            verify (bool): sets SSL verification, accepts True, False or a path to a certificate
+            proxies (dict): proxy to use for each scheme, as in ``requests``. Only HTTP proxies are supported
+            connection_limit (int): maximum number of simultaneous connections to the REST API
+            max_retries (int): number of retries for server side errors and connection errors
+            backoff_factor (float): backoff factor applied between retries, as in ``urllib3.Retry``
+            spec_cache_dir (str): directory where the parsed REST API documentation is stored to be reused by
+                other connections to the same host and API version. None to disable
+            rate_limit: maximum number of requests per second, or a ``opentargets.ratelimit.RateLimiter`` to share
+                among connections. The rate is adapted to the usage limits and 429 responses of the REST API.
+                Defaults to no limit until the REST API signals one
+            rate_limit_fail (bool): If True raise exception when usage limit is exceeded. If False wait and
+                retry the request. Defaults to False.
+            max_throttle_retries (int): maximum number of times a request answered with a 429 status is sent
+                again, before raising the error of the last response. None for no limit
+            max_throttle_wait (float): maximum seconds waited for the rate limiter by a request answered with a
+                429 status, before raising the error of the last response. None for no limit
+            json_codec: JSON codec used to decode responses, either a ``opentargets.codec.JSONCodec`` or the name
+                of one. Defaults to the fastest installed
+            hooks (dict): functions called before and after each request, as a list for each of the
+                `pre_request` and `post_request` events, see ``opentargets.conn.BaseConnection.add_hook``
+        Raises:
+            ImportError: if aiohttp is not available
+        """
+        if not aiohttp_available:
+            raise ImportError('aiohttp library is not installed but is required to use the asyncio client')
+        super(AsyncConnection, self).__init__(host=host,
+                                              port=port,
+                                              api_version=api_version,
+                                              spec_cache_dir=spec_cache_dir,
+                                              json_codec=json_codec,
+                                              hooks=hooks)
+        self.verify = verify
+        self.proxies = proxies
+        self.connection_limit = connection_limit
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        if isinstance(rate_limit, RateLimiter):
+            self.rate_limiter = rate_limit
+        else:
+            self.rate_limiter = RateLimiter(rate=rate_limit)
+        self.rate_limit_fail = rate_limit_fail
+        self.max_throttle_retries = max_throttle_retries
+        self.max_throttle_wait = max_throttle_wait
+        self.session = None
+        self._specs_lock = None
+
+    def _get_ssl(self):
+        if self.verify is False:
+            return False
+        elif isinstance(self.verify, str):
+            return ssl.create_default_context(cafile=self.verify)
+        return None
+
+    def _get_proxy(self):
+        if self.proxies:
+            return self.proxies.get(self.host.split(':')[0])
+        return None
+
+    async def connect(self):
+        """
+        Open the HTTP session. Called automatically on the first request
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit,
+                                             ssl=self._get_ssl())
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def load_api_specs(self):
+        """
+        Load the REST API documentation needed to validate parameters, if not loaded yet
+        """
+        if self._specs_lock is None:
+            self._specs_lock = asyncio.Lock()
+        async with self._specs_lock:
+            if self._endpoint_validation_data is None:
+                await self._get_remote_api_specs()
+
+    async def get(self, endpoint, params=None):
+        """
+        makes a GET request
+        Args:
+            endpoint (str): REST API endpoint to call
+            params (dict): request payload
+
+        Returns:
+            Response: request response
+        """
+        if self._auto_detect_post(params):
+            self._logger.debug('switching to POST due to big size of params')
+            return await self.post(endpoint, data=params)
+        return Response(await self._make_request(endpoint,
+                                                 params=params,
+                                                 method='GET'), codec=self.codec)
+
+    async def post(self, endpoint, data=None):
+        """
+        makes a POST request
+        Args:
+            endpoint (str): REST API endpoint to call
+            data (dict): request payload
+
+        Returns:
+            Response: request response
+        """
+        return Response(await self._make_request(endpoint,
+                                                 data=data,
+                                                 method='POST'), codec=self.codec)
+
+    @staticmethod
+    def _encode_params(params):
+        """
+        Encode parameters the same way ``requests`` does: lists are sent as repeated keys and every value is
+        converted to string
+
+        Args:
+            params (list): sorted list of (key, value) tuples
+
+        Returns:
+            list: list of (key, str) tuples
+        """
+        encoded = []
+        if params:
+            for k, v in params:
+                if isinstance(v, (list, tuple)):
+                    encoded.extend((k, str(i)) for i in v)
+                elif v is not None:
+                    encoded.append((k, str(v)))
+        return encoded
+
+    async def _make_request(self,
+                            endpoint,
+                            params=None,
+                            data=None,
+                            method=HTTPMethods.GET,
+                            headers=None,
+                            url=None,
+                            **kwargs):
+        """
+        Makes a request to the REST API, retrying on server side and connection errors
+        Args:
+            endpoint (str): endpoint of the REST API
+            params (dict): payload for GET request
+            data (dict): payload for POST request
+            method (HTTPMethods): request method, either HTTPMethods.GET or HTTPMethods.POST. Defaults to HTTPMethods.GET
+            headers (dict): HTTP headers for the request
+            url (str): full url to call, overrides the one built from the endpoint
+        Keyword Args:
+            **kwargs: forwarded to aiohttp
+
+        Returns:
+            _BufferedResponse: a fully read response
+        """
+        if self.session is None:
+            await self.connect()
+        url = url or self._build_url(endpoint)
+        request = dict(endpoint=endpoint or url,
+                       method=method,
+                       url=url,
+                       params=self._encode_params(self._sort_params(params)),
+                       data=data,
+                       headers=self._get_headers(headers))
+        self._dispatch_hooks('pre_request', request)
+        request.update(response=None, status=None, size=None, elapsed=0., retries=0, from_cache=None,
+                       throttled=0, throttle_wait=0., error=None)
+        try:
+            request['response'] = await self._send(request, **kwargs)
+        except Exception as e:
+            request['error'] = e
+            raise
+        finally:
+            self._request_finished(request)
+        return request['response']
+
+    async def _send(self, request, **kwargs):
+        """
+        Send a request, retrying on server side and connection errors, and update its description with the
+        response
+        """
+        while True:
+            retry_after = None
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                request['throttle_wait'] += wait
+                await asyncio.sleep(wait)
+            start = time.time()
+            try:
+                async with self.session.request(request['method'],
+                                                request['url'],
+                                                params=request['params'],
+                                                json=request['data'],
+                                                headers=request['headers'],
+                                                proxy=self._get_proxy(),
+                                                **kwargs) as response:
+                    body = await response.read()
+                    request['elapsed'] += time.time() - start
+                    request.update(status=response.status, size=len(body))
+                    self.rate_limiter.update(response.status, response.headers)
+                    if response.status == 429 and not (self.rate_limit_fail or self._throttle_exhausted(request)):
+                        request['throttled'] += 1
+                        continue
+                    if response.status in RETRY_AFTER_STATUS_CODES:
+                        retry_after = RateLimiter._parse_retry_after(response.headers.get('Retry-After'), time.time())
+                    if ((response.status in RETRY_STATUS_FORCELIST or retry_after is not None) and
+                            request['retries'] < self.max_retries):
+                        raise aiohttp.ClientResponseError(response.request_info,
+                                                          response.history,
+                                                          status=response.status,
+                                                          message=response.reason)
+                    response.raise_for_status()
+                    return _BufferedResponse(body, response.headers, response.get_encoding())
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                if (isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUS_FORCELIST and
+                        retry_after is None):
+                    raise
+                if request['retries'] >= self.max_retries:
+                    raise
+                request['retries'] += 1
+                attempt = request['retries']
+                delay = self.backoff_factor * (2 ** (attempt - 1)) if attempt > 1 else 0
+                if retry_after is not None:
+                    delay = retry_after
+                self._logger.debug('retrying {} in {}s after error: {}'.format(request['url'], delay, e))
+                await asyncio.sleep(delay)
+
+    async def _get_remote_api_specs(self):
+        """
+        Load the REST API documentation from the generated bindings or the local cache, or fetch and parse it if
+        they are not available for the remote version
+        """
+        remote_version = Response(await self._make_request('/platform/public/utils/version'),
+                                  codec=self.codec).data
+        self._check_remote_version(remote_version)
+        if not (self._load_bundled_specs(remote_version) or self._read_spec_cache(remote_version)):
+            r = await self._make_request(None, url=self._build_swagger_url())
+            self._parse_remote_api_specs(r.text)
+            self._write_spec_cache(remote_version)
+
+    def _load_api_specs(self):
+        raise RuntimeError('the REST API documentation is not loaded yet, '
+                           'call AsyncConnection.load_api_specs() first')
+
+    async def close(self):
+        """
+        Close connection to the REST API
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def ping(self):
+        """
+        Pings the API as a live check
+        Returns:
+            bool: True if pinging the raw response as a ``str`` if the API has a non standard name
+        """
+        response = await self.get('/platform/public/utils/ping')
+        if response.data == 'pong':
+            return True
+        elif response.data:
+            return response.data
+        return False
+
+
+class AsyncIterableResult(object):
+    '''
+    Asynchronous version of ``opentargets.conn.IterableResult``, to be used with ``async for``.
+    Pages are requested in the background while the current one is consumed. When the REST API paginates by
+    offset up to `max_in_flight` page requests are kept running concurrently, when it returns a `next` cursor
+    each page depends on the previous one and the following page is fetched while the current one is consumed.
+    '''
+    _page_size = 1000
+
+    def __init__(self, conn, method=HTTPMethods.GET, max_in_flight=4):
+        """
+        Requires an AsyncConnection
+        Args:
+            conn (AsyncConnection): an AsyncConnection instance
+            method (HTTPMethods): HTTP method to use for the calls
+            max_in_flight (int): maximum number of page requests running at the same time
+        """
+        self.conn = conn
+        self.method = method
+        self.max_in_flight = max(1, max_in_flight)
+        self._search_after_last = None
+        self._pending = collections.deque()
+
+    async def __call__(self, *args, **kwargs):
+        """
+        Allows to set parameters for calls to the REST API and fetches the first page
+        Args:
+            *args: stored internally
+        Keyword Args:
+            **kwargs: stored internally
+
+        Returns:
+            AsyncIterableResult: returns itself
+        """
+        self.cancel()
+        self._args = args
+        self._kwargs = kwargs
+        response = await self._make_call(self._kwargs)
+        self.info = response.info
+        self._data = collections.deque(response.data) if isinstance(response.data, list) else response.data
+        self._search_after_last = None
+        if 'next_' in response.info:
+            self._search_after_last = response.info.next_
+        self.current = 0
+        try:
+            self.total = int(self.info.total)
+        except:
+            self.total = len(self._data)
+        self._fetched = len(self._data)
+        return self
+
+    async def filter(self, **kwargs):
+        """
+        Applies a set of filters to the current query
+        Keyword Args
+            **kwargs: passed to the REST API
+        Returns:
+            AsyncIterableResult: an AsyncIterableResult with applied filters
+        """
+        if kwargs:
+            await self.conn.load_api_specs()
+            for filter_type, filter_value in kwargs.items():
+                self._validate_filter(filter_type, filter_value)
+                self._kwargs[filter_type] = filter_value
+            await self.__call__(*self._args, **self._kwargs)
+        return self
+
+    async def _make_call(self, params):
+        """
+        makes calls to the REST API
+        Args:
+            params (dict): parameters for the call
+        Returns:
+            Response: response for a call
+        Raises:
+            AttributeError: if HTTP method is not supported
+        """
+        if self.method == HTTPMethods.GET:
+            return await self.conn.get(*(self._args), params=params)
+        elif self.method == HTTPMethods.POST:
+            return await self.conn.post(*self._args, data=params)
+        else:
+            raise AttributeError("HTTP method {} is not supported".format(self.method))
+
+    def _page_params(self, offset=None):
+        params = dict(self._kwargs)
+        if offset is None:
+            params['from'] = 0
+            params['next'] = self._search_after_last
+        else:
+            params['from'] = offset
+        params['no_cache'] = 'true'
+        params['size'] = self._page_size
+        return params
+
+    def _schedule(self):
+        """
+        Start page requests in the background, up to `max_in_flight`
+        """
+        if self._search_after_last:
+            if not self._pending and self._fetched < self.total:
+                self._pending.append(asyncio.ensure_future(self._make_call(self._page_params())))
+        else:
+            while len(self._pending) < self.max_in_flight and self._next_offset() < self.total:
+                offset = self._next_offset()
+                self._pending.append(asyncio.ensure_future(self._make_call(self._page_params(offset))))
+                self._scheduled_offset = offset + self._page_size
+
+    def _next_offset(self):
+        return max(self._fetched, getattr(self, '_scheduled_offset', 0))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.current < self.total:
+            if not self._data:
+                self._schedule()
+                if not self._pending:
+                    raise StopAsyncIteration
+                call_output = await self._pending.popleft()
+                if not call_output.data:
+                    self.cancel()
+                    raise StopAsyncIteration
+                if 'next_' in call_output.info:
+                    self._search_after_last = call_output.info.next_
+                self._data = collections.deque(call_output.data)
+                self._fetched += len(self._data)
+                self._schedule()
+            d = self._data.popleft()
+            self.current += 1
+            return d
+        else:
+            raise StopAsyncIteration
+
+    def cancel(self):
+        """
+        Cancel any page request still running in the background. Useful if the iteration is stopped early
+        """
+        while self._pending:
+            self._pending.popleft().cancel()
+        self._scheduled_offset = 0
+
+    async def to_list(self):
+        """
+        Fetch all the remaining results
+
+        Returns:
+            list: all the results of the query
+        """
+        return [i async for i in self]
+
+    def __len__(self):
+        try:
+            return self.total
+        except:
+            return 0
+
+    def __bool__(self):
+        return self.__len__() > 0
+
+    def __str__(self):
+        try:
+            return_str = '{} Results found'.format(self.total)
+            if self._kwargs:
+                return_str += ' | parameters: {}'.format(self._kwargs)
+            return return_str
+        except:
+            data = str(self._data)
+            return data[:100] + (data[100:] and '...')
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _validate_filter(self, filter_type, value):
+        """
+        validate the provided filter versus the REST API documentation
+        Args:
+            filter_type (str): filter for the REST API call
+            value: the value passed
+
+       Raises
+            AttributeError: if validation is not passed
+
+        """
+        self.conn.validate_parameter(self._args[0], filter_type, value)
+
+
+class AsyncOpenTargetsClient(object):
+    """
+    Asynchronous version of ``opentargets.OpenTargetsClient``. Every method is a coroutine returning an
+    ``AsyncIterableResult``
+
+    Example:
+        >>> async with AsyncOpenTargetsClient() as ot:
+        ...     results = await asyncio.gather(*[ot.get_associations_for_target(t) for t in targets])
+        ...     async for a in results[0]:
+        ...         print(a['id'])
+    """
+
+    _search_endpoint = OpenTargetsClient._search_endpoint
+    _filter_associations_endpoint = OpenTargetsClient._filter_associations_endpoint
+    _get_associations_endpoint = OpenTargetsClient._get_associations_endpoint
+    _filter_evidence_endpoint = OpenTargetsClient._filter_evidence_endpoint
+    _get_evidence_endpoint = OpenTargetsClient._get_evidence_endpoint
+    _get_disease = OpenTargetsClient._get_disease
+    _get_target = OpenTargetsClient._get_target
+    _stats_endpoint = OpenTargetsClient._stats_endpoint
+    _metrics_endpoint = OpenTargetsClient._metrics_endpoint
+    _relation_target_endpoint = OpenTargetsClient._relation_target_endpoint
+    _relation_disease_endpoint = OpenTargetsClient._relation_disease_endpoint
+
+    def __init__(self,
+                 max_in_flight=4,
+                 **kwargs
+                 ):
+        """
+        Init the client. The connection is opened on the first call or when entering the context manager
+
+        Args:
+            max_in_flight (int): maximum number of page requests running at the same time for each result
+        Keyword Args:
+            **kwargs: all params forwarded to ``opentargets.aio.AsyncConnection`` object
+        """
+        self.max_in_flight = max_in_flight
+        self.conn = AsyncConnection(**kwargs)
+
+    async def __aenter__(self):
+        await self.conn.connect()
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+
+    async def close(self):
+        await self.conn.close()
+
+    async def _query(self, endpoint, **kwargs):
+        result = AsyncIterableResult(self.conn, max_in_flight=self.max_in_flight)
+        return await result(endpoint, **kwargs)
+
+    async def _resolve_id(self, query, filter):
+        results = await self.search(query, size=1, filter=filter)
+        async for search_result in results:
+            results.cancel()
+            logger.debug('{} resolved to id {}'.format(query, search_result['id']))
+            return search_result['id']
+        return None
+
+    async def _resolve_target_id(self, target):
+        if not isinstance(target, str):
+            raise AttributeError('target must be of type str')
+        if not target.startswith('ENSG'):
+            target_id = await self._resolve_id(target, 'target')
+            if not target_id:
+                raise AttributeError('cannot find an ensembl gene id for target {}'.format(target))
+            return target_id
+        return target
+
+    async def _resolve_disease_id(self, disease):
+        disease_id = await self._resolve_id(disease, 'disease')
+        if not disease_id:
+            raise AttributeError('cannot find an disease id for disease {}'.format(disease))
+        return disease_id
+
+    async def search(self, query, **kwargs):
+        """
+        Search a string and return a list of objects form the search method of the REST API.
+
+        Args:
+            query (str): string to search for
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /public/search method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        kwargs['q'] = query
+        return await self._query(self._search_endpoint, **kwargs)
+
+    async def get_association(self, association_id, **kwargs):
+        """
+        Retrieve a specific Association object from the REST API provided its ID
+
+        Args:
+            association_id (str): Association ID
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /public/association method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        kwargs['id'] = association_id
+        return await self._query(self._get_associations_endpoint, **kwargs)
+
+    async def filter_associations(self, **kwargs):
+        """
+        Retrieve a set of associations by applying a set of filters
+
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/association/filterby method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._filter_associations_endpoint, **kwargs)
+
+    async def get_associations_for_target(self, target, **kwargs):
+        """
+        Same as ``AsyncOpenTargetsClient.filter_associations`` but accept any string as `target` parameter and
+        fires a search if it is not an Ensembl Gene identifier
+
+        Args:
+            target (str): an Ensembl Gene identifier or a string to search for a gene mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/association/filterby method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        target_id = await self._resolve_target_id(target)
+        return await self.filter_associations(target=target_id, **kwargs)
+
+    async def get_associations_for_disease(self, disease, **kwargs):
+        """
+        Same as ``AsyncOpenTargetsClient.filter_associations`` but accept any string as `disease` parameter and
+        fires a search if it is not a valid disease identifier
+
+        Args:
+            disease (str): a disease identifier or a string to search for a disease mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/association/filterby method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        if not isinstance(disease, str):
+            raise AttributeError('disease must be of type str')
+        results = await self.filter_associations(disease=disease, **kwargs)
+        if not results:
+            disease_id = await self._resolve_disease_id(disease)
+            results = await self.filter_associations(disease=disease_id, **kwargs)
+        return results
+
+    async def get_evidence(self, evidence_id, **kwargs):
+        """
+        Retrieve a specific Evidence object from the REST API provided its ID
+
+        Args:
+            evidence_id (str): Evidence ID
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /public/evidence method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        kwargs['id'] = evidence_id
+        return await self._query(self._get_evidence_endpoint, **kwargs)
+
+    async def get_target(self, target_id, **kwargs):
+        """
+        Retrieve a specific target object from the REST API provided its ID
+
+        Args:
+            target_id: Ensembl ID
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /private/target method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._get_target + '/' + target_id, **kwargs)
+
+    async def get_disease(self, disease_id, **kwargs):
+        """
+        Retrieve a specific disease object from the REST API provided its ID
+
+        Args:
+            disease_id: OT disease ID (EFO, Orphanet, ...)
+        Keyword Args:
+            **kwargs: are passed as other parameters to the /private/disease method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._get_disease + '/' + disease_id, **kwargs)
+
+    async def filter_evidence(self, **kwargs):
+        """
+        Retrieve a set of evidence by applying a set of filters
+
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/evidence/filterby method of the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._filter_evidence_endpoint, **kwargs)
+
+    async def get_evidence_for_target(self, target, **kwargs):
+        """
+        Same as ``AsyncOpenTargetsClient.filter_evidence`` but accept any string as `target` parameter and fires
+        a search if it is not an Ensembl Gene identifier
+
+        Args:
+            target (str): an Ensembl Gene identifier or a string to search for a gene mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/evidence/filterby method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        target_id = await self._resolve_target_id(target)
+        return await self.filter_evidence(target=target_id, **kwargs)
+
+    async def get_evidence_for_disease(self, disease, **kwargs):
+        """
+        Same as ``AsyncOpenTargetsClient.filter_evidence`` but accept any string as `disease` parameter and
+        fires a search if it is not a valid disease identifier
+
+        Args:
+            disease (str): a disease identifier or a string to search for a disease mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /public/evidence/filterby method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        if not isinstance(disease, str):
+            raise AttributeError('disease must be of type str')
+        results = await self.filter_evidence(disease=disease, **kwargs)
+        if not results:
+            disease_id = await self._resolve_disease_id(disease)
+            results = await self.filter_evidence(disease=disease_id, **kwargs)
+        return results
+
+    async def get_similar_target(self, target, **kwargs):
+        """
+        Return targets sharing a similar patter nof association to diseases
+        Accepts any string as `target` parameter and fires a search if it is not an Ensembl Gene identifier
+
+        Args:
+            target (str): an Ensembl Gene identifier or a string to search for a gene mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /private/relation/target method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        target_id = await self._resolve_target_id(target)
+        return await self._query(self._relation_target_endpoint + '/' + target_id, **kwargs)
+
+    async def get_similar_disease(self, disease, **kwargs):
+        """
+        Return targets sharing a similar patter nof association to diseases
+        Accepts any string as `disease` parameter and fires a search if nothing is retireved on a first attempt
+
+        Args:
+            disease (str): a disease identifier or a string to search for a disease mapping
+        Keyword Args:
+            **kwargs: are passed as parameters to the /private/relation/disease method of the REST API
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        if not isinstance(disease, str):
+            raise AttributeError('disease must be of type str')
+        result = await self._query(self._relation_disease_endpoint + '/' + disease, **kwargs)
+        if not result:
+            disease_id = await self._resolve_disease_id(disease)
+            result = await self._query(self._relation_disease_endpoint + '/' + disease_id, **kwargs)
+        return result
+
+    async def get_stats(self, **kwargs):
+        """
+        Returns statistics about the data served by the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._stats_endpoint)
+
+    async def get_metrics(self, **kwargs):
+        """
+        Returns metrics about the data served by the REST API
+
+        Returns:
+            AsyncIterableResult: Result of the query
+        """
+        return await self._query(self._metrics_endpoint)
@@ -0,0 +1,407 @@
+"""
+This module benchmarks the client offline, against a ``opentargets.synthetic.SyntheticServer``. Each benchmark is
+run a few times, reporting the throughput in results per second, the percentiles of the run times and of the request
+latencies, and the peak memory allocated by Python when tracemalloc is available. Results can be saved as a baseline
+and later runs compared to it, failing when the throughput or the memory use regresses beyond a threshold.
+
+Usage::
+
+    $ python -m opentargets.benchmark --save baseline.json
+    $ python -m opentargets.benchmark --compare baseline.json --threshold 0.1
+
+or from Python::
+
+    >>> from opentargets.benchmark import run_benchmarks
+    >>> report = run_benchmarks(records=10000, latency=0.01)
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from opentargets.codec import get_codec
+from opentargets.conn import Flattener, flatten
+from opentargets.statistics import HarmonicSumScorer
+from opentargets.synthetic import SyntheticServer
+
+try:
+    import pandas
+    pandas_available = True
+except ImportError:
+    pandas_available = False
+
+try:
+    import ijson
+    ijson_available = True
+except ImportError:
+    ijson_available = False
+
+try:
+    import tracemalloc
+    tracemalloc_available = True
+except ImportError:
+    tracemalloc_available = False
+
+logger = logging.getLogger(__name__)
+
+BASELINE_VERSION = 1
+
+# compared to the baseline, higher is better for the first and lower is better for the second
+HIGHER_IS_BETTER = ('records_per_second',)
+LOWER_IS_BETTER = ('peak_memory',)
+
+
+def percentile(values, p):
+    """
+    Percentile of a list of values, interpolated linearly between the closest ranks
+
+    Args:
+        values (list): numbers
+        p (float): percentile, between 0 and 100
+
+    Returns:
+        float: the percentile, None if there are no values
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * p / 100.
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class BenchmarkContext(object):
+    """
+    Shared state of the benchmarks: the synthetic server, the results it serves as decoded and as encoded pages, a
+    temporary directory and the latencies of the requests made by the clients
+    """
+
+    def __init__(self, server, page_size=1000):
+        """
+        Args:
+            server (SyntheticServer): a started server
+            page_size (int): number of results in the pages of ``BenchmarkContext.pages``
+        """
+        self.server = server
+        self.directory = tempfile.mkdtemp(prefix='opentargets-benchmark-')
+        self.latencies = []
+        self._clients = []
+        total = server.data.total
+        self.records = [server.data.association(i) for i in range(total)]
+        self.pages = [server.page(server.data.association, {'from': [i], 'size': [page_size]})
+                      for i in range(0, total, page_size)]
+
+    def client(self, **kwargs):
+        """
+        A client of the server without a response cache, recording the latency of its requests
+
+        Keyword Args:
+            **kwargs: forwarded to ``opentargets.OpenTargetsClient``
+
+        Returns:
+            OpenTargetsClient: the client
+        """
+        from opentargets import OpenTargetsClient
+
+        kwargs.setdefault('cache_max_entries', 0)
+        client = OpenTargetsClient(host=self.server.host, port=self.server.port, **kwargs)
+        for session in (client.conn.session, client.conn.stream_session):
+            session.hooks['response'].append(self._record_latency)
+        self._clients.append(client)
+        return client
+
+    def _record_latency(self, response, *args, **kwargs):
+        self.latencies.append(response.elapsed.total_seconds())
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def close(self):
+        for client in self._clients:
+            client.close()
+        self._clients = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def bench_paginate(context):
+    """Iterate over all the associations, page by page"""
+    return sum(1 for _ in context.client().filter_associations())
+
+
+def bench_paginate_stream(context):
+    """Iterate over all the associations, decoding the pages while they are read"""
+    if not ijson_available:
+        return None
+    return sum(1 for _ in context.client(stream=True).filter_associations())
+
+
+def bench_decode(context):
+    """Decode the pages of associations with the default JSON codec"""
+    codec = get_codec()
+    return sum(len(codec.loads(page)['data']) for page in context.pages)
+
+
+def bench_flatten(context):
+    """Flatten the associations with ``opentargets.conn.flatten``"""
+    for record in context.records:
+        flatten(record)
+    return len(context.records)
+
+
+def bench_flattener(context):
+    """Flatten the associations with ``opentargets.conn.Flattener``"""
+    flattener = Flattener()
+    for record in context.records:
+        flattener(record)
+    return len(context.records)
+
+
+def bench_to_dataframe(context):
+    """Fetch all the associations as a pandas DataFrame"""
+    if not pandas_available:
+        return None
+    return len(context.client().filter_associations().to_dataframe())
+
+
+def bench_to_file(context):
+    """Fetch all the associations to a gzip compressed file"""
+    result = context.client().filter_associations()
+    result.to_file(context.path('associations.json.gz'))
+    return len(result)
+
+
+def bench_harmonic_sum(context):
+    """Harmonic sum of the datasource scores of each association"""
+    for record in context.records:
+        scorer = HarmonicSumScorer(buffer=100)
+        for score in record['association_score']['datasources'].values():
+            scorer.add(score)
+        scorer.score(scale_factor=2)
+    return len(context.records)
+
+
+BENCHMARKS = OrderedDict([
+    ('paginate', bench_paginate),
+    ('paginate_stream', bench_paginate_stream),
+    ('decode', bench_decode),
+    ('flatten', bench_flatten),
+    ('flattener', bench_flattener),
+    ('to_dataframe', bench_to_dataframe),
+    ('to_file', bench_to_file),
+    ('harmonic_sum', bench_harmonic_sum),
+])
+
+
+def measure_peak_memory(benchmark, context):
+    """
+    Run a benchmark once, tracing the allocations
+
+    Returns:
+        int: the peak memory allocated by the run in bytes, None if tracemalloc is not available
+    """
+    if not tracemalloc_available:
+        return None
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.clear_traces()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        benchmark(context)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def run_benchmark(benchmark, context, repeat=5):
+    """
+    Run a benchmark a few times, timing the runs without tracing allocations, then once more tracing them to
+    measure the peak memory if tracemalloc is available
+
+    Args:
+        benchmark (callable): takes a ``BenchmarkContext`` and returns the number of results processed, or None if
+            it cannot run
+        context (BenchmarkContext): shared state of the benchmarks
+        repeat (int): number of timed runs
+
+    Returns:
+        dict: the measures, None if the benchmark cannot run
+    """
+    seconds = []
+    del context.latencies[:]
+    records = None
+    for _ in range(repeat):
+        start = time.time()
+        records = benchmark(context)
+        seconds.append(time.time() - start)
+        if records is None:
+            return None
+    latencies = list(context.latencies)
+    peak = measure_peak_memory(benchmark, context)
+    median = percentile(seconds, 50)
+    return OrderedDict([
+        ('records', records),
+        ('runs', repeat),
+        ('records_per_second', records / median if median else None),
+        ('seconds', OrderedDict((p, percentile(seconds, int(p[1:]))) for p in ('p50', 'p90', 'p99'))),
+        ('request_seconds', OrderedDict((p, percentile(latencies, int(p[1:]))) for p in ('p50', 'p90', 'p99'))),
+        ('requests', len(latencies) // repeat),
+        ('peak_memory', peak),
+    ])
+
+
+def run_benchmarks(names=None, records=10000, record_size=None, latency=0., repeat=5):
+    """
+    Run benchmarks against a synthetic server started for them
+
+    Args:
+        names (list): names of the benchmarks in ``opentargets.benchmark.BENCHMARKS`` to run, defaults to all
+        records (int): number of results served
+        record_size (int): approximate size in bytes of the encoded results
+        latency (float): seconds waited by the server before answering each request
+        repeat (int): number of timed runs of each benchmark
+
+    Returns:
+        dict: the settings of the runs under `meta` and the measures of each benchmark under `results`
+    Raises:
+        AttributeError: if a benchmark is unknown
+    """
+    names = list(BENCHMARKS) if names is None else names
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise AttributeError('unknown benchmarks {}, choose among {}'.format(', '.join(unknown),
+                                                                             ', '.join(BENCHMARKS)))
+    report = OrderedDict([
+        ('version', BASELINE_VERSION),
+        ('meta', OrderedDict([('records', records),
+                              ('record_size', record_size),
+                              ('latency', latency),
+                              ('repeat', repeat),
+                              ('python', platform.python_version()),
+                              ('codec', get_codec().name)])),
+        ('results', OrderedDict()),
+    ])
+    with SyntheticServer(total=records, record_size=record_size, latency=latency) as server:
+        context = BenchmarkContext(server)
+        try:
+            for name in names:
+                logger.info('running benchmark {}'.format(name))
+                measures = run_benchmark(BENCHMARKS[name], context, repeat=repeat)
+                if measures is None:
+                    logger.warning('skipping benchmark {}, an optional dependency is missing'.format(name))
+                    continue
+                report['results'][name] = measures
+        finally:
+            context.close()
+    return report
+
+
+def compare(baseline, report, threshold=0.1):
+    """
+    Compare the measures of a run to a baseline
+
+    Args:
+        baseline (dict): report of a previous run, as returned by ``run_benchmarks``
+        report (dict): report of the current run
+        threshold (float): relative change beyond which a measure regressed, 0.1 for 10%
+
+    Returns:
+        list: a (benchmark, measure, baseline value, current value, relative change) tuple for each measure
+            regressed
+    """
+    if baseline['meta']['records'] != report['meta']['records']:
+        logger.warning('the baseline was run with {} records and the current run with {}, measures may not be '
+                       'comparable'.format(baseline['meta']['records'], report['meta']['records']))
+    regressions = []
+    for name, measures in report['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+        for measure in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            before, after = previous.get(measure), measures.get(measure)
+            if not before or after is None:
+                continue
+            change = (after - before) / float(before)
+            if (measure in HIGHER_IS_BETTER and change < -threshold) or \
+                    (measure in LOWER_IS_BETTER and change > threshold):
+                regressions.append((name, measure, before, after, change))
+    return regressions
+
+
+def _format_seconds(value):
+    return '-' if value is None else '{:.1f}'.format(value * 1000)
+
+
+def _format_megabytes(value):
+    return '-' if value is None else '{:.1f}'.format(value / 1024. / 1024.)
+
+
+def format_report(report, baseline=None):
+    """
+    Format the measures of a run as a table, with the change of the throughput since the baseline if given
+
+    Returns:
+        str: the table
+    """
+    header = '{:<16}{:>9}{:>14}{:>9}{:>9}{:>9}{:>12}{:>10}{:>10}'.format(
+        'benchmark', 'records', 'records/s', 'p50 ms', 'p90 ms', 'p99 ms', 'req p99 ms', 'peak MB', 'change')
+    lines = [header, '-' * len(header)]
+    for name, measures in report['results'].items():
+        change = ''
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous and previous.get('records_per_second'):
+            change = '{:+.1%}'.format(measures['records_per_second'] / previous['records_per_second'] - 1)
+        lines.append('{:<16}{:>9}{:>14.0f}{:>9}{:>9}{:>9}{:>12}{:>10}{:>10}'.format(
+            name, measures['records'], measures['records_per_second'] or 0,
+            _format_seconds(measures['seconds']['p50']), _format_seconds(measures['seconds']['p90']),
+            _format_seconds(measures['seconds']['p99']), _format_seconds(measures['request_seconds']['p99']),
+            _format_megabytes(measures['peak_memory']), change))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the client offline against a synthetic REST API')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run, among {}. Defaults to all'.format(
+        ', '.join(BENCHMARKS)))
+    parser.add_argument('--records', default=10000, type=int, help='number of results served')
+    parser.add_argument('--record-size', default=None, type=int, help='approximate size in bytes of the results')
+    parser.add_argument('--latency', default=0., type=float, help='seconds waited before answering requests')
+    parser.add_argument('--repeat', default=5, type=int, help='number of timed runs of each benchmark')
+    parser.add_argument('--quick', action='store_true', help='serve 1000 results and time a single run')
+    parser.add_argument('--save', help='save the measures to this JSON file, to use as a baseline')
+    parser.add_argument('--compare', help='compare the measures to the baseline saved in this JSON file')
+    parser.add_argument('--threshold', default=0.1, type=float,
+                        help='relative change of the throughput or peak memory considered a regression')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.records, args.repeat = 1000, 1
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+    report = run_benchmarks(names=args.benchmarks or None, records=args.records, record_size=args.record_size,
+                            latency=args.latency, repeat=args.repeat)
+    print(format_report(report, baseline))
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    if baseline is not None:
+        regressions = compare(baseline, report, threshold=args.threshold)
+        for name, measure, before, after, change in regressions:
+            print('regression in {} {}: {:.6g} -> {:.6g} ({:+.1%})'.format(name, measure, before, after, change))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+This module provides cache backends for the HTTP responses of the Open Targets REST API, to be used with
+``opentargets.conn.Connection``. Backends implement the ``cachecontrol`` cache interface.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from cachecontrol.cache import BaseCache
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(BaseCache):
+    """
+    Thread safe in-memory cache bounded by number of entries and by size, evicting the least recently used
+    entries first. Entries can optionally expire after a time to live.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=128 * 1024 * 1024, ttl=None):
+        """
+        Args:
+            max_entries (int): maximum number of entries kept in the cache, None for no limit
+            max_bytes (int): maximum total size in bytes of the entries kept in the cache, None for no limit
+            ttl (float): seconds after which an entry expires, None for no expiration
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, timestamp = entry
+            if self.ttl is not None and time.time() - timestamp > self.ttl:
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            # move the entry to the most recently used end
+            del self.data[key]
+            self.data[key] = entry
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.data:
+                self._pop(key)
+            self.data[key] = (value, time.time())
+            self.bytes += len(value)
+            while self.data and ((self.max_entries is not None and len(self.data) > self.max_entries) or
+                                 (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._pop(next(iter(self.data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.data:
+                self._pop(key)
+
+    def _pop(self, key):
+        value, timestamp = self.data.pop(key)
+        self.bytes -= len(value)
+
+    def clear(self):
+        """
+        Drop all the cached entries
+        """
+        with self.lock:
+            self.data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Returns usage statistics for the cache. Hits and misses count lookups, ``cachecontrol`` may look up a
+        key more than once for the same request
+
+        Returns:
+            dict: number of hits, misses, evictions, expirations, entries and bytes held
+        """
+        with self.lock:
+            return dict(hits=self.hits,
+                        misses=self.misses,
+                        evictions=self.evictions,
+                        expirations=self.expirations,
+                        entries=len(self.data),
+                        bytes=self.bytes)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Persistent cache storing responses in a SQLite database in WAL mode, which can be shared safely by many
+    threads and processes on the same host.
+
+    Entries are namespaced by the data release served by the REST API: until a namespace is set the cache is
+    bypassed, and setting a new namespace drops the entries stored for other releases.
+    """
+
+    def __init__(self, path, timeout=30):
+        """
+        Args:
+            path (str): path to the SQLite database file, created if it does not exist
+            timeout (float): seconds to wait for a lock held by another process before failing
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.timeout = timeout
+        self.namespace = None
+        self._local = threading.local()
+        # connections opened by every thread, to close them all
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._get_connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                       'namespace TEXT NOT NULL, '
+                       'key TEXT NOT NULL, '
+                       'value BLOB NOT NULL, '
+                       'PRIMARY KEY (namespace, key))')
+
+    def _get_connection(self):
+        """
+        Get the SQLite connection for the current thread and process, opening it if needed
+
+        Returns:
+            sqlite3.Connection: a connection to the database
+        """
+        pid = os.getpid()
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != pid:
+            # each connection is used by a single thread, but closed by the thread closing the cache
+            db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = pid
+            with self._connections_lock:
+                self._connections.append((db, pid))
+        return db
+
+    def set_namespace(self, namespace):
+        """
+        Set the data release the cached entries belong to, and drop the entries of any other release
+
+        Args:
+            namespace (str): data release served by the REST API
+        """
+        namespace = str(namespace)
+        if namespace != self.namespace:
+            self.namespace = namespace
+            with self._get_connection() as db:
+                deleted = db.execute('DELETE FROM responses WHERE namespace != ?', (namespace,)).rowcount
+            if deleted > 0:
+                logger.debug('dropped {} cached responses from previous data releases'.format(deleted))
+
+    def get(self, key):
+        if self.namespace is None:
+            return None
+        row = self._get_connection().execute('SELECT value FROM responses WHERE namespace = ? AND key = ?',
+                                             (self.namespace, key)).fetchone()
+        if row is not None:
+            return bytes(row[0])
+        return None
+
+    def set(self, key, value):
+        if self.namespace is None:
+            return
+        with self._get_connection() as db:
+            db.execute('INSERT OR REPLACE INTO responses (namespace, key, value) VALUES (?, ?, ?)',
+                       (self.namespace, key, sqlite3.Binary(value)))
+
+    def delete(self, key):
+        with self._get_connection() as db:
+            db.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        """
+        Drop all the cached entries
+        """
+        with self._get_connection() as db:
+            db.execute('DELETE FROM responses')
+
+    def close(self):
+        """
+        Close the connections to the database opened by all the threads of the current process
+        """
+        pid = os.getpid()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for db, db_pid in connections:
+            if db_pid == pid:
+                db.close()
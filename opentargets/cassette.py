@@ -0,0 +1,283 @@
+"""
+This module records the HTTP responses of the Open Targets REST API to a cassette, a compact SQLite file holding
+the compressed responses, and replays them later without network access. Replayed responses can be slowed down
+with a simulated latency, jitter and bandwidth, so that workflows can be profiled reproducibly and client changes
+compared under the same network conditions.
+
+Usage::
+
+    >>> from opentargets import OpenTargetsClient
+    >>> from opentargets.cassette import mount_cassette
+    >>> ot = OpenTargetsClient(spec_cache_dir=None)
+    >>> mount_cassette(ot.conn, 'BRAF.cassette', mode='record')
+    >>> ot.filter_evidence(target='ENSG00000157764').to_file('BRAF_evidence.json.gz')
+
+and later, offline::
+
+    >>> ot = OpenTargetsClient(spec_cache_dir=None)
+    >>> mount_cassette(ot.conn, 'BRAF.cassette', latency=0.2, jitter=0.1, bandwidth=2 * 1024 * 1024)
+    >>> ot.filter_evidence(target='ENSG00000157764').to_file('BRAF_evidence.json.gz')
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+MODES = ('replay', 'record', 'auto')
+
+# headers describing the encoding of the body on the wire, which is stored decoded
+_TRANSFER_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+class Cassette(object):
+    """
+    Responses stored in a SQLite database, keyed by request method, URL and body, with the bodies compressed.
+    Can be shared by many threads
+    """
+
+    def __init__(self, path, level=6):
+        """
+        Args:
+            path (str): path to the SQLite database file, created if it does not exist
+            level (int): zlib compression level of the stored bodies
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.level = level
+        self._local = threading.local()
+        with self._get_connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                       'key TEXT PRIMARY KEY, '
+                       'method TEXT NOT NULL, '
+                       'url TEXT NOT NULL, '
+                       'status INTEGER NOT NULL, '
+                       'reason TEXT, '
+                       'headers TEXT NOT NULL, '
+                       'body BLOB NOT NULL, '
+                       'elapsed REAL NOT NULL)')
+
+    def _get_connection(self):
+        """
+        Get the SQLite connection for the current thread and process, opening it if needed
+
+        Returns:
+            sqlite3.Connection: a connection to the database
+        """
+        pid = os.getpid()
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != pid:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+            self._local.pid = pid
+        return db
+
+    @staticmethod
+    def key(request):
+        """
+        Args:
+            request (requests.PreparedRequest): a request
+
+        Returns:
+            str: the key of the request in the cassette
+        """
+        body = request.body or b''
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        return '{} {} {}'.format(request.method, request.url, hashlib.sha1(body).hexdigest())
+
+    def get(self, request):
+        """
+        Args:
+            request (requests.PreparedRequest): a request
+
+        Returns:
+            dict: the response recorded for the request, with its `status`, `reason`, `headers`, decompressed
+            `body` and `elapsed` seconds until the headers were received. None if there is none
+        """
+        row = self._get_connection().execute('SELECT status, reason, headers, body, elapsed FROM responses '
+                                             'WHERE key = ?', (self.key(request),)).fetchone()
+        if row is None:
+            return None
+        status, reason, headers, body, elapsed = row
+        return dict(status=status, reason=reason, headers=json.loads(headers), body=zlib.decompress(bytes(body)),
+                    elapsed=elapsed)
+
+    def put(self, request, status, reason, headers, body, elapsed):
+        """
+        Record the response to a request, replacing any previous one
+
+        Args:
+            request (requests.PreparedRequest): the request
+            status (int): HTTP status code
+            reason (str): HTTP reason phrase
+            headers (dict): response headers
+            body (bytes): decoded body
+            elapsed (float): seconds until the headers were received
+        """
+        with self._get_connection() as db:
+            db.execute('INSERT OR REPLACE INTO responses (key, method, url, status, reason, headers, body, elapsed) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                       (self.key(request), request.method, request.url, status, reason, json.dumps(headers),
+                        sqlite3.Binary(zlib.compress(body, self.level)), elapsed))
+
+    def __len__(self):
+        return self._get_connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None and self._local.pid == os.getpid():
+            db.close()
+        self._local.db = None
+
+
+class _ThrottledReader(io.RawIOBase):
+    """
+    Read bytes from memory no faster than a bandwidth
+    """
+
+    def __init__(self, data, bandwidth=None):
+        self._data = io.BytesIO(data)
+        self.bandwidth = bandwidth
+        self._start = None
+        self._read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self._start is None:
+            self._start = time.time()
+        chunk = self._data.read(size)
+        self._read += len(chunk)
+        if self.bandwidth and chunk:
+            wait = self._start + float(self._read) / self.bandwidth - time.time()
+            if wait > 0:
+                time.sleep(wait)
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    Transport adapter for ``requests`` sessions, recording responses to a cassette or replaying them from it
+    """
+
+    def __init__(self, cassette, mode='replay', latency=0., jitter=0., bandwidth=None, seed=None, **kwargs):
+        """
+        Args:
+            cassette: a ``opentargets.cassette.Cassette`` or the path of one
+            mode (str): `replay` to answer requests from the cassette only, `record` to send them and record the
+                responses, `auto` to replay the responses recorded and record the others
+            latency: seconds waited before a replayed response is returned, or `recorded` to wait as long as
+                the recorded request did
+            jitter (float): maximum seconds added at random to the latency
+            bandwidth (float): maximum bytes per second read from the body of replayed responses, None for no limit
+            seed: seed of the random jitter, for reproducible runs
+        Keyword Args:
+            **kwargs: forwarded to ``requests.adapters.HTTPAdapter``, used when recording
+        Raises:
+            AttributeError: if the mode is unknown
+        """
+        if mode not in MODES:
+            raise AttributeError('unknown mode {}, choose one of {}'.format(mode, ', '.join(MODES)))
+        super(CassetteAdapter, self).__init__(**kwargs)
+        if not isinstance(cassette, Cassette):
+            cassette = Cassette(cassette)
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.recorded = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = None if self.mode == 'record' else self.cassette.get(request)
+        if entry is not None:
+            with self._lock:
+                self.replayed += 1
+            self._wait(entry['elapsed'])
+            return self._build(request, entry, self.bandwidth)
+        if self.mode == 'replay':
+            raise requests.exceptions.ConnectionError('no response recorded in cassette {} for {} {}'.format(
+                self.cassette.path, request.method, request.url), request=request)
+        return self._record(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+    def _record(self, request, **kwargs):
+        """
+        Send a request, record its response and return a copy of it read from memory
+        """
+        start = time.time()
+        response = super(CassetteAdapter, self).send(request, **kwargs)
+        elapsed = time.time() - start
+        try:
+            body = response.raw.read(decode_content=True)
+        finally:
+            response.close()
+        headers = dict((k, v) for k, v in response.headers.items() if k.lower() not in _TRANSFER_HEADERS)
+        entry = dict(status=response.status_code, reason=response.reason, headers=headers, body=body,
+                     elapsed=elapsed)
+        self.cassette.put(request, **entry)
+        with self._lock:
+            self.recorded += 1
+        logger.debug('recorded {} {} to {}'.format(request.method, request.url, self.cassette.path))
+        return self._build(request, entry)
+
+    def _wait(self, recorded):
+        latency = recorded if self.latency == 'recorded' else self.latency
+        if self.jitter:
+            with self._lock:
+                latency += self._random.uniform(0, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _build(self, request, entry, bandwidth=None):
+        """
+        Build a response reading its body from memory, at most at `bandwidth` bytes per second
+        """
+        headers = dict(entry['headers'])
+        headers['Content-Length'] = str(len(entry['body']))
+        raw = HTTPResponse(body=_ThrottledReader(entry['body'], bandwidth),
+                           headers=headers,
+                           status=entry['status'],
+                           reason=entry['reason'],
+                           preload_content=False,
+                           decode_content=False)
+        return self.build_response(request, raw)
+
+
+def mount_cassette(conn, cassette, **kwargs):
+    """
+    Route the requests of a connection to the REST API through a cassette, replacing its transport and cache
+
+    Args:
+        conn (Connection): an ``opentargets.conn.Connection``
+        cassette: a ``opentargets.cassette.Cassette`` or the path of one
+    Keyword Args:
+        **kwargs: forwarded to ``opentargets.cassette.CassetteAdapter``
+
+    Returns:
+        CassetteAdapter: the adapter mounted on the sessions of the connection
+    """
+    adapter = CassetteAdapter(cassette, **kwargs)
+    for session in (conn.session, conn.stream_session):
+        session.mount(conn.host, adapter)
+    return adapter
@@ -0,0 +1,150 @@
+"""
+This module makes long exports of query results resumable. The position of the export in the results, i.e. the
+number of results written and the pagination cursor of the REST API, is saved with the size of the output file
+every few pages. When an interrupted export is started again, the output is truncated to the size of the last
+checkpoint and the results are fetched again from the page following it, so that each result is written once.
+"""
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# parameters changed while paginating, not part of the query
+PAGINATION_PARAMETERS = ('from', 'next', 'no_cache', 'size')
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def get_query(result):
+    """
+    Describe the query of a result, to check a checkpoint belongs to it
+
+    Args:
+        result (IterableResult): the result of a query
+
+    Returns:
+        dict: arguments and parameters of the query, as decoded from JSON
+    """
+    query = dict(args=list(result._args),
+                 kwargs=dict((k, v) for k, v in result._kwargs.items() if k not in PAGINATION_PARAMETERS))
+    return json.loads(json.dumps(query, default=str, sort_keys=True))
+
+
+class ExportCheckpoint(object):
+    """
+    Checkpoint file of an export to an output file, written atomically
+    """
+
+    def __init__(self, path, output, every=10):
+        """
+        Args:
+            path (str): path of the checkpoint file
+            output (str): path of the output file of the export
+            every (int): number of pages written between checkpoints
+        """
+        self.path = path
+        self.output = output
+        self.every = every
+        self.state = None
+
+    def load(self):
+        """
+        Returns:
+            dict: the last checkpoint saved, None if there is none or if the output file is missing or shorter than
+                the checkpoint
+        """
+        if not os.path.isfile(self.path):
+            return None
+        if not os.path.isfile(self.output):
+            logger.warning('output {} of checkpoint {} is missing, starting over'.format(self.output, self.path))
+            return None
+        with open(self.path) as fh:
+            state = json.load(fh)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise AttributeError('checkpoint {} has an unsupported version'.format(self.path))
+        if os.path.getsize(self.output) < state['size']:
+            logger.warning('output {} is shorter than when checkpoint {} was saved, starting over'.format(
+                self.output, self.path))
+            return None
+        return state
+
+    def resume(self, result):
+        """
+        Move a result to the position of the last checkpoint, and truncate the output to its size then
+
+        Args:
+            result (IterableResult): the result being exported, before any page is written
+
+        Returns:
+            dict: the checkpoint, None if the export starts from the beginning
+        Raises:
+            AttributeError: if the checkpoint was saved for another query, or the number of results changed
+        """
+        state = self.load()
+        if state is None:
+            return None
+        if state['query'] != get_query(result):
+            raise AttributeError('checkpoint {} was saved for another query: {}'.format(self.path, state['query']))
+        if state['total'] != result.total:
+            raise AttributeError('checkpoint {} was saved for {} results but the query now returns {}, the data '
+                                 'changed and the export must start over'.format(self.path, state['total'],
+                                                                                 result.total))
+        with open(self.output, 'r+b') as fh:
+            fh.truncate(state['size'])
+        result._resume(state['current'], state['next'])
+        logger.info('resuming export to {} after {} results'.format(self.output, state['current']))
+        self.state = state
+        return state
+
+    def pages(self, result, get_size, extra=None):
+        """
+        Yield the pages of a result not written yet, saving a checkpoint every `every` pages once they are
+        written, i.e. when the following page is requested
+
+        Args:
+            result (IterableResult): the result being exported
+            get_size (callable): writes the buffered output to the file, syncs the file to disk and returns its
+                size
+            extra (dict): stored in the checkpoints, e.g. the columns of a csv file. Can be updated while the
+                pages are written
+
+        Returns:
+            iterator: an iterator of lists of results
+        """
+        written = 0
+        for page in result._iter_pages():
+            yield page
+            result.current += len(page)
+            written += 1
+            if written % self.every == 0:
+                self.save(result, get_size(), extra)
+
+    def save(self, result, size, extra=None):
+        """
+        Save the position of a result and the size of the output file atomically
+        """
+        state = dict(version=CHECKPOINT_VERSION,
+                     query=get_query(result),
+                     total=result.total,
+                     current=result.current,
+                     next=result._consumed_cursor,
+                     size=size)
+        state.update(extra or {})
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as fh:
+            json.dump(state, fh, default=str)
+            fh.flush()
+            os.fsync(fh.fileno())
+        _replace(fh.name, self.path)
+        self.state = state
+
+    def remove(self):
+        """
+        Remove the checkpoint file, once the export is complete
+        """
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,158 @@
+"""
+This module provides the JSON codecs used to decode the responses of the Open Targets REST API and to encode the
+exported results. By default the fastest library installed among orjson, ujson and simdjson is used, falling back
+to the standard library ``json`` module.
+"""
+import json
+from collections import OrderedDict
+
+try:
+    import orjson
+    orjson_available = True
+except ImportError:
+    orjson_available = False
+
+try:
+    import ujson
+    ujson_available = True
+except ImportError:
+    ujson_available = False
+
+try:
+    import simdjson
+    simdjson_available = True
+except ImportError:
+    simdjson_available = False
+
+
+class JSONCodec(object):
+    """
+    Codec based on the standard library ``json`` module, and base class for the other codecs
+    """
+    name = 'json'
+
+    def loads(self, data):
+        """
+        Decode a JSON document
+
+        Args:
+            data (bytes): JSON document, ``str`` is accepted too
+
+        Returns:
+            the decoded object
+        Raises:
+            ValueError: if the document is not valid JSON
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    def dumps(self, obj, default=None):
+        """
+        Encode an object to a JSON string
+
+        Args:
+            obj: object to encode
+            default (callable): called with the objects that cannot be encoded, returns an encodable object
+
+        Returns:
+            str: JSON document
+        """
+        return json.dumps(obj, default=default)
+
+    def dumps_bytes(self, obj, default=None):
+        """
+        Encode an object to UTF-8 encoded JSON, avoiding the intermediate string when the library allows it
+
+        Args:
+            obj: object to encode
+            default (callable): called with the objects that cannot be encoded, returns an encodable object
+
+        Returns:
+            bytes: JSON document
+        """
+        return self.dumps(obj, default=default).encode('utf-8')
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on orjson, the fastest to decode and encode
+    """
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj, default=None):
+        return orjson.dumps(obj, default=default).decode('utf-8')
+
+    def dumps_bytes(self, obj, default=None):
+        return orjson.dumps(obj, default=default)
+
+
+class UJSONCodec(JSONCodec):
+    """
+    Codec based on ujson
+    """
+    name = 'ujson'
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, obj, default=None):
+        if default is not None:
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, default=default)
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+
+class SimdjsonCodec(JSONCodec):
+    """
+    Codec decoding with simdjson, which does not provide an encoder: encoding uses the standard library
+    """
+    name = 'simdjson'
+
+    def loads(self, data):
+        return simdjson.loads(data)
+
+
+CODECS = OrderedDict([('orjson', (OrjsonCodec, orjson_available)),
+                      ('ujson', (UJSONCodec, ujson_available)),
+                      ('simdjson', (SimdjsonCodec, simdjson_available)),
+                      ('json', (JSONCodec, True))])
+
+
+def available_codecs():
+    """
+    Returns:
+        list: names of the codecs that can be used, fastest first
+    """
+    return [name for name, (codec_class, available) in CODECS.items() if available]
+
+
+def get_codec(codec=None):
+    """
+    Get a JSON codec
+
+    Args:
+        codec: a JSONCodec instance, the name of a codec (`orjson`, `ujson`, `simdjson` or `json`), or None for
+            the fastest codec available
+
+    Returns:
+        JSONCodec: the codec
+    Raises:
+        AttributeError: if the codec name is unknown
+        ImportError: if the library required by the codec is not installed
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None:
+        codec = available_codecs()[0]
+    if codec not in CODECS:
+        raise AttributeError('unknown JSON codec {}, choose one of {}'.format(codec, ', '.join(CODECS)))
+    codec_class, available = CODECS[codec]
+    if not available:
+        raise ImportError('{} library is not installed but is required to use it as JSON codec'.format(codec))
+    return codec_class()
@@ -0,0 +1,169 @@
+"""
+This module writes compressed files block by block, compressing the blocks in parallel threads. Each block is
+compressed as an independent gzip member, zstd frame or lz4 frame, so that the output is a standard concatenated
+stream readable by the usual tools, e.g. `gzip.open`, `zcat`, `zstd -d` or `lz4 -d`.
+"""
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from opentargets.profiling import NULL_PROFILE
+
+try:
+    import zstandard
+    zstandard_available = True
+except ImportError:
+    zstandard_available = False
+
+try:
+    import lz4.frame
+    lz4_available = True
+except ImportError:
+    lz4_available = False
+
+COMPRESSIONS = ('gzip', 'zstd', 'lz4', 'none')
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def get_compressor(compression='gzip', level=None):
+    """
+    Get a function compressing a block of data independently of the others
+
+    Args:
+        compression (str): one of `gzip`, `zstd`, `lz4` or `none`
+        level (int): compression level, defaults to the default of each library
+
+    Returns:
+        function: compresses bytes to a gzip member, a zstd frame or a lz4 frame
+    Raises:
+        AttributeError: if the compression is unknown
+        ImportError: if the library required by the compression is not installed
+    """
+    if compression == 'gzip':
+        level = 6 if level is None else level
+
+        def compress(data):
+            # wbits 31 writes a gzip header and trailer around the deflate stream
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            return compressor.compress(data) + compressor.flush()
+        return compress
+    if compression == 'zstd':
+        if not zstandard_available:
+            raise ImportError('zstandard library is not installed but is required to use zstd compression')
+        if level is None:
+            level = 3
+        # compressors are not thread safe, each block gets its own
+        return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+    if compression == 'lz4':
+        if not lz4_available:
+            raise ImportError('lz4 library is not installed but is required to use lz4 compression')
+        if level is None:
+            return lambda data: lz4.frame.compress(data)
+        return lambda data: lz4.frame.compress(data, compression_level=level)
+    if compression == 'none':
+        return lambda data: data
+    raise AttributeError('unknown compression {}, choose one of {}'.format(compression, ', '.join(COMPRESSIONS)))
+
+
+class BlockWriter(object):
+    """
+    File-like object buffering the data written and compressing it a block at a time. With more than one worker
+    the blocks are compressed in parallel threads, the compression libraries releasing the GIL, and written in
+    order
+    """
+
+    def __init__(self, filename, compression='gzip', level=None, workers=1, block_size=DEFAULT_BLOCK_SIZE,
+                 mode='wb', profile=None):
+        """
+        Args:
+            filename (str): path of the file to write
+            compression (str): one of `gzip`, `zstd`, `lz4` or `none`
+            level (int): compression level, defaults to the default of each library
+            workers (int): number of threads compressing blocks
+            block_size (int): size in bytes of the uncompressed blocks
+            mode (str): `wb` to overwrite the file, `ab` to append to it
+            profile (ExportProfile): profile where the time spent compressing and writing blocks is added, as
+                `compress` and `write` stages counting bytes
+        Raises:
+            AttributeError: if the compression is unknown
+            ImportError: if the library required by the compression is not installed
+        """
+        self.compress = get_compressor(compression, level)
+        self.compression = compression
+        self.block_size = block_size
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        self._pending = deque()
+        self._buffer = []
+        self._buffered = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.profile = profile or NULL_PROFILE
+        self._fh = open(filename, mode)
+
+    def write(self, data):
+        """
+        Args:
+            data (bytes): data to write
+        """
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.block_size:
+            self._submit_block()
+
+    def _submit_block(self):
+        block = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        if not block:
+            return
+        self.bytes_in += len(block)
+        if self._executor is None:
+            self._write_compressed(self._compress(block))
+            return
+        self._pending.append(self._executor.submit(self._compress, block))
+        # bound the memory used by the blocks waiting to be written
+        while len(self._pending) > self.workers * 2 or (self._pending and self._pending[0].done()):
+            self._write_compressed(self._pending.popleft().result())
+
+    def _compress(self, block):
+        with self.profile.stage('compress', len(block)):
+            return self.compress(block)
+
+    def _write_compressed(self, data):
+        self.bytes_out += len(data)
+        with self.profile.stage('write', len(data)):
+            self._fh.write(data)
+
+    def flush(self):
+        """
+        Compress the buffered data and write all the compressed blocks to the file
+        """
+        self._submit_block()
+        while self._pending:
+            self._write_compressed(self._pending.popleft().result())
+        self._fh.flush()
+
+    def close(self):
+        if self._fh.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._fh.close()
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    @property
+    def closed(self):
+        return self._fh.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
@@ -2,20 +2,41 @@
 This module abstracts the connection to the Open Targets REST API to simplify its usage.
 Can be used directly but requires some knowledge of the API.
 """
-import gzip
+import hashlib
 import json
 import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
 from json import JSONEncoder
+from contextlib import contextmanager
 import collections
+try:
+    from collections.abc import MutableMapping, Sequence
+except ImportError:
+    from collections import MutableMapping, Sequence
 
 import addict
 import requests
-from cachecontrol import CacheControl
-from future.utils import implements_iterator
+from cachecontrol import CacheControlAdapter
+from opentargets.cache import LRUCache, SQLiteCache
+from opentargets.checkpoint import ExportCheckpoint
+from opentargets.codec import JSONCodec, get_codec
+from opentargets.compression import BlockWriter, DEFAULT_BLOCK_SIZE
+from opentargets.metrics import HOOK_EVENTS, RequestMetrics
+from opentargets.profiling import NULL_PROFILE, get_profile
+from opentargets.projection import LIST_ITEM, Projection
+from opentargets.tabular import RecordBatchBuilder, ParquetFileWriter
+from opentargets.ratelimit import RateLimiter
+from future.utils import implements_iterator, string_types, integer_types
+from future.moves.queue import Queue, Empty, Full
 import yaml
-from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 from opentargets.version import __version__, __api_major_version__
 
@@ -37,8 +58,16 @@ try:
 except ImportError:
     tqdm_available = False
 
+try:
+    import ijson
+    ijson_available = True
+except ImportError:
+    ijson_available = False
+
 API_MAJOR_VERSION = __api_major_version__
 
+DEFAULT_SPEC_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join('~', '.cache')), 'opentargets')
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
@@ -57,12 +86,18 @@ def flatten(d, parent_key='', separator='.'):
     flat_fields = []
     for k, v in d.items():
         flat_key = parent_key + separator + k if parent_key else k
-        if isinstance(v, collections.MutableMapping):
+        if isinstance(v, MutableMapping):
             flat_fields.extend(flatten(v, flat_key, separator=separator).items())
         else:
             flat_fields.append((flat_key, v))
     return dict(flat_fields)
 
+def _compress_value(v, sep='|'):
+    if not isinstance(v, string_types + integer_types + (float,)) and isinstance(v, Sequence):
+        return sep.join(str(i) if isinstance(i, string_types + integer_types + (float,)) else json.dumps(i)
+                        for i in v)
+    return v
+
 def compress_list_values(d, sep='|'):
     """
     Args:
@@ -73,46 +108,226 @@ def compress_list_values(d, sep='|'):
         dict: dictionary with compressed lists
     """
     for k, v in d.items():
-        if not isinstance(v, (str, int, float)):
-            if isinstance(v, collections.Sequence):
-                safe_values = []
-                for i in v:
-                    if isinstance(i, (str, int, float)):
-                        safe_values.append(str(i))
-                    else:
-                        safe_values.append(json.dumps(i))
-                d[k]=sep.join(safe_values)
+        d[k] = _compress_value(v, sep)
     return d
 
 
+class _Retry(Retry):
+    """
+    Retry policy honouring the `Retry-After` header of 413 and 503 responses only, 429 responses are handled by
+    the rate limiter of the connection
+    """
+    RETRY_AFTER_STATUS_CODES = frozenset([413, 503])
+
+
+class _ShapeMismatch(Exception):
+    pass
+
+
+class Flattener(object):
+    """
+    Flatten dictionaries like `flatten`, optionally compressing list values like `compress_list_values` in the
+    same pass.
+
+    Results of a query nearly always share the same few shapes, i.e. the same nested keys. The first time a shape
+    is seen it is flattened recursively and compiled to a function reading its values by key path and building
+    the flat dictionary at once. The next dictionaries are flattened by the compiled function of their shape,
+    falling back to the recursive flattening when their shape differs.
+
+    Notes:
+        The keys of a flat dictionary follow the order of the first dictionary seen with the same shape.
+    """
+
+    def __init__(self, separator='.', compress_lists=False, list_separator='|', max_shapes=64):
+        """
+        Args:
+            separator (str): separator between nested keys
+            compress_lists (bool): if True serialise list values to a string with `list_separator` between the
+                elements
+            list_separator (str): separator between list elements
+            max_shapes (int): maximum number of shapes compiled, the other shapes are flattened recursively
+        """
+        self.separator = separator
+        self.compress_lists = compress_lists
+        self.list_separator = list_separator
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._compiled = 0
+        # types of the values returned as they are, without being checked for a nested dictionary or a list
+        self._plain_types = set(string_types + integer_types + (float, bool, type(None)))
+        if not compress_lists:
+            self._plain_types.add(list)
+        self._node_types = set()
+
+    def __call__(self, d):
+        """
+        Args:
+            d (dict): dictionary
+
+        Returns:
+            dict: a flattened dictionary
+        """
+        top_keys = tuple(d)
+        extractors = self._shapes.get(top_keys)
+        if extractors:
+            for i, extractor in enumerate(extractors):
+                try:
+                    flat = extractor(d)
+                except (_ShapeMismatch, KeyError, TypeError):
+                    continue
+                if i:
+                    # try the last matching shape first next time
+                    extractors.insert(0, extractors.pop(i))
+                return flat
+        flat = flatten(d, separator=self.separator)
+        if self.compress_lists:
+            compress_list_values(flat, self.list_separator)
+        if self._compiled < self.max_shapes:
+            extractor = self._compile(d)
+            if extractor is not None:
+                self._shapes.setdefault(top_keys, []).insert(0, extractor)
+                self._compiled += 1
+        return flat
+
+    def _leaf(self, v):
+        """
+        Check a value not of a plain type, compressing it if it is a list
+        """
+        if isinstance(v, MutableMapping):
+            raise _ShapeMismatch()
+        if self.compress_lists:
+            return _compress_value(v, self.list_separator)
+        return v
+
+    def _compile(self, d):
+        """
+        Compile a function flattening the dictionaries with the same shape as `d`
+
+        Returns:
+            function: the compiled function, or None if the shape cannot be compiled, e.g. with keys that are not
+                strings
+        """
+        lines = ['def extract(n0):']
+        items = []
+        nodes = [(d, 'n0', '')]
+        while nodes:
+            node, name, parent_key = nodes.pop(0)
+            if name != 'n0':
+                lines.append('    if {0}.__class__ not in node_types or len({0}) != {1}: raise mismatch'.format(
+                    name, len(node)))
+            for k, v in node.items():
+                if not isinstance(k, string_types):
+                    return None
+                flat_key = parent_key + self.separator + k if parent_key else k
+                if isinstance(v, MutableMapping):
+                    child = 'n{}'.format(len(lines))
+                    lines.append('    {} = {}[{!r}]'.format(child, name, k))
+                    self._node_types.add(v.__class__)
+                    nodes.append((v, child, flat_key))
+                else:
+                    value = 'v{}'.format(len(lines))
+                    lines.append('    {} = {}[{!r}]'.format(value, name, k))
+                    items.append('{!r}: {} if {}.__class__ in plain_types else leaf({})'.format(
+                        flat_key, value, value, value))
+        lines.append('    return {{{}}}'.format(', '.join(items)))
+        namespace = dict(node_types=self._node_types,
+                         plain_types=self._plain_types,
+                         leaf=self._leaf,
+                         mismatch=_ShapeMismatch)
+        exec('\n'.join(lines), namespace)
+        return namespace['extract']
+
 
 class HTTPMethods(object):
     GET='get'
     POST='post'
 
 
+Endpoint = namedtuple('Endpoint', ['path', 'methods', 'parameters'])
+Endpoint.__doc__ = '''
+Description of a REST API endpoint: its path, the HTTP methods it supports and, for each method, a dictionary of
+parameter names to swagger types
+'''
+
+PARAMETER_TYPES = {'string': str,
+                   'boolean': bool,
+                   'number': (int, float)}
+
+
+def build_endpoints(api_specs):
+    """
+    Build the endpoints descriptions from the parsed REST API documentation. Each endpoint is available both with
+    and without the `/platform` prefix
+
+    Args:
+        api_specs (dict): swagger documentation
+
+    Returns:
+        dict: Endpoint by path
+    """
+    endpoints = {}
+    for p, data in api_specs['paths'].items():
+        p=p.split('{')[0]
+        if p[-1]== '/':
+            p=p[:-1]
+        parameters = {}
+        for method, method_data in data.items():
+            if 'parameters' in method_data:
+                params = {}
+                for par in method_data['parameters']:
+                    par_type = par.get('type', 'string')
+                    params[par['name']]=par_type
+                parameters[method] = params
+        endpoints[p] = Endpoint(p, tuple(sorted(data.keys())), parameters)
+        endpoints['/platform' + p] = Endpoint('/platform' + p, tuple(sorted(data.keys())), parameters)
+    return endpoints
+
+
+def compile_validators(endpoint_validation_data):
+    """
+    Turn the swagger type of each parameter into the python types accepted for it, so that validating a value
+    is a single ``isinstance`` call. Unsupported swagger types accept no value.
+
+    Args:
+        endpoint_validation_data (dict): swagger type by endpoint, method and parameter
+
+    Returns:
+        dict: tuple of python types by endpoint, method and parameter
+    """
+    return dict((endpoint, dict((method, dict((name, PARAMETER_TYPES.get(par_type, ()))
+                                              for name, par_type in params.items()))
+                                for method, params in methods.items()))
+                for endpoint, methods in endpoint_validation_data.items())
+
+
+_default_codec = JSONCodec()
+
+
 class Response(object):
     """
     Handler for responses coming from the api
     """
 
-    def __init__(self, response):
+    def __init__(self, response, codec=None, projection=None):
         """
 
         Args:
             response: a response coming from a requests call
-            content_type (str): content type of the response
+            codec (JSONCodec): codec used to decode the response. Defaults to the standard library
+            projection (Projection): fields to keep in the records, all if None
         """
         self._logger = logging.getLogger(__name__)
         try:
             # TODO parse from json just if content type allows it
-            parsed_response = response.json()
+            parsed_response = (codec or _default_codec).loads(response.content)
             if isinstance(parsed_response, dict):
                 if 'data' in parsed_response:
                     self.data = parsed_response['data']
                     del parsed_response['data']
                 else:
                     self.data = [parsed_response]
+                if projection is not None:
+                    self.data = [projection(d) for d in self.data]
                 if 'from' in parsed_response:
                     parsed_response['from_'] = parsed_response['from']
                     del parsed_response['from']
@@ -148,42 +363,259 @@ class Response(object):
             return len(self.data)
 
 
-class Connection(object):
+class StreamingResponse(object):
+    """
+    Handler for responses coming from the api, decoding the records of the `data` array incrementally while the
+    body is read from the socket. Only the records not consumed yet are held in memory.
+    Requires ijson.
+    """
+    _RENAMED = {'from': 'from_', 'next': 'next_'}
+
+    def __init__(self, response, projection=None):
+        """
+
+        Args:
+            response: a response coming from a requests call made with `stream=True`
+            projection (Projection): fields to keep in the records, all if None. The other fields are skipped
+                while decoding
+        """
+        if not ijson_available:
+            raise ImportError('ijson is required to stream responses. Install with `pip install ijson`')
+        response.raw.decode_content = True
+        self._response = response
+        self._events = ijson.parse(response.raw, use_float=True)
+        self._records = collections.deque()
+        self._has_data = False
+        self._done = False
+        self._fields = collections.OrderedDict()
+        self.info = addict.Dict()
+        self._headers = response.headers
+        self.projection = projection
+        self._accepted = {}
+
+    def _accepts(self, path):
+        """
+        Check if the value at a path of a record is selected by the projection, memoized by path
+        """
+        try:
+            return self._accepted[path]
+        except KeyError:
+            accepted = self._accepted[path] = self.projection.accepts(path)
+            return accepted
+
+    def _read_item(self):
+        """
+        Decode the body up to the end of the next record or metadata value
+        """
+        builder = None
+        for prefix, event, value in self._events:
+            if builder is None:
+                if prefix == '':
+                    if event in ('start_map', 'end_map', 'map_key'):
+                        continue
+                    # the body is not an object
+                    self._has_data = True
+                elif prefix == 'data' and event in ('start_array', 'end_array'):
+                    self._has_data = True
+                    continue
+                builder = ijson.ObjectBuilder()
+                key = prefix
+                depth = 0
+                project = self.projection is not None and key == 'data.item'
+                # ijson prefixes denote list elements by `item` keys, which real keys can be named too: track the
+                # current key of each open object and LIST_ITEM for each open list instead
+                path = []
+            if project:
+                if event == 'map_key':
+                    path[-1] = value
+                elif event in ('end_map', 'end_array'):
+                    path.pop()
+                accepted = self._accepts(tuple(path))
+                if event == 'start_map':
+                    path.append(None)
+                elif event == 'start_array':
+                    path.append(LIST_ITEM)
+            if not project or accepted:
+                builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+            if depth == 0:
+                if key == 'data.item':
+                    self._records.append(builder.value)
+                elif key == '':
+                    records = builder.value if isinstance(builder.value, list) else [builder.value]
+                    if self.projection is not None:
+                        records = [self.projection(d) for d in records]
+                    self._records.extend(records)
+                else:
+                    self._fields[key] = builder.value
+                    self.info[self._RENAMED.get(key, key)] = builder.value
+                return
+        self._done = True
+        if not self._has_data:
+            # single object responses are returned as the only record
+            record = dict(self._fields)
+            self._records.append(self.projection(record) if self.projection is not None else record)
+        self._response.close()
+
+    def get_info(self, key):
+        """
+        Get a metadata value, decoding the body until it is found. Records decoded meanwhile are kept in memory
+
+        Args:
+            key (str): metadata key, e.g. `total`
+
+        Returns:
+            the metadata value, None if the response does not have it
+        """
+        while key not in self.info and not self._done:
+            self._read_item()
+        return self.info.get(key)
+
+    def records(self):
+        """
+        Yield the records of the response as they are decoded
+
+        Returns:
+            iterator: the records
+        """
+        while True:
+            if self._records:
+                yield self._records.popleft()
+            elif self._done:
+                return
+            else:
+                self._read_item()
+
+    def close(self):
+        self._response.close()
+
+
+class BaseConnection(object):
     """
-    Handler for connection and calls to the Open Targets Validation Platform REST API
+    Transport independent logic shared by the synchronous and asynchronous connections: URL building,
+    parsing of the REST API documentation and parameter validation
     """
+
     def __init__(self,
                  host='https://api.opentargets.io',
                  port=443,
                  api_version='v3',
-                 verify = True,
-                 proxies = {}
+                 spec_cache_dir=DEFAULT_SPEC_CACHE_DIR,
+                 json_codec=None,
+                 hooks=None,
                  ):
         """
         Args:
             host (str): host serving the API
             port (int): port to use for connection to the API
             api_version (str): api version to point to, default to 'latest'
-            verify (bool): sets SSL verification for Request session, accepts True, False or a path to a certificate
+            spec_cache_dir (str): directory where the parsed REST API documentation is stored to be reused by
+                other connections to the same host and API version. None to disable
+            json_codec: JSON codec used to decode responses and encode exports, either a
+                ``opentargets.codec.JSONCodec`` or the name of one. Defaults to the fastest installed
+            hooks (dict): functions called around each request, as a list for each event, see
+                ``BaseConnection.add_hook``
         """
         self._logger = logging.getLogger(__name__)
+        self.codec = get_codec(json_codec)
         self.host = host
         self.port = str(port)
         self.api_version = api_version
-        session= requests.Session()
-        session.verify = verify
-        session.proxies = proxies
-        retry_policies = Retry(total=10,
-                               read=10,
-                               connect=10,
-                               backoff_factor=.5,
-                               status_forcelist=(500, 502, 504),)
-        http_retry = HTTPAdapter(max_retries=retry_policies)
-        session.mount(host, http_retry)
-        self.session = CacheControl(session)
-        self._get_remote_api_specs()
+        self.spec_cache_dir = os.path.expanduser(spec_cache_dir) if spec_cache_dir else None
+        self.remote_version = None
+        self.swagger_yaml = None
+        self._api_specs = None
+        self._endpoint_validation_data = None
+        self._endpoint_validators = None
+        self.metrics = RequestMetrics()
+        self.hooks = dict((event, []) for event in HOOK_EVENTS)
+        for event, functions in (hooks or {}).items():
+            for hook in functions:
+                self.add_hook(event, hook)
+
+    def add_hook(self, event, hook):
+        """
+        Call a function around each request to the REST API. The function takes a dict describing the request,
+        the same one for both events so that state can be kept in it between them. Before the request, for
+        `pre_request` hooks, it holds the `endpoint`, `method`, `url`, `params`, `data` and `headers`, which can
+        be modified. After the request, for `post_request` hooks, it also holds the `response` (None if the
+        request failed), its `status` and `size` in bytes (None if unknown, e.g. when streamed), the `elapsed`
+        seconds spent sending and reading, the number of `retries`, whether it came `from_cache` (None if not
+        cacheable), the number of `throttled` responses and `throttle_wait` seconds waited for the rate limiter,
+        and the `error` raised if any
+
+        Args:
+            event (str): `pre_request` or `post_request`
+            hook (callable): function taking the dict describing the request. Exceptions raised by hooks are
+                logged and ignored
+        Raises:
+            AttributeError: if the event is unknown
+        """
+        if event not in self.hooks:
+            raise AttributeError('unknown hook event {}, choose one of {}'.format(event, ', '.join(HOOK_EVENTS)))
+        self.hooks[event].append(hook)
+
+    def remove_hook(self, event, hook):
+        """
+        Stop calling a function added with ``BaseConnection.add_hook``
+        """
+        self.hooks[event].remove(hook)
+
+    def _dispatch_hooks(self, event, request):
+        for hook in self.hooks[event]:
+            try:
+                hook(request)
+            except Exception:
+                self._logger.exception('{} hook {} failed'.format(event, hook))
+
+    def _request_finished(self, request):
+        """
+        Record the metrics of a request and call the `post_request` hooks
+        """
+        self.metrics.record(request)
+        self._dispatch_hooks('post_request', request)
+
+    def stats(self):
+        """
+        Snapshot of the metrics of the requests made by the connection, see ``opentargets.metrics`` to export them
+
+        Returns:
+            dict: for each endpoint the number of requests, errors, responses by status, retries, cache hits and
+            misses, throttled responses and seconds waited for the rate limiter, bytes downloaded, and histograms
+            of the latencies and response sizes. Also the statistics of the rate limiter and of the cache, if any
+        """
+        stats = self.metrics.snapshot()
+        rate_limiter = getattr(self, 'rate_limiter', None)
+        if rate_limiter is not None:
+            stats['rate_limiter'] = rate_limiter.stats()
+        cache = getattr(self, 'cache', None)
+        if hasattr(cache, 'stats'):
+            stats['cache'] = cache.stats()
+        return stats
+
+    def _throttle_exhausted(self, request):
+        """
+        Check if a request answered with a 429 status has been sent again `max_throttle_retries` times, or has
+        waited `max_throttle_wait` seconds for the rate limiter, so that the error has to be raised
 
+        Args:
+            request (dict): the request, as passed to the hooks
 
+        Returns:
+            bool: True if the request must not be sent again
+        """
+        if self.max_throttle_retries is not None and request['throttled'] >= self.max_throttle_retries:
+            exhausted = '{} retries'.format(request['throttled'])
+        elif self.max_throttle_wait is not None and request['throttle_wait'] >= self.max_throttle_wait:
+            exhausted = '{:.1f}s of waiting'.format(request['throttle_wait'])
+        else:
+            return False
+        self._logger.warning('usage limit still exceeded for {} after {}, giving up'.format(request['url'],
+                                                                                         exhausted))
+        return True
 
     def _build_url(self, endpoint):
         url = '{}:{}/{}{}'.format(self.host,
@@ -192,6 +624,9 @@ class Connection(object):
                                        endpoint,)
         return url
 
+    def _build_swagger_url(self):
+        return self.host+':'+self.port+'/v%s/platform/swagger'%API_MAJOR_VERSION
+
     @staticmethod
     def _auto_detect_post(params):
         """
@@ -211,106 +646,146 @@ class Connection(object):
                         return True
         return False
 
-    def get(self, endpoint, params=None):
+    @staticmethod
+    def _sort_params(params):
+        'order params to allow efficient caching'
+        if params:
+            if isinstance(params, dict):
+                params = sorted(params.items())
+            else:
+                params = sorted(params)
+        return params
+
+    @staticmethod
+    def _get_headers(headers=None):
+        headers = dict(headers) if headers else {}
+        headers['User-agent'] = 'Open Targets Python Client/%s' % str(__version__)
+        return headers
+
+    @property
+    def api_specs(self):
         """
-        makes a GET request
-        Args:
-            endpoint (str): REST API endpoint to call
-            params (dict): request payload
+        REST API documentation, fetched and parsed on first access
+        """
+        if self._api_specs is None:
+            if self.swagger_yaml is None:
+                self._load_api_specs()
+            if self._api_specs is None:
+                self._api_specs = yaml.safe_load(self.swagger_yaml)
+        return self._api_specs
+
+    @property
+    def endpoint_validation_data(self):
+        """
+        Parameters accepted by each endpoint and method, built from the REST API documentation on first access
+        """
+        if self._endpoint_validation_data is None:
+            self._load_api_specs()
+        return self._endpoint_validation_data
 
-        Returns:
-            Response: request response
+    def _load_api_specs(self):
         """
-        if self._auto_detect_post(params):
-            self._logger.debug('switching to POST due to big size of params')
-            return self.post(endpoint, data=params)
-        return Response(self._make_request(endpoint,
-                              params=params,
-                              method='GET'))
+        Load the REST API documentation, implemented by subclasses
+        """
+        raise NotImplementedError()
 
-    def post(self, endpoint, data=None):
+    def _parse_remote_api_specs(self, swagger_yaml):
         """
-        makes a POST request
-        Args:
-            endpoint (str): REST API endpoint to call
-            data (dict): request payload
+        Parse the REST API documentation and build the data used for parameter validation
 
-        Returns:
-            Response: request response
+        Args:
+            swagger_yaml (str): swagger documentation in YAML format
         """
-        return Response(self._make_request(endpoint,
-                               data=data,
-                               method='POST'))
+        self.swagger_yaml = swagger_yaml
+        self._api_specs = yaml.safe_load(self.swagger_yaml)
+        self._set_endpoint_validation_data(dict((path, endpoint.parameters)
+                                                for path, endpoint in build_endpoints(self._api_specs).items()))
 
-    def _make_request(self,
-                      endpoint,
-                      params = None,
-                      data = None,
-                      method = HTTPMethods.GET,
-                      headers = {},
-                      rate_limit_fail = False,
-                      **kwargs):
+    def _set_endpoint_validation_data(self, endpoint_validation_data):
+        self._endpoint_validation_data = endpoint_validation_data
+        self._endpoint_validators = compile_validators(endpoint_validation_data)
+
+    def _load_bundled_specs(self, remote_version):
         """
-        Makes a request to the REST API
+        Load the REST API documentation from the endpoint bindings generated by ``opentargets.specgen``, if
+        they have been generated for the same remote data version
+
         Args:
-            endpoint (str): endpoint of the REST API
-            params (dict): payload for GET request
-            data (dict): payload for POST request
-            method (HTTPMethods): request method, either HTTPMethods.GET or HTTPMethods.POST. Defaults to HTTPMethods.GET
-            headers (dict): HTTP headers for the request
-            rate_limit_fail (bool): If True raise exception when usage limit is exceeded. If False wait and
-                retry the request. Defaults to False.
-        Keyword Args:
-            **kwargs: forwarded to requests
+            remote_version: version returned by the REST API
 
         Returns:
-            a response from requests
+            bool: True if the bindings were used
         """
+        try:
+            from opentargets import _endpoints
+        except ImportError:
+            return False
+        if str(_endpoints.REMOTE_VERSION) != str(remote_version) or _endpoints.API_VERSION != self.api_version:
+            self._logger.debug('generated endpoint bindings are for version {}, remote version is {}'.format(
+                _endpoints.REMOTE_VERSION, remote_version))
+            return False
+        self.swagger_yaml = _endpoints.SWAGGER_YAML
+        self._endpoint_validation_data = _endpoints.ENDPOINT_VALIDATION_DATA
+        self._endpoint_validators = _endpoints.VALIDATORS
+        return True
+
+    def _get_spec_cache_path(self, remote_version):
+        key = '{}:{}/{}@{}'.format(self.host, self.port, self.api_version, remote_version)
+        return os.path.join(self.spec_cache_dir,
+                            'api_specs_{}.json'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+    def _read_spec_cache(self, remote_version):
+        """
+        Load the REST API documentation stored by a previous connection to the same host, API version and
+        remote data version
 
+        Args:
+            remote_version: version returned by the REST API
 
-        'order params to allow efficient caching'
-        if params:
-            if isinstance(params, dict):
-                params = sorted(params.items())
-            else:
-                params = sorted(params)
-
-        headers['User-agent'] = 'Open Targets Python Client/%s' % str(__version__)
-        response = self.session.request(method,
-                                    self._build_url(endpoint),
-                                    params=params,
-                                    json=data,
-                                    headers=headers,
-                                    **kwargs)
+        Returns:
+            bool: True if the documentation was found
+        """
+        if not self.spec_cache_dir:
+            return False
+        try:
+            with open(self._get_spec_cache_path(remote_version)) as fh:
+                cached = json.load(fh)
+            self.swagger_yaml = cached['swagger_yaml']
+            self._set_endpoint_validation_data(cached['endpoint_validation_data'])
+            self._logger.debug('loaded REST API documentation from {}'.format(fh.name))
+            return True
+        except (IOError, OSError, ValueError, KeyError):
+            return False
 
-        response.raise_for_status()
-        return response
+    def _write_spec_cache(self, remote_version):
+        """
+        Store the REST API documentation to be reused by other connections. The file is written atomically so
+        that concurrent processes never read a partial file
 
-    def _get_remote_api_specs(self):
+        Args:
+            remote_version: version returned by the REST API
         """
-        Fetch and parse REST API documentation
+        if not self.spec_cache_dir:
+            return
+        try:
+            if not os.path.isdir(self.spec_cache_dir):
+                os.makedirs(self.spec_cache_dir)
+            with tempfile.NamedTemporaryFile('w', dir=self.spec_cache_dir, suffix='.tmp', delete=False) as fh:
+                json.dump(dict(swagger_yaml=self.swagger_yaml,
+                               endpoint_validation_data=self._endpoint_validation_data), fh)
+            os.rename(fh.name, self._get_spec_cache_path(remote_version))
+        except (IOError, OSError) as e:
+            self._logger.debug('cannot store REST API documentation: {}'.format(e))
+
+    def _check_remote_version(self, remote_version):
         """
-        r= self.session.get(self.host+':'+self.port+'/v%s/platform/swagger'%API_MAJOR_VERSION)
-        r.raise_for_status()
-        self.swagger_yaml = r.text
-        self.api_specs = yaml.load(self.swagger_yaml)
-        self.endpoint_validation_data={}
-        for p, data in self.api_specs['paths'].items():
-            p=p.split('{')[0]
-            if p[-1]== '/':
-                p=p[:-1]
-            self.endpoint_validation_data[p] = {}
-            self.endpoint_validation_data['/platform' + p] = {}
-            for method, method_data in data.items():
-                if 'parameters' in method_data:
-                    params = {}
-                    for par in method_data['parameters']:
-                        par_type = par.get('type', 'string')
-                        params[par['name']]=par_type
-                    self.endpoint_validation_data[p][method] = params
-                    self.endpoint_validation_data['/platform' + p][method] = params
-
-        remote_version = self.get('/platform/public/utils/version').data
+        Store the version of the remote API and log a warning if its major version is not the one expected by
+        the client
+
+        Args:
+            remote_version: version returned by the REST API
+        """
+        self.remote_version = remote_version
         # TODO because content type wasnt checked proerly a float
         # was returned instead a proper version string
         if not str(remote_version).startswith(API_MAJOR_VERSION):
@@ -330,14 +805,11 @@ class Connection(object):
 
         """
 
-        endpoint_data = self.endpoint_validation_data[endpoint][method]
-        if filter_type in endpoint_data:
-            if endpoint_data[filter_type] == 'string' and isinstance(value, str):
-                return
-            elif endpoint_data[filter_type] == 'boolean' and isinstance(value, bool):
-                return
-            elif endpoint_data[filter_type] == 'number' and isinstance(value, (int, float)):
-                return
+        if self._endpoint_validators is None:
+            self._load_api_specs()
+        endpoint_validators = self._endpoint_validators[endpoint][method]
+        if filter_type in endpoint_validators and isinstance(value, endpoint_validators[filter_type]):
+            return
 
         raise AttributeError('{}={} is not a valid parameter for endpoint {}'.format(filter_type, value, endpoint))
 
@@ -362,61 +834,513 @@ class Connection(object):
         """
         return self.api_specs['paths'].keys()
 
-    def close(self):
-        """
-        Close connection to the REST API
+    def supports_method(self, endpoint, method):
         """
-        self.session.close()
+        Check if the REST API documentation lists a method for an endpoint
+
+        Args:
+            endpoint (str): endpoint path, with or without the `/platform` prefix
+            method (HTTPMethods): request method, either HTTPMethods.GET or HTTPMethods.POST
 
-    def ping(self):
-        """
-        Pings the API as a live check
         Returns:
-            bool: True if pinging the raw response as a ``str`` if the API has a non standard name
+            bool: True if the endpoint accepts the method
         """
-        response = self.get('/platform/public/utils/ping')
-        if response.data=='pong':
-            return True
-        elif response.data:
-            return response.data
+        if endpoint.startswith('/platform/'):
+            endpoint = endpoint[len('/platform'):]
+        endpoint = endpoint.rstrip('/')
+        for path in (endpoint, endpoint + '/'):
+            if method.lower() in self.api_specs['paths'].get(path, {}):
+                return True
         return False
 
-@implements_iterator
-class IterableResult(object):
-    '''
-    Proxy over the Connection class that allows to iterate over all the items returned from a quer.
-    It will automatically handle making multiple calls for pagination if needed.
-    '''
-    def __init__(self, conn, method = HTTPMethods.GET):
+    def supports_parameter(self, endpoint, parameter, method=HTTPMethods.GET):
         """
-        Requires a Connection
+        Check if the REST API documentation lists a parameter for an endpoint
+
         Args:
-            conn (Connection): a Connection instance
-            method (HTTPMethods): HTTP method to use for the calls
+            endpoint (str): endpoint of the REST API
+            parameter (str): name of the parameter, e.g. `fields`
+            method (HTTPMethods): request method, either HTTPMethods.GET or HTTPMethods.POST
+
+        Returns:
+            bool: True if the endpoint accepts the parameter
         """
-        self.conn = conn
-        self.method = method
-        self._search_after_last = None
+        if self._endpoint_validators is None:
+            self._load_api_specs()
+        return parameter in self._endpoint_validators.get(endpoint, {}).get(method, {})
 
-    def __call__(self, *args, **kwargs):
+
+class Connection(BaseConnection):
+    """
+    Handler for connection and calls to the Open Targets Validation Platform REST API.
+    A Connection is thread safe and can be shared by many threads, each IterableResult should be consumed by a
+    single thread. Size the connection pool to the number of threads making requests at the same time.
+    """
+    def __init__(self,
+                 host='https://api.opentargets.io',
+                 port=443,
+                 api_version='v3',
+                 verify = True,
+                 proxies = {},
+                 cache = None,
+                 cache_max_entries = 10000,
+                 cache_max_bytes = 128 * 1024 * 1024,
+                 cache_ttl = None,
+                 spec_cache_dir = DEFAULT_SPEC_CACHE_DIR,
+                 pool_connections = 10,
+                 pool_maxsize = 10,
+                 pool_block = False,
+                 keep_alive = True,
+                 rate_limit = None,
+                 rate_limit_fail = False,
+                 max_throttle_retries = 10,
+                 max_throttle_wait = 600,
+                 filter_chunk_size = 1000,
+                 filter_chunk_workers = 1,
+                 json_codec = None,
+                 hooks = None,
+                 version_ttl = 3600
+                 ):
         """
-        Allows to set parameters for calls to the REST API
         Args:
-            *args: stored internally
-        Keyword Args:
-            **kwargs: stored internally
+            host (str): host serving the API
+            port (int): port to use for connection to the API
+            api_version (str): api version to point to, default to 'latest'
+            verify (bool): sets SSL verification for Request session, accepts True, False or a path to a certificate
+            cache: cache for the HTTP responses, either a ``cachecontrol`` cache instance or the path of a
+                ``opentargets.cache.SQLiteCache`` file shared across processes. Defaults to an in memory
+                ``opentargets.cache.LRUCache``
+            cache_max_entries (int): maximum number of responses kept by the default in memory cache
+            cache_max_bytes (int): maximum size in bytes of the responses kept by the default in memory cache
+            cache_ttl (float): seconds after which a response expires from the default in memory cache
+            spec_cache_dir (str): directory where the parsed REST API documentation is stored to be reused by
+                other connections to the same host and API version. None to disable
+            pool_connections (int): number of connection pools to cache, one for each host
+            pool_maxsize (int): maximum number of connections to the REST API kept open for reuse. Should be at
+                least the number of threads sharing the connection
+            pool_block (bool): if True, threads wait for a connection to be free when `pool_maxsize` connections
+                are in use, instead of opening a new connection that is discarded after the request
+            keep_alive (bool): if True connections are kept open and reused among requests
+            rate_limit: maximum number of requests per second, or a ``opentargets.ratelimit.RateLimiter`` to share
+                among connections. The rate is adapted to the usage limits and 429 responses of the REST API.
+                Defaults to no limit until the REST API signals one
+            rate_limit_fail (bool): If True raise exception when usage limit is exceeded. If False wait and
+                retry the request. Defaults to False.
+            max_throttle_retries (int): maximum number of times a request answered with a 429 status is sent
+                again, before raising the error of the last response. None for no limit
+            max_throttle_wait (float): maximum seconds waited for the rate limiter by a request answered with a
+                429 status, before raising the error of the last response. None for no limit
+            filter_chunk_size (int): maximum number of values sent for a filter in a single query. Queries
+                filtering by more values are run as one query for each chunk of values, see
+                ``opentargets.conn.ChunkedResult``. None to disable
+            filter_chunk_workers (int): number of chunk queries fetched at the same time
+            json_codec: JSON codec used to decode responses and encode exports, either a
+                ``opentargets.codec.JSONCodec`` or the name of one (`orjson`, `ujson`, `simdjson`, `json`).
+                Defaults to the fastest installed
+            hooks (dict): functions called before and after each request, as a list for each of the
+                `pre_request` and `post_request` events, see ``BaseConnection.add_hook``
+            version_ttl (float): seconds after which the data release served by the REST API is checked again,
+                switching the namespace of the cache when it changes. None to check it only once
+        """
+        super(Connection, self).__init__(host=host,
+                                         port=port,
+                                         api_version=api_version,
+                                         spec_cache_dir=spec_cache_dir,
+                                         json_codec=json_codec,
+                                         hooks=hooks)
+        self._specs_lock = threading.RLock()
+        self.version_ttl = version_ttl
+        self._version_checked = None
+        if cache is None:
+            cache = LRUCache(max_entries=cache_max_entries,
+                             max_bytes=cache_max_bytes,
+                             ttl=cache_ttl)
+        elif isinstance(cache, string_types):
+            cache = SQLiteCache(cache)
+        self.cache = cache
+        if isinstance(rate_limit, RateLimiter):
+            self.rate_limiter = rate_limit
+        else:
+            self.rate_limiter = RateLimiter(rate=rate_limit)
+        self.rate_limit_fail = rate_limit_fail
+        self.max_throttle_retries = max_throttle_retries
+        self.max_throttle_wait = max_throttle_wait
+        self.filter_chunk_size = filter_chunk_size
+        self.filter_chunk_workers = filter_chunk_workers
+        session= requests.Session()
+        session.verify = verify
+        session.proxies = proxies
+        retry_policies = _Retry(total=10,
+                                read=10,
+                                connect=10,
+                                backoff_factor=.5,
+                                status_forcelist=(500, 502, 504))
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        http_adapter = CacheControlAdapter(cache=self.cache,
+                                           max_retries=retry_policies,
+                                           pool_connections=pool_connections,
+                                           pool_maxsize=pool_maxsize,
+                                           pool_block=pool_block)
+        session.mount(host, http_adapter)
+        self.session = session
+        # streamed responses bypass the cache, which would hold the whole body in memory
+        stream_session = requests.Session()
+        stream_session.verify = verify
+        stream_session.proxies = proxies
+        stream_session.headers.update(session.headers)
+        stream_session.mount(host, requests.adapters.HTTPAdapter(max_retries=retry_policies,
+                                                                 pool_connections=pool_connections,
+                                                                 pool_maxsize=pool_maxsize,
+                                                                 pool_block=pool_block))
+        self.stream_session = stream_session
+
+    def get(self, endpoint, params=None, stream=False, projection=None):
+        """
+        makes a GET request
+        Args:
+            endpoint (str): REST API endpoint to call
+            params (dict): request payload
+            stream (bool): if True the records are decoded while the response is read. Requires ijson
+            projection (Projection): fields to keep in the records, all if None
+
+        Returns:
+            Response: request response, a StreamingResponse if `stream` is True
+        """
+        if self._auto_detect_post(params):
+            self._logger.debug('switching to POST due to big size of params')
+            return self.post(endpoint, data=params, stream=stream, projection=projection)
+        if stream:
+            return StreamingResponse(self._make_request(endpoint,
+                                                        params=params,
+                                                        method='GET',
+                                                        stream=True), projection=projection)
+        return Response(self._make_request(endpoint,
+                              params=params,
+                              method='GET'), codec=self.codec, projection=projection)
+
+    def post(self, endpoint, data=None, stream=False, projection=None):
+        """
+        makes a POST request
+        Args:
+            endpoint (str): REST API endpoint to call
+            data (dict): request payload
+            stream (bool): if True the records are decoded while the response is read. Requires ijson
+            projection (Projection): fields to keep in the records, all if None
+
+        Returns:
+            Response: request response, a StreamingResponse if `stream` is True
+        """
+        if stream:
+            return StreamingResponse(self._make_request(endpoint,
+                                                        data=data,
+                                                        method='POST',
+                                                        stream=True), projection=projection)
+        return Response(self._make_request(endpoint,
+                               data=data,
+                               method='POST'), codec=self.codec, projection=projection)
+
+    def _make_request(self,
+                      endpoint,
+                      params = None,
+                      data = None,
+                      method = HTTPMethods.GET,
+                      headers = None,
+                      rate_limit_fail = None,
+                      **kwargs):
+        """
+        Makes a request to the REST API
+        Args:
+            endpoint (str): endpoint of the REST API
+            params (dict): payload for GET request
+            data (dict): payload for POST request
+            method (HTTPMethods): request method, either HTTPMethods.GET or HTTPMethods.POST. Defaults to HTTPMethods.GET
+            headers (dict): HTTP headers for the request
+            rate_limit_fail (bool): If True raise exception when usage limit is exceeded. If False wait and
+                retry the request. Defaults to the value set for the connection.
+        Keyword Args:
+            **kwargs: forwarded to requests
+
+        Returns:
+            a response from requests
+        """
+
+        if hasattr(self.cache, 'set_namespace') and self._version_expired():
+            # the cache is namespaced by data release, which has to be known and current before using it
+            self._get_remote_version()
+        if rate_limit_fail is None:
+            rate_limit_fail = self.rate_limit_fail
+        stream = bool(kwargs.get('stream'))
+        session = self.stream_session if stream else self.session
+        request = dict(endpoint=endpoint,
+                       method=method,
+                       url=self._build_url(endpoint),
+                       params=self._sort_params(params),
+                       data=data,
+                       headers=self._get_headers(headers))
+        self._dispatch_hooks('pre_request', request)
+        request.update(response=None, status=None, size=None, elapsed=0., retries=0, from_cache=None,
+                       throttled=0, throttle_wait=0., error=None)
+        try:
+            while True:
+                request['throttle_wait'] += self.rate_limiter.acquire()
+                start = time.time()
+                response = session.request(request['method'],
+                                           request['url'],
+                                           params=request['params'],
+                                           json=request['data'],
+                                           headers=request['headers'],
+                                           **kwargs)
+                request['elapsed'] += time.time() - start
+                if getattr(response, 'from_cache', False):
+                    self.rate_limiter.release()
+                else:
+                    self.rate_limiter.update(response.status_code, response.headers)
+                if response.status_code != 429 or rate_limit_fail or self._throttle_exhausted(request):
+                    break
+                request['throttled'] += 1
+        except Exception as e:
+            request['error'] = e
+            self._request_finished(request)
+            raise
+        request.update(self._describe_response(response, stream))
+        self._request_finished(request)
+
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _describe_response(response, stream=False):
+        """
+        Returns:
+            dict: the response, its status, size, number of retries and whether it came from the cache
+        """
+        if stream:
+            size = response.headers.get('Content-Length')
+            size = int(size) if size and size.isdigit() else None
+        else:
+            size = len(response.content)
+        history = getattr(getattr(response.raw, 'retries', None), 'history', None)
+        return dict(response=response,
+                    status=response.status_code,
+                    size=size,
+                    retries=len(history) if history else 0,
+                    from_cache=getattr(response, 'from_cache', None))
+
+    def _version_expired(self):
+        """
+        Returns:
+            bool: True if the data release served by the REST API is unknown or was checked more than
+            `version_ttl` seconds ago
+        """
+        if self.remote_version is None:
+            return True
+        return self.version_ttl is not None and time.time() - self._version_checked > self.version_ttl
+
+    def _get_remote_version(self):
+        """
+        Fetch the version of the data served by the REST API, and use it as namespace for the cache if supported.
+        The version is fetched again after `version_ttl` seconds, so that a long lived connection notices a new
+        data release
+
+        Returns:
+            version of the REST API
+        """
+        with self._specs_lock:
+            if self._version_expired():
+                r = self.session.get(self._build_url('/platform/public/utils/version'),
+                                     headers=self._get_headers({'Cache-Control': 'no-cache'}))
+                r.raise_for_status()
+                previous_version = self.remote_version
+                self._check_remote_version(Response(r, codec=self.codec).data)
+                self._version_checked = time.time()
+                if previous_version is not None and str(previous_version) != str(self.remote_version):
+                    self._logger.info('the REST API now serves data release {} instead of {}'.format(
+                        self.remote_version, previous_version))
+                if hasattr(self.cache, 'set_namespace'):
+                    self.cache.set_namespace(self.remote_version)
+            return self.remote_version
+
+    def _load_api_specs(self):
+        """
+        Load the REST API documentation from the generated bindings or the local cache, or fetch and parse it if
+        they are not available for the remote version
+        """
+        with self._specs_lock:
+            if self._endpoint_validation_data is None:
+                remote_version = self._get_remote_version()
+                if not (self._load_bundled_specs(remote_version) or self._read_spec_cache(remote_version)):
+                    self._get_remote_api_specs()
+                    self._write_spec_cache(remote_version)
+
+    def _get_remote_api_specs(self):
+        """
+        Fetch and parse REST API documentation
+        """
+        r= self.session.get(self._build_swagger_url())
+        r.raise_for_status()
+        self._parse_remote_api_specs(r.text)
+
+    def close(self):
+        """
+        Close connection to the REST API
+        """
+        self.session.close()
+        self.stream_session.close()
+        self.cache.close()
+
+    def ping(self):
+        """
+        Pings the API as a live check
+        Returns:
+            bool: True if pinging the raw response as a ``str`` if the API has a non standard name
+        """
+        response = self.get('/platform/public/utils/ping')
+        if response.data=='pong':
+            return True
+        elif response.data:
+            return response.data
+        return False
+
+def _prefetch_pages(result_ref, pages, stop):
+    """
+    Fetch the following pages of an IterableResult and put them in a bounded queue. Runs in a background thread.
+    Only a weak reference to the IterableResult is kept while waiting for the queue to have room, so that the
+    thread stops if the result is discarded before being fully consumed.
+
+    Args:
+        result_ref (weakref.ref): weak reference to the IterableResult
+        pages (Queue): queue where (page, exception) tuples are put
+        stop (threading.Event): set when the prefetching has to stop
+    """
+    while not stop.is_set():
+        result = result_ref()
+        if result is None:
+            return
+        try:
+            page, error = result._fetch_page(), None
+            done = not page.data or result._fetched >= result.total
+        except Exception as e:
+            page, error, done = None, e, True
+        del result
+        while not stop.is_set():
+            try:
+                pages.put((page, error), timeout=.1)
+                break
+            except Full:
+                if result_ref() is None:
+                    return
+        if done:
+            return
+
+
+def _fetch_partition(partition, pages, stop):
+    """
+    Fetch all the pages of a partition and put them in a bounded queue. Runs in a worker thread.
+
+    Args:
+        partition (IterableResult): the partition to fetch
+        pages (Queue): queue where (page, exception) tuples are put, a None page flags the end of the partition
+        stop (threading.Event): set when the fetching has to stop
+    """
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    try:
+        for page in partition._iter_pages():
+            if not put((page, None)):
+                return
+        put((None, None))
+    except Exception as e:
+        put((None, e))
+
+
+@implements_iterator
+class IterableResult(object):
+    '''
+    Proxy over the Connection class that allows to iterate over all the items returned from a quer.
+    It will automatically handle making multiple calls for pagination if needed, and split filters with more
+    values than ``Connection.filter_chunk_size`` in multiple queries.
+    '''
+    _chunkable = True
+    _resumable = True
+
+    def __init__(self, conn, method = HTTPMethods.GET, prefetch = 0, stream = False):
+        """
+        Requires a Connection
+        Args:
+            conn (Connection): a Connection instance
+            method (HTTPMethods): HTTP method to use for the calls
+            prefetch (int): number of pages to fetch in a background thread while the current one is consumed.
+                At most `prefetch` pages are kept in memory on top of the current one. Defaults to 0 (disabled)
+            stream (bool): if True each page is decoded while it is read from the socket, and results are
+                returned as soon as they are decoded instead of holding the whole page in memory. Requires ijson.
+                Cannot be used with `prefetch`
+        Raises:
+            AttributeError: if both `prefetch` and `stream` are set
+        """
+        if prefetch and stream:
+            raise AttributeError('pages cannot be prefetched when they are streamed')
+        self.conn = conn
+        self.method = method
+        self.prefetch = prefetch
+        self.stream = stream
+        self._streamed = None
+        self._records = None
+        self._search_after_last = None
+        self._consumed_cursor = None
+        self._prefetcher = None
+        self._chunked = None
+        self._projection = None
+        self._profile = NULL_PROFILE
+
+    def __call__(self, *args, **kwargs):
+        """
+        Allows to set parameters for calls to the REST API
+        Args:
+            *args: stored internally
+        Keyword Args:
+            **kwargs: stored internally. The `fields` to return are sent to the REST API if the endpoint supports
+                them, otherwise they are selected while the results are decoded
 
         Returns:
             IterableResult: returns itself
         """
+        self._stop_prefetch()
         self._args = args
         self._kwargs = kwargs
+        self._chunked = None
+        self._records = None
+        self._projection = self._get_projection()
+        chunk_by = self._get_chunked_filter(kwargs)
+        if chunk_by is not None:
+            self._chunked = ChunkedResult(self.conn,
+                                          self.method,
+                                          chunk_by=chunk_by,
+                                          chunk_size=self.conn.filter_chunk_size,
+                                          workers=self.conn.filter_chunk_workers)
+            self._chunked(*args, **kwargs)
+            self.info = self._chunked.info
+            self._data = []
+            self.current = 0
+            self._fetched = 0
+            self.total = self._chunked.total
+            return self
         response = self._make_call()
+        if self.stream:
+            return self._start_stream(response)
         self.info = response.info
         self._data = response.data
         if 'next_' in response.info:
             self._search_after_last = response.info.next_
         self.current = 0
+        self._fetched = len(self._data)
         try:
             self.total = int(self.info.total)
             if 'size' in self.info and  'size' not in self._kwargs:
@@ -426,6 +1350,66 @@ class IterableResult(object):
         finally:
             return self
 
+    def _start_stream(self, response):
+        """
+        Start iterating over the records of a streamed first page. Only the records preceding `total` in the
+        response are decoded, most responses send it first.
+
+        Args:
+            response (StreamingResponse): first page of the query
+
+        Returns:
+            IterableResult: returns itself
+        """
+        self._streamed = response
+        self._records = response.records()
+        self._data = []
+        self.current = 0
+        self._fetched = 0
+        total = response.get_info('total')
+        if total is None:
+            # not paginated, the whole response is needed to count the results
+            records = list(self._records)
+            self._records = iter(records)
+            total = len(records)
+        self.info = response.info
+        self.total = int(total)
+        return self
+
+    def _next_streamed(self):
+        """
+        Get the next streamed result, fetching the next page when the current one is over
+        """
+        new_page = False
+        while True:
+            for d in self._records:
+                self._fetched += 1
+                return d
+            if new_page or self._fetched >= self.total:
+                raise StopIteration
+            if 'next_' in self._streamed.info:
+                self._search_after_last = self._streamed.info.next_
+            self._streamed = self._fetch_page()
+            self._records = self._streamed.records()
+            new_page = True
+
+    def _get_chunked_filter(self, kwargs):
+        """
+        Find the filter to split in chunks, the one with most values above ``Connection.filter_chunk_size``
+
+        Returns:
+            str: name of the filter, None if the query does not need to be split
+        """
+        chunk_size = getattr(self.conn, 'filter_chunk_size', None)
+        if not self._chunkable or not chunk_size:
+            return None
+        chunk_by = None
+        for k, v in kwargs.items():
+            if isinstance(v, (list, tuple)) and len(v) > chunk_size:
+                if chunk_by is None or len(v) > len(kwargs[chunk_by]):
+                    chunk_by = k
+        return chunk_by
+
     def filter(self, **kwargs):
         """
         Applies a set of filters to the current query
@@ -450,31 +1434,70 @@ class IterableResult(object):
         Raises:
             AttributeError: if HTTP method is not supported
         """
-        if self.method == HTTPMethods.GET:
-            return self.conn.get(*(self._args), params=self._kwargs)
-        elif self.method == HTTPMethods.POST:
-            return self.conn.post(*self._args, data=self._kwargs)
-        else:
-            raise AttributeError("HTTP method {} is not supported".format(self.method))
+        params = self._kwargs
+        if self._projection is not None:
+            params = dict((k, v) for k, v in params.items() if k != 'fields')
+        with self._profile.request() as timer:
+            if self.method == HTTPMethods.GET:
+                response = self.conn.get(*(self._args), params=params, stream=self.stream,
+                                         projection=self._projection)
+            elif self.method == HTTPMethods.POST:
+                response = self.conn.post(*self._args, data=params, stream=self.stream, projection=self._projection)
+            else:
+                raise AttributeError("HTTP method {} is not supported".format(self.method))
+            if not self.stream:
+                timer.items = len(response.data)
+        return response
+
+    def _get_projection(self):
+        """
+        Get the projection selecting the `fields` of the query on the client side, for endpoints not supporting
+        the `fields` parameter
+
+        Returns:
+            Projection: the projection, None if all the fields are returned or the REST API selects them
+        """
+        fields = self._kwargs.get('fields')
+        if not fields or not self._args or self.conn.supports_parameter(self._args[0], 'fields', self.method):
+            return None
+        return Projection(fields)
+
+    def select_fields(self, fields):
+        """
+        Return only some fields of the results not fetched yet. The fields are sent to the REST API if the
+        endpoint supports them, otherwise they are selected while the results are decoded. Does nothing if
+        fields were already selected for the query
+
+        Args:
+            fields (list): paths of the fields, e.g. `['target.id', 'association_score.*']`
+
+        Returns:
+            IterableResult: returns itself
+        """
+        if fields and not self._kwargs.get('fields') and self._chunked is None:
+            self._kwargs['fields'] = list(fields)
+            self._projection = self._get_projection()
+        return self
 
     def __iter__(self):
         return self
 
     def __next__(self):
+        if self._chunked is not None:
+            d = next(self._chunked)
+            self.current += 1
+            return d
+        if self._records is not None:
+            if self.current >= self.total:
+                raise StopIteration()
+            d = self._next_streamed()
+            self.current += 1
+            return d
         if self.current < self.total:
             if not self._data:
-                if self._search_after_last:
-                    self._kwargs['from'] = 0
-                    self._kwargs['next'] = self._search_after_last
-                else:
-                    self._kwargs['from'] = self.current
-                self._kwargs['no_cache']='true'
-                self._kwargs['size'] = 1000
-                call_output = self._make_call()
+                call_output = self._next_page()
                 if not call_output.data:
                     raise StopIteration
-                if 'next_' in call_output.info:
-                    self._search_after_last = call_output.info.next_
                 self._data = call_output.data
             d = self._data.pop(0)
             self.current+=1
@@ -482,6 +1505,163 @@ class IterableResult(object):
         else:
             raise StopIteration()
 
+    def _fetch_page(self):
+        """
+        Fetch the page following the last one fetched
+
+        Returns:
+            Response: response for the page
+        """
+        if self._search_after_last:
+            self._kwargs['from'] = 0
+            self._kwargs['next'] = self._search_after_last
+        else:
+            self._kwargs['from'] = self._fetched
+        self._kwargs['no_cache']='true'
+        self._kwargs['size'] = 1000
+        call_output = self._make_call()
+        if self.stream:
+            return call_output
+        if 'next_' in call_output.info:
+            self._search_after_last = call_output.info.next_
+        self._fetched += len(call_output.data)
+        return call_output
+
+    def _next_page(self):
+        """
+        Get the next page, from the background thread if prefetching is enabled
+
+        Returns:
+            Response: response for the page
+        """
+        if not self.prefetch:
+            return self._fetch_page()
+        if self._prefetcher is None:
+            pages = Queue(maxsize=self.prefetch)
+            stop = threading.Event()
+            thread = threading.Thread(target=_prefetch_pages,
+                                      args=(weakref.ref(self), pages, stop),
+                                      name='opentargets-prefetch')
+            thread.daemon = True
+            self._prefetcher = (thread, pages, stop)
+            thread.start()
+        thread, pages, stop = self._prefetcher
+        while True:
+            try:
+                page, error = pages.get(timeout=.1)
+                break
+            except Empty:
+                if not thread.is_alive() and pages.empty():
+                    # the background thread is over, keep fetching in the foreground
+                    self._prefetcher = None
+                    return self._fetch_page()
+        if error is not None:
+            self._stop_prefetch()
+            raise error
+        return page
+
+    def _stop_prefetch(self):
+        """
+        Stop the background thread fetching pages, if any, and drop the pages already fetched
+        """
+        if self._prefetcher is not None:
+            thread, pages, stop = self._prefetcher
+            stop.set()
+            if thread is not threading.current_thread():
+                thread.join()
+            self._prefetcher = None
+
+    def __del__(self):
+        try:
+            if self._prefetcher is not None:
+                self._prefetcher[2].set()
+        except AttributeError:
+            pass
+
+    def _iter_pages(self):
+        """
+        Yield the results not consumed yet, page by page, without going beyond `total`. Pages are fetched in a
+        background thread if prefetching is enabled. The pagination cursor following the last page yielded is
+        kept as `_consumed_cursor`, the one of the last page fetched being ahead of it when prefetching
+
+        Returns:
+            iterator: an iterator of lists of results
+        """
+        if self._chunked is not None:
+            while True:
+                page = list(islice(self._chunked, 1000))
+                if not page:
+                    return
+                yield page
+        self._consumed_cursor = self._search_after_last
+        consumed = self._fetched
+        if self._data:
+            page, self._data = self._data, []
+            yield page
+        while consumed < self.total:
+            response = self._next_page()
+            page = response.data
+            if not page:
+                return
+            consumed += len(page)
+            excess = consumed - self.total
+            if excess > 0:
+                page = page[:len(page) - excess]
+            self._consumed_cursor = response.info.next_ if 'next_' in response.info else None
+            yield page
+
+    def _slice(self, start, stop):
+        """
+        Create an IterableResult over the results of the current query between `start` and `stop`.
+        Nothing is fetched until its pages are iterated.
+
+        Args:
+            start (int): offset of the first result
+            stop (int): offset after the last result
+
+        Returns:
+            IterableResult: the slice
+        """
+        result = IterableResult(self.conn, self.method)
+        result._args = self._args
+        result._kwargs = dict((k, v) for k, v in self._kwargs.items() if k not in ('from', 'next'))
+        result._projection = self._projection
+        result.info = self.info
+        result._data = []
+        result._fetched = start
+        result.current = start
+        result.total = stop
+        return result
+
+    def partitioned(self, workers=4, partition_by=None, partition_values=None, slice_size=None, ordered=True):
+        """
+        Split the query in independent partitions fetched in parallel by a pool of threads.
+        Partitions are either ranges of offsets or, if `partition_by` is set, the same query filtered by each
+        one of the `partition_values`.
+
+        Args:
+            workers (int): number of partitions fetched at the same time
+            partition_by (str): filter used to partition the query, e.g. `datasource`
+            partition_values (list): values for the `partition_by` filter. Every result must match exactly one
+                value, this is checked against the total number of results before fetching
+            slice_size (int): number of results in each offset partition. Defaults to split the results evenly
+                among the workers
+            ordered (bool): if True results are returned in the same order as a sequential iteration, otherwise
+                as soon as they are fetched
+
+        Returns:
+            PartitionedResult: an IterableResult fetching data in parallel
+        """
+        result = PartitionedResult(self.conn,
+                                   self.method,
+                                   workers=workers,
+                                   partition_by=partition_by,
+                                   partition_values=partition_values,
+                                   slice_size=slice_size,
+                                   ordered=ordered)
+        kwargs = dict((k, v) for k, v in self._kwargs.items() if k not in ('from', 'next', 'no_cache'))
+        return result(*self._args, **kwargs)
+
     def __len__(self):
         try:
             return self.total
@@ -526,6 +1706,33 @@ class IterableResult(object):
         """
         self.conn.validate_parameter(self._args[0], filter_type, value)
 
+    @contextmanager
+    def _profiling(self, profile, export):
+        """
+        Profile an export, unless it is run by another export being profiled
+
+        Args:
+            profile: an ``opentargets.profiling.ExportProfile``, True for a new one logging its report, or None
+            export (str): name of the export method
+
+        Returns:
+            context manager giving the profile to fill in
+        """
+        if self._profile.enabled:
+            yield self._profile
+            return
+        profile = get_profile(profile)
+        if not profile.enabled:
+            yield profile
+            return
+        self._profile = profile
+        profile.start(export, self.conn)
+        try:
+            yield profile
+        finally:
+            self._profile = NULL_PROFILE
+            profile.stop()
+
     def to_json(self,iterable=True, **kwargs):
         """
 
@@ -533,24 +1740,43 @@ class IterableResult(object):
             iterable: If True will yield a json string for each result and convert them dinamically as they are
                 fetched from the api. If False gets all the results and returns a singl json string.
         Keyword Args:
-            **kwargs: forwarded to json.dumps
+            **kwargs: forwarded to json.dumps, the standard library is used instead of the connection codec
+                when they are set
 
         Returns:
             an iterator of json strings or a single json string
         """
+        if kwargs:
+            if iterable:
+                return (json.dumps(i, **kwargs) for i in self)
+            return IterableResultSimpleJSONEncoder(**kwargs).encode(self)
+        codec = self.conn.codec
         if iterable:
-            return (json.dumps(i) for i in self)
-        return IterableResultSimpleJSONEncoder(**kwargs).encode(self)
+            return (codec.dumps(i) for i in self)
+        return codec.dumps(self, default=_encode_iterable_result)
 
 
-    def to_dataframe(self, compress_lists = False,**kwargs):
+    def to_dataframe(self, compress_lists = False, columns = None, categories = False, downcast = False,
+                     chunk_size = 10000, profile = None, **kwargs):
         """
         Create a Pandas dataframe from a flattened version of the response.
+        Results are converted to columns chunk by chunk while they are fetched, and the chunks are concatenated
+        at the end, so that the results are never all held in memory as dictionaries.
 
         Args:
             compress_lists: if a value is a list, serialise it to a string with '|' as separator
+            columns (list): flattened fields to keep, e.g. `['target.id', 'association_score.overall']`.
+                Defaults to all the fields. Also used as `fields` of the query, if none were set, so that the
+                other fields of the results not fetched yet are neither transferred nor decoded
+            categories: store string columns as `category` dtype, either a list of column names or True for the
+                columns with at most half distinct values in the first chunk where they appear
+            downcast (bool): store float columns, e.g. scores, as float32
+            chunk_size (int): number of results converted to columns at a time
+            profile: an ``opentargets.profiling.ExportProfile`` filled in with the time spent in each stage of
+                the export (`network`, `decode`, `flatten` and `pandas`), or True to log its report
+                as a warning. Pass an ``ExportProfile`` to read the numbers from it
         Keyword Args:
-            **kwargs: forwarded to pandas.DataFrame.from_dict
+            **kwargs: forwarded to pandas.DataFrame.from_dict for each chunk
 
         Returns:
             pandas.DataFrame: A DataFrame with all the data coming from the query in the REST API
@@ -560,19 +1786,52 @@ class IterableResult(object):
             ImportError: if Pandas is not available
 
         """
-        if pandas_available:
-            data = [flatten(i) for i in self]
-            if compress_lists:
-                data = [compress_list_values(i) for i in data]
-
-            return pandas.DataFrame.from_dict(data,  **kwargs)
-        else:
+        if not pandas_available:
             raise ImportError('Pandas library is not installed but is required to create a dataframe')
-
-    def to_csv(self, **kwargs):
+        with self._profiling(profile, 'to_dataframe') as profile:
+            if columns:
+                self.select_fields(columns)
+            category_columns = {}
+            column_chunks = collections.OrderedDict((name, []) for name in columns or [])
+            rows_count = 0
+            for rows in self._iter_flat_batches(chunk_size, compress_lists):
+                with profile.stage('pandas', len(rows)):
+                    names = collections.OrderedDict((name, None) for name in columns or [])
+                    if not columns:
+                        for row in rows:
+                            for name in row:
+                                names[name] = None
+                    chunk = pandas.DataFrame.from_dict(collections.OrderedDict(
+                        (name, [row.get(name) for row in rows]) for name in names), **kwargs)
+                    for name in chunk.columns:
+                        if name not in column_chunks:
+                            # missing values are recorded as the number of rows, filled when concatenating
+                            column_chunks[name] = [rows_count] if rows_count else []
+                        column_chunks[name].append(_shrink_column(chunk[name], category_columns, categories,
+                                                                  downcast))
+                    rows_count += len(chunk)
+                    for name, parts in column_chunks.items():
+                        if name not in chunk.columns:
+                            parts.append(len(chunk))
+            if not rows_count:
+                return pandas.DataFrame(columns=list(column_chunks))
+            with profile.stage('pandas'):
+                return pandas.DataFrame(collections.OrderedDict((name, _concat_column(parts, downcast))
+                                                                for name, parts in column_chunks.items()))
+
+    def to_csv(self, checkpoint=None, checkpoint_every=10, profile=None, **kwargs):
         """
         Create a csv file from a flattened version of the response.
 
+        Args:
+            checkpoint: path of a checkpoint file, or True for `path_or_buf` followed by `.checkpoint`, to make the
+                export resumable. The file is then written a page at a time, with the columns given by `columns`
+                or else by the first page. If the checkpoint file exists the export resumes from it, appending to
+                the file
+            checkpoint_every (int): number of pages written between checkpoints
+            profile: an ``opentargets.profiling.ExportProfile`` filled in with the time spent in each stage of
+                the export (`network`, `decode`, `flatten`, `pandas` and `write`), or True to log its report
+                as a warning. Pass an ``ExportProfile`` to read the numbers from it
         Keyword Args:
             **kwargs: forwarded to pandas.DataFrame.to_csv
         Returns:
@@ -581,9 +1840,57 @@ class IterableResult(object):
             Requires Pandas to be installed.
         Raises:
             ImportError: if Pandas is not available
+            AttributeError: if a checkpoint is set and `path_or_buf` is not a path, or the checkpoint cannot be
+                used for this result
 
         """
-        return self.to_dataframe(compress_lists=True).to_csv(**kwargs)
+        with self._profiling(profile, 'to_csv') as profile:
+            if checkpoint:
+                return self._to_csv_resumable(checkpoint, checkpoint_every, **kwargs)
+            dataframe = self.to_dataframe(compress_lists=True)
+            with profile.stage('write', len(dataframe)):
+                return dataframe.to_csv(**kwargs)
+
+    def _to_csv_resumable(self, checkpoint, checkpoint_every, path_or_buf=None, columns=None, header=True,
+                          encoding='utf-8', **kwargs):
+        """
+        Write a csv file a page at a time, saving checkpoints
+        """
+        if not pandas_available:
+            raise ImportError('Pandas library is not installed but is required to create a csv file')
+        if not isinstance(path_or_buf, string_types):
+            raise AttributeError('a path is required as path_or_buf to write a csv file with checkpoints')
+        checkpoint = self._get_checkpoint(checkpoint, path_or_buf, checkpoint_every)
+        state = checkpoint.resume(self)
+        extra = dict(columns=columns or (state or {}).get('columns'))
+        flattener = Flattener(compress_lists=True)
+        dropped = set()
+        write_header = header if state is None else False
+        with open(path_or_buf, 'ab' if state else 'wb') as fh:
+
+            def get_size():
+                fh.flush()
+                os.fsync(fh.fileno())
+                return os.fstat(fh.fileno()).st_size
+            for page in checkpoint.pages(self, get_size, extra):
+                with self._profile.stage('flatten', len(page)):
+                    rows = [flattener(i) for i in page]
+                if extra['columns'] is None:
+                    extra['columns'] = list(collections.OrderedDict((name, None) for row in rows for name in row))
+                for row in rows:
+                    dropped.update(name for name in row if name not in extra['columns'])
+                with self._profile.stage('pandas', len(rows)):
+                    chunk = pandas.DataFrame.from_dict(collections.OrderedDict(
+                        (name, [row.get(name) for row in rows]) for name in extra['columns']))
+                    chunk.index = pandas.RangeIndex(self.current, self.current + len(chunk))
+                    data = chunk.to_csv(header=write_header, **kwargs).encode(encoding)
+                with self._profile.stage('write', len(data)):
+                    fh.write(data)
+                write_header = False
+        checkpoint.remove()
+        if dropped:
+            logger.warning('fields missing from the first page were not written to {}: {}'.format(
+                path_or_buf, ', '.join(sorted(dropped))))
 
 
     def to_excel(self, excel_writer, **kwargs):
@@ -605,6 +1912,74 @@ class IterableResult(object):
         else:
             raise ImportError('xlwt library is not installed but is required to create an excel file')
 
+    def to_arrow_batches(self, batch_size=10000):
+        """
+        Create Apache Arrow record batches from a flattened version of the response, while results are fetched.
+        The schema is inferred from the results and extended when new fields appear, so later batches can have
+        more columns than earlier ones.
+
+        Args:
+            batch_size (int): number of results in each batch
+
+        Returns:
+            iterator: an iterator of pyarrow.RecordBatch
+        Notes:
+            Requires pyarrow to be installed.
+        Raises:
+            ImportError: if pyarrow is not available
+        """
+        builder = RecordBatchBuilder()
+        return (builder.build(rows) for rows in self._iter_flat_batches(batch_size))
+
+    def to_parquet(self, path, row_group_size=50000, compression='snappy', schema=None, **kwargs):
+        """
+        Write a Parquet file from a flattened version of the response, one row group at a time while results are
+        fetched, so that memory use does not depend on the number of results.
+        If new fields appear after the first row group, the following row groups are written to another part
+        file, and the parts are merged once at the end to add the new fields to all the row groups. Passing the
+        `schema` of a previous export of the same query avoids it.
+
+        Args:
+            path (str): path of the file to write
+            row_group_size (int): number of results in each row group
+            compression (str): compression codec, as in ``pyarrow.parquet.ParquetWriter``
+            schema (pyarrow.Schema): initial schema of the file, extended if other fields are found
+        Keyword Args:
+            **kwargs: forwarded to pyarrow.parquet.ParquetWriter
+
+        Returns:
+            pyarrow.Schema: schema of the file
+        Notes:
+            Requires pyarrow to be installed.
+        Raises:
+            ImportError: if pyarrow is not available
+        """
+        builder = RecordBatchBuilder(schema)
+        with ParquetFileWriter(path, compression=compression, **kwargs) as writer:
+            for rows in self._iter_flat_batches(row_group_size):
+                writer.write(builder.build(rows))
+            if writer.schema is None:
+                writer.write(builder.build([]))
+        return writer.schema
+
+    def _iter_flat_batches(self, batch_size, compress_lists=False):
+        """
+        Yield lists of up to `batch_size` flattened results
+        """
+        flattener = Flattener(compress_lists=compress_lists)
+        while True:
+            if self._profile.enabled:
+                # fetched before flattening, to time both apart
+                batch = list(islice(self, batch_size))
+                with self._profile.stage('flatten', len(batch)):
+                    rows = [flattener(i) for i in batch]
+                del batch
+            else:
+                rows = [flattener(i) for i in islice(self, batch_size)]
+            if not rows:
+                return
+            yield rows
+
     def to_object(self):
         """
         Converts dictionary in the data to an addict object. Useful for interactive data exploration on IPython
@@ -614,21 +1989,393 @@ class IterableResult(object):
         """
         return (addict.Dict(i) for i in self)
 
-    def to_file(self, filename, compress=True, progress_bar = False):
-        if compress:
-            fh = gzip.open(filename, 'wb')
-        else:
-            fh = open(filename, 'wb')
+    def to_file(self, filename, compress=True, progress_bar = False, level=None, workers=1,
+                block_size=DEFAULT_BLOCK_SIZE, batch_size=1000, checkpoint=None, checkpoint_every=10, profile=None):
+        """
+        Write the results to a JSON lines file, compressed a block at a time while results are fetched
+
+        Args:
+            filename (str): path of the file
+            compress: True or `gzip` for gzip compression, `zstd`, `lz4`, or False or `none` for no compression
+            progress_bar (bool): show a progress bar, requires tqdm
+            level (int): compression level, defaults to the default of each library
+            workers (int): number of threads compressing blocks in parallel
+            block_size (int): size in bytes of the blocks compressed independently
+            batch_size (int): number of results encoded and written at a time
+            checkpoint: path of a checkpoint file, or True for `filename` followed by `.checkpoint`, to make the
+                export resumable. If the checkpoint file exists the export resumes from it, appending to the file
+            checkpoint_every (int): number of pages written between checkpoints
+            profile: an ``opentargets.profiling.ExportProfile`` filled in with the time spent in each stage of
+                the export (`network`, `decode`, `encode`, `compress` and `write`), or True to log its report
+                as a warning. Pass an ``ExportProfile`` to read the numbers from it
+        Notes:
+            Compressed files are made of one gzip member, zstd frame or lz4 frame per block, a standard format
+            read by `gzip.open`, `zcat`, `zstd -d` and `lz4 -d`. zstandard readers must read across frames, e.g.
+            `zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True)`.
+        Raises:
+            AttributeError: if the compression is unknown, or the checkpoint cannot be used for this result
+            ImportError: if the library required by the compression is not available
+        """
+        if compress is True:
+            compress = 'gzip'
+        elif not compress:
+            compress = 'none'
+        with self._profiling(profile, 'to_file') as profile:
+            self._to_file(filename, compress, progress_bar, level, workers, block_size, batch_size, checkpoint,
+                          checkpoint_every, profile)
+
+    def _to_file(self, filename, compress, progress_bar, level, workers, block_size, batch_size, checkpoint,
+                 checkpoint_every, profile):
+        """
+        Write the results to a JSON lines file, see ``IterableResult.to_file``
+        """
+        checkpoint = self._get_checkpoint(checkpoint, filename, checkpoint_every)
+        state = checkpoint.resume(self) if checkpoint is not None else None
         if tqdm_available and progress_bar:
             progress = tqdm(desc='Saving entries to file %s'%filename,
                        total=len(self),
+                       initial=self.current if state else 0,
                        unit_scale=True)
-        for datapoint in self:
-            line = json.dumps(datapoint)+'\n'
-            fh.write(line.encode('utf-8'))
-            if tqdm_available and progress_bar:
-                progress.update()
-        fh.close()
+        dumps_bytes = self.conn.codec.dumps_bytes
+        with BlockWriter(filename, compress, level=level, workers=workers, block_size=block_size,
+                         mode='ab' if state else 'wb', profile=profile) as fh:
+            if checkpoint is None:
+                batches = iter(lambda: list(islice(self, batch_size)), [])
+            else:
+                start_size = state['size'] if state else 0
+
+                def get_size():
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                    return start_size + fh.bytes_out
+                batches = checkpoint.pages(self, get_size)
+            for batch in batches:
+                with profile.stage('encode', len(batch)):
+                    lines = [dumps_bytes(datapoint) for datapoint in batch]
+                    lines.append(b'')
+                    data = b'\n'.join(lines)
+                fh.write(data)
+                if tqdm_available and progress_bar:
+                    progress.update(len(lines) - 1)
+        if checkpoint is not None:
+            checkpoint.remove()
+
+    def _get_checkpoint(self, checkpoint, filename, checkpoint_every):
+        """
+        Create the checkpoint of an export
+
+        Args:
+            checkpoint: path of the checkpoint file, True to add `.checkpoint` to the output path, or None
+            filename (str): path of the output file
+            checkpoint_every (int): number of pages written between checkpoints
+
+        Returns:
+            ExportCheckpoint: the checkpoint, None if checkpoints are disabled
+        Raises:
+            AttributeError: if the result cannot be exported with checkpoints
+        """
+        if not checkpoint:
+            return None
+        if not self._resumable or self._chunked is not None or self.stream or self._prefetcher is not None:
+            raise AttributeError('checkpoints are not supported for partitioned, chunked or streamed results, nor '
+                                 'while pages are prefetched')
+        if checkpoint is True:
+            checkpoint = filename + '.checkpoint'
+        return ExportCheckpoint(checkpoint, filename, every=checkpoint_every)
+
+    def _resume(self, current, search_after):
+        """
+        Move to the page following the first `current` results, dropping the page already fetched
+
+        Args:
+            current (int): number of results already consumed, at the end of a page
+            search_after (list): pagination cursor after the last result consumed, None for offset pagination
+        """
+        self._stop_prefetch()
+        self._data = []
+        self.current = current
+        self._fetched = current
+        self._search_after_last = search_after
+        self._consumed_cursor = search_after
+
+
+def _shrink_column(column, category_columns, categories, downcast):
+    """
+    Convert a column of a dataframe chunk to a compact dtype
+
+    Args:
+        column (pandas.Series): the column
+        category_columns (dict): whether each column seen so far is stored as category, updated in place
+        categories: list of columns to store as category, or True to detect low cardinality string columns
+        downcast (bool): if True convert float columns to float32
+
+    Returns:
+        pandas.Series: the converted column
+    """
+    name = column.name
+    if name not in category_columns:
+        if categories is True:
+            values = column.dropna()
+            category_columns[name] = (pandas.api.types.infer_dtype(values, skipna=True) == 'string' and
+                                      values.nunique() <= len(values) / 2)
+        else:
+            category_columns[name] = bool(categories) and name in categories
+    if category_columns[name]:
+        try:
+            return column.astype('category')
+        except TypeError:
+            # unhashable values, e.g. lists
+            category_columns[name] = False
+    if downcast and column.dtype.kind == 'f':
+        return column.astype('float32')
+    return column
+
+
+def _concat_column(parts, downcast):
+    """
+    Concatenate the chunks of a column, merging the categories of categorical chunks. Chunks missing the column
+    are given as their number of rows, and filled with missing values of a matching dtype
+
+    Returns:
+        pandas.Series: the whole column
+    """
+    if any(isinstance(p, pandas.Series) and p.notnull().any() for p in parts):
+        # chunks without any value do not tell the dtype of the column, fill them like missing chunks
+        parts = [len(p) if isinstance(p, pandas.Series) and not p.notnull().any() else p for p in parts]
+    series = [p for p in parts if isinstance(p, pandas.Series)]
+    if all(str(p.dtype) == 'category' for p in series):
+        if len(set(str(p.cat.categories.dtype) for p in series)) > 1:
+            # e.g. strings in a chunk and numbers in another
+            parts = [pandas.Series(pandas.Categorical.from_codes(p.cat.codes, p.cat.categories.astype(object)))
+                     if isinstance(p, pandas.Series) else p for p in parts]
+            series = [p for p in parts if isinstance(p, pandas.Series)]
+        # missing values with categories of the same dtype, that union_categoricals requires
+        empty = series[0].cat.categories[:0] if series else None
+        parts = [pandas.Series(pandas.Categorical([None] * p, categories=empty)) if not isinstance(p, pandas.Series)
+                 else p for p in parts]
+        return pandas.Series(pandas.api.types.union_categoricals(parts, ignore_order=True))
+    fill_dtype = float if all(p.dtype.kind in 'fiu' for p in series) else object
+    parts = [pandas.Series(index=pandas.RangeIndex(p), dtype=fill_dtype) if not isinstance(p, pandas.Series) else
+             p.astype(object) if str(p.dtype) == 'category' else p
+             for p in parts]
+    column = pandas.concat(parts, ignore_index=True)
+    if downcast and column.dtype.kind == 'f':
+        column = column.astype('float32')
+    return column
+
+
+class PartitionedResult(IterableResult):
+    '''
+    IterableResult that splits the query in independent partitions and fetches them in parallel.
+    Offset partitions return each result exactly once if the REST API sorts the results in a deterministic way,
+    filter value partitions are checked to cover all the results of the query.
+    Use ``IterableResult.partitioned`` to create one.
+    '''
+    _page_size = 1000
+    _chunkable = False
+    _resumable = False
+
+    def __init__(self, conn, method = HTTPMethods.GET, workers=4, partition_by=None, partition_values=None,
+                 slice_size=None, ordered=True):
+        """
+        Args:
+            conn (Connection): a Connection instance
+            method (HTTPMethods): HTTP method to use for the calls
+            workers (int): number of partitions fetched at the same time
+            partition_by (str): filter used to partition the query
+            partition_values (list): values for the `partition_by` filter
+            slice_size (int): number of results in each offset partition
+            ordered (bool): if True results are returned in the same order as a sequential iteration
+        """
+        super(PartitionedResult, self).__init__(conn, method)
+        if partition_by and not partition_values:
+            raise AttributeError('partition_values are required to partition by {}'.format(partition_by))
+        self.workers = max(1, workers)
+        self.partition_by = partition_by
+        self.partition_values = partition_values
+        self.slice_size = slice_size
+        self.ordered = ordered
+        self._stream = None
+
+    def __call__(self, *args, **kwargs):
+        self._close_stream()
+        return super(PartitionedResult, self).__call__(*args, **kwargs)
+
+    def __next__(self):
+        if self._stream is None:
+            self._stream = self._iter_partitions()
+        d = next(self._stream)
+        self.current += 1
+        return d
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _open_value_partition(self, value):
+        kwargs = dict(self._kwargs)
+        kwargs[self.partition_by] = value
+        partition = IterableResult(self.conn, self.method)
+        partition._profile = self._profile
+        return partition(*self._args, **kwargs)
+
+    def _get_partitions(self, executor):
+        """
+        Build the partitions of the query
+
+        Args:
+            executor (ThreadPoolExecutor): executor used to open the filter value partitions
+
+        Returns:
+            list: a list of IterableResult
+        Raises:
+            AttributeError: if the filter value partitions do not cover exactly the results of the query
+        """
+        if self.partition_by:
+            partitions = list(executor.map(self._open_value_partition, self.partition_values))
+            partitioned_total = sum(p.total for p in partitions)
+            if partitioned_total != self.total:
+                raise AttributeError('partitions by {} cover {} results, but the query has {} results'.format(
+                    self.partition_by, partitioned_total, self.total))
+            return partitions
+        slice_size = self.slice_size or int(math.ceil(float(self.total) / self.workers))
+        slice_size = max(self._page_size, int(math.ceil(float(slice_size) / self._page_size)) * self._page_size)
+        partitions = [self._slice(start, min(start + slice_size, self.total))
+                      for start in range(0, self.total, slice_size)]
+        if partitions and self._data:
+            # the first page, fetched to know the total, starts the first partition
+            first = partitions[0]
+            first._data = self._data[:first.total]
+            first._fetched = len(first._data)
+            self._data = []
+        return partitions
+
+    def _iter_partitions(self):
+        """
+        Fetch the partitions in a pool of threads and yield the results
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        stop = threading.Event()
+        partitions = []
+        futures = []
+        try:
+            partitions = self._get_partitions(executor)
+            for partition in partitions:
+                # the requests of the partitions are part of an export of the whole result
+                partition._profile = self._profile
+            if self.ordered:
+                queues = [Queue(maxsize=2) for p in partitions]
+            else:
+                queues = [Queue(maxsize=2 * self.workers)] * len(partitions)
+            for partition, pages in zip(partitions, queues):
+                futures.append(executor.submit(_fetch_partition, partition, pages, stop))
+            if self.ordered:
+                for pages in queues:
+                    for d in self._iter_queue(pages, 1):
+                        yield d
+            else:
+                for d in self._iter_queue(queues[0], len(partitions)):
+                    yield d
+        finally:
+            # partitions not started yet are dropped, the running ones stop before their next page
+            stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+            for partition in partitions:
+                partition._profile = NULL_PROFILE
+
+    @staticmethod
+    def _iter_queue(pages, partitions):
+        """
+        Yield the results put in a queue until the end of `partitions` partitions is reached
+        """
+        while partitions:
+            page, error = pages.get()
+            if error is not None:
+                raise error
+            if page is None:
+                partitions -= 1
+            else:
+                for d in page:
+                    yield d
+
+
+class ChunkedResult(PartitionedResult):
+    '''
+    IterableResult running a query filtered by many values as one query for each chunk of values, merged in a
+    single stream. Results matching more than one chunk are returned once, so `total`, the sum of the totals of
+    the chunks, is an upper bound.
+    Created by ``IterableResult`` when a filter has more values than ``Connection.filter_chunk_size``.
+    '''
+
+    def __init__(self, conn, method = HTTPMethods.GET, chunk_by=None, chunk_size=1000, workers=1, ordered=True):
+        """
+        Args:
+            conn (Connection): a Connection instance
+            method (HTTPMethods): HTTP method to use for the calls
+            chunk_by (str): filter to split in chunks
+            chunk_size (int): maximum number of values in each chunk
+            workers (int): number of chunks fetched at the same time
+            ordered (bool): if True results are returned chunk after chunk, otherwise as soon as they are fetched
+        """
+        super(ChunkedResult, self).__init__(conn, method, workers=workers, ordered=ordered)
+        self.chunk_by = chunk_by
+        self.chunk_size = chunk_size
+        self._partitions = None
+
+    def __call__(self, *args, **kwargs):
+        """
+        Run the first query of each chunk to get the total number of results
+        """
+        self._close_stream()
+        self._args = args
+        self._kwargs = kwargs
+        values = list(collections.OrderedDict((v, None) for v in kwargs[self.chunk_by]))
+        chunks = [values[i:i + self.chunk_size] for i in range(0, len(values), self.chunk_size)]
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            self._partitions = list(executor.map(self._open_chunk, chunks))
+        finally:
+            executor.shutdown()
+        self.total = sum(p.total for p in self._partitions)
+        self.info = addict.Dict(total=self.total)
+        self._data = []
+        self.current = 0
+        self._fetched = 0
+        return self
+
+    def _open_chunk(self, chunk):
+        kwargs = dict(self._kwargs)
+        kwargs[self.chunk_by] = chunk
+        partition = IterableResult(self.conn, self.method)
+        return partition(*self._args, **kwargs)
+
+    def _get_partitions(self, executor):
+        return self._partitions
+
+    def _iter_partitions(self):
+        """
+        Fetch the chunks and yield their results, skipping the ones already returned by another chunk
+        """
+        seen = set()
+        for d in super(ChunkedResult, self)._iter_partitions():
+            result_id = d.get('id') if isinstance(d, dict) else None
+            if result_id is not None:
+                if result_id in seen:
+                    continue
+                seen.add(result_id)
+            yield d
+
+
+def _encode_iterable_result(o):
+    """
+    Default function for the JSON codecs, supporting IterableResult
+    """
+    if isinstance(o, IterableResult):
+        return list(o)
+    raise TypeError('{} is not JSON serializable'.format(type(o).__name__))
 
 
 class IterableResultSimpleJSONEncoder(JSONEncoder):
@@ -0,0 +1,336 @@
+"""
+This module collects metrics of the requests made to the Open Targets REST API: counts, latency and response size
+histograms, retries, cache hits and throttling waits, aggregated by endpoint. Snapshots of the metrics can be
+exported in the Prometheus text format or as OpenTelemetry (OTLP/JSON) metrics, without requiring either library.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from opentargets.version import __version__
+
+# upper bounds of the buckets, in seconds, as the defaults of the Prometheus clients
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10.)
+# upper bounds of the buckets, in bytes
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+
+HOOK_EVENTS = ('pre_request', 'post_request')
+
+# statistics of the rate limiter and of the cache that only ever increase
+SECTION_COUNTERS = frozenset(['requests', 'throttled', 'waits', 'wait_time', 'hits', 'misses', 'evictions',
+                              'expirations'])
+
+
+class Histogram(object):
+    """
+    Distribution of observed values in buckets with fixed upper bounds
+    """
+
+    def __init__(self, buckets):
+        """
+        Args:
+            buckets (tuple): increasing upper bounds of the buckets, values above the last one are counted in an
+                implicit infinite bucket
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by interpolating linearly within the bucket holding it, like `histogram_quantile` of
+        Prometheus
+
+        Args:
+            q (float): quantile, between 0 and 1
+
+        Returns:
+            float: the estimate, None if nothing was observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / count
+                return min(max(estimate, self.min), self.max)
+            cumulative += count
+        return self.max
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: count, sum, min, max, estimated p50, p90 and p99, and cumulative counts of the buckets keyed by
+            their upper bound
+        """
+        cumulative, buckets = 0, OrderedDict()
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return OrderedDict([('count', self.count),
+                            ('sum', self.sum),
+                            ('min', self.min),
+                            ('max', self.max),
+                            ('p50', self.quantile(.5)),
+                            ('p90', self.quantile(.9)),
+                            ('p99', self.quantile(.99)),
+                            ('buckets', buckets)])
+
+
+class _EndpointMetrics(object):
+
+    def __init__(self, latency_buckets, size_buckets):
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.throttled = 0
+        self.throttle_wait = 0.
+        self.bytes = 0
+        self.latency = Histogram(latency_buckets)
+        self.size = Histogram(size_buckets)
+
+    def snapshot(self):
+        return OrderedDict([('requests', self.requests),
+                            ('errors', self.errors),
+                            ('statuses', dict(self.statuses)),
+                            ('retries', self.retries),
+                            ('cache_hits', self.cache_hits),
+                            ('cache_misses', self.cache_misses),
+                            ('throttled', self.throttled),
+                            ('throttle_wait', self.throttle_wait),
+                            ('bytes', self.bytes),
+                            ('latency', self.latency.snapshot()),
+                            ('size', self.size.snapshot())])
+
+
+class RequestMetrics(object):
+    """
+    Thread safe metrics of the requests made by a connection, aggregated by endpoint
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, size_buckets=SIZE_BUCKETS):
+        """
+        Args:
+            latency_buckets (tuple): upper bounds in seconds of the buckets of the latency histograms
+            size_buckets (tuple): upper bounds in bytes of the buckets of the response size histograms
+        """
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Drop the metrics collected so far
+        """
+        with self.lock:
+            self._endpoints = {}
+            self.started = time.time()
+
+    def record(self, request):
+        """
+        Add a request to the metrics
+
+        Args:
+            request (dict): the request as passed to the `post_request` hooks of ``opentargets.conn.Connection``,
+                with its `endpoint`, response `status` (None if it failed), `elapsed` seconds, `size` in bytes
+                (None if unknown), `retries`, `from_cache` (None if not cacheable), number of `throttled`
+                responses and `throttle_wait` seconds
+        """
+        with self.lock:
+            metrics = self._endpoints.get(request['endpoint'])
+            if metrics is None:
+                metrics = self._endpoints[request['endpoint']] = _EndpointMetrics(self.latency_buckets,
+                                                                                  self.size_buckets)
+            status = request.get('status')
+            metrics.requests += 1
+            if status is None or status >= 400:
+                metrics.errors += 1
+            if status is not None:
+                metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.retries += request.get('retries') or 0
+            if request.get('from_cache') is True:
+                metrics.cache_hits += 1
+            elif request.get('from_cache') is False:
+                metrics.cache_misses += 1
+            metrics.throttled += request.get('throttled') or 0
+            metrics.throttle_wait += request.get('throttle_wait') or 0.
+            if request.get('elapsed') is not None:
+                metrics.latency.observe(request['elapsed'])
+            if request.get('size') is not None:
+                metrics.bytes += request['size']
+                metrics.size.observe(request['size'])
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: the time the collection started and the metrics of each endpoint
+        """
+        with self.lock:
+            endpoints = OrderedDict((endpoint, self._endpoints[endpoint].snapshot())
+                                    for endpoint in sorted(self._endpoints))
+            return OrderedDict([('started', self.started),
+                                ('endpoints', endpoints)])
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return repr(int(value)) if value else '0'
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(stats, prefix='opentargets_client'):
+    """
+    Format a snapshot of the metrics in the Prometheus text exposition format
+
+    Args:
+        stats (dict): as returned by ``opentargets.conn.Connection.stats``
+        prefix (str): prefix of the metric names
+
+    Returns:
+        str: the metrics, to serve or write to a file read by the node exporter
+    """
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+        lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+
+    def sample(name, value, **labels):
+        label_text = ','.join('{}="{}"'.format(k, _escape(v)) for k, v in sorted(labels.items()))
+        lines.append('{}_{}{} {}'.format(prefix, name, '{' + label_text + '}' if label_text else '',
+                                         _format_value(value)))
+
+    endpoints = stats.get('endpoints', {})
+    counters = (('requests', 'requests_total', 'Requests sent to the REST API'),
+                ('errors', 'errors_total', 'Requests failed or answered with an error status'),
+                ('retries', 'retries_total', 'Retries made after server errors or connection errors'),
+                ('cache_hits', 'cache_hits_total', 'Responses served from the cache'),
+                ('cache_misses', 'cache_misses_total', 'Cacheable requests not found in the cache'),
+                ('throttled', 'throttled_total', 'Responses with a 429 status, retried after waiting'),
+                ('throttle_wait', 'throttle_wait_seconds_total', 'Seconds waited for the rate limiter'),
+                ('bytes', 'response_bytes_total', 'Bytes of the response bodies'))
+    for key, name, help_text in counters:
+        family(name, 'counter', help_text)
+        for endpoint, metrics in endpoints.items():
+            sample(name, metrics[key], endpoint=endpoint)
+    family('responses_total', 'counter', 'Responses by status code')
+    for endpoint, metrics in endpoints.items():
+        for status, count in sorted(metrics['statuses'].items()):
+            sample('responses_total', count, endpoint=endpoint, status=status)
+    histograms = (('latency', 'request_duration_seconds', 'Seconds spent sending requests and reading responses'),
+                  ('size', 'response_size_bytes', 'Size of the response bodies'))
+    for key, name, help_text in histograms:
+        family(name, 'histogram', help_text)
+        for endpoint, metrics in endpoints.items():
+            histogram = metrics[key]
+            for bound, count in histogram['buckets'].items():
+                sample(name + '_bucket', count, endpoint=endpoint, le=_format_value(float(bound)))
+            sample(name + '_sum', histogram['sum'], endpoint=endpoint)
+            sample(name + '_count', histogram['count'], endpoint=endpoint)
+    # the cache statistics are named apart from the cache_hits_total and cache_misses_total counters by endpoint
+    for section, section_name in (('rate_limiter', 'rate_limiter'), ('cache', 'response_cache')):
+        for key, value in sorted((stats.get(section) or {}).items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = '{}_{}'.format(section_name, key)
+                if key in SECTION_COUNTERS:
+                    name, kind = name + '_total', 'counter'
+                else:
+                    kind = 'gauge'
+                family(name, kind, '{} of the {}'.format(key, section.replace('_', ' ')))
+                sample(name, value)
+    return '\n'.join(lines) + '\n'
+
+
+def _attributes(**attributes):
+    return [dict(key=k, value=dict(stringValue=str(v))) for k, v in sorted(attributes.items())]
+
+
+def to_opentelemetry(stats, service_name='opentargets-client'):
+    """
+    Format a snapshot of the metrics as an OpenTelemetry metrics export request, in the JSON encoding of OTLP with
+    cumulative temporality, to post to the `/v1/metrics` endpoint of a collector
+
+    Args:
+        stats (dict): as returned by ``opentargets.conn.Connection.stats``
+        service_name (str): value of the `service.name` resource attribute
+
+    Returns:
+        dict: the export request, to encode as JSON
+    """
+    start = str(int(stats.get('started', time.time()) * 1e9))
+    now = str(int(time.time() * 1e9))
+    endpoints = stats.get('endpoints', {})
+    metrics = []
+
+    def counter(name, unit, description, key, integer=True):
+        points = [dict(attributes=_attributes(endpoint=endpoint),
+                       startTimeUnixNano=start,
+                       timeUnixNano=now,
+                       **({'asInt': str(values[key])} if integer else {'asDouble': float(values[key])}))
+                  for endpoint, values in endpoints.items()]
+        metrics.append(dict(name=name, unit=unit, description=description,
+                            sum=dict(aggregationTemporality=2, isMonotonic=True, dataPoints=points)))
+
+    counter('opentargets.client.requests', '{request}', 'Requests sent to the REST API', 'requests')
+    counter('opentargets.client.errors', '{request}', 'Requests failed or answered with an error status', 'errors')
+    counter('opentargets.client.retries', '{retry}', 'Retries after server or connection errors', 'retries')
+    counter('opentargets.client.cache.hits', '{request}', 'Responses served from the cache', 'cache_hits')
+    counter('opentargets.client.cache.misses', '{request}', 'Cacheable requests not found in the cache',
+            'cache_misses')
+    counter('opentargets.client.throttled', '{response}', 'Responses with a 429 status', 'throttled')
+    counter('opentargets.client.throttle.wait', 's', 'Seconds waited for the rate limiter', 'throttle_wait',
+            integer=False)
+    counter('opentargets.client.response.bytes', 'By', 'Bytes of the response bodies', 'bytes')
+    for key, name, unit, description in (('latency', 'opentargets.client.request.duration', 's',
+                                          'Seconds spent sending requests and reading responses'),
+                                         ('size', 'opentargets.client.response.size', 'By',
+                                          'Size of the response bodies')):
+        points = []
+        for endpoint, values in endpoints.items():
+            histogram = values[key]
+            bounds = [b for b in histogram['buckets'] if not math.isinf(b)]
+            cumulative = list(histogram['buckets'].values())
+            point = dict(attributes=_attributes(endpoint=endpoint),
+                         startTimeUnixNano=start,
+                         timeUnixNano=now,
+                         count=str(histogram['count']),
+                         sum=histogram['sum'],
+                         explicitBounds=[float(b) for b in bounds],
+                         bucketCounts=[str(c - p) for c, p in zip(cumulative, [0] + cumulative[:-1])])
+            if histogram['count']:
+                point.update(min=histogram['min'], max=histogram['max'])
+            points.append(point)
+        metrics.append(dict(name=name, unit=unit, description=description,
+                            histogram=dict(aggregationTemporality=2, dataPoints=points)))
+    return dict(resourceMetrics=[dict(
+        resource=dict(attributes=_attributes(**{'service.name': service_name})),
+        scopeMetrics=[dict(scope=dict(name='opentargets', version=__version__), metrics=metrics)])])
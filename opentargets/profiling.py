@@ -0,0 +1,301 @@
+"""
+This module profiles the exports of query results, e.g. ``IterableResult.to_dataframe``, stage by stage: waiting for
+the REST API, decoding the responses, flattening the results, building pandas objects, encoding, compressing and
+writing the output. For each stage it records the wall and CPU time, the number of items processed and optionally
+the peak memory allocated, to find which stage limits a given workload.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import tracemalloc
+    tracemalloc_available = True
+except ImportError:
+    tracemalloc_available = False
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('network', 'decode', 'flatten', 'pandas', 'encode', 'compress', 'write')
+
+_wall_time = getattr(time, 'perf_counter', time.time)
+# CPU time of the current thread, so that stages running in parallel threads are not counted twice
+_cpu_time = getattr(time, 'thread_time', None) or getattr(time, 'process_time', None) or time.clock
+_reset_peak = getattr(tracemalloc, 'reset_peak', None) if tracemalloc_available else None
+
+
+class _StageTimer(object):
+    """
+    Measure one run of a stage, used as a context manager. The number of items processed can be set on it
+    """
+
+    def __init__(self, profile, name, items=0):
+        self.profile = profile
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self._memory = self.profile._memory_start()
+        self._cpu = _cpu_time()
+        self._wall = _wall_time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        wall = _wall_time() - self._wall
+        cpu = _cpu_time() - self._cpu
+        self.profile.add(self.name, wall, cpu, self.items, self.profile._memory_peak(self._memory))
+
+
+class _RequestTimer(object):
+    """
+    Measure a call to the REST API, split between the network time measured by the hooks of the connection and
+    the decoding time, i.e. the rest
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.items = 0
+
+    def __enter__(self):
+        self._network = self.profile._local.network = [0., 0.]
+        self._memory = self.profile._memory_start()
+        self._cpu = _cpu_time()
+        self._wall = _wall_time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        wall = _wall_time() - self._wall
+        cpu = _cpu_time() - self._cpu
+        self.profile._local.network = None
+        network_wall, network_cpu = self._network
+        self.profile.add('decode', max(0., wall - network_wall), max(0., cpu - network_cpu), self.items,
+                         self.profile._memory_peak(self._memory))
+
+
+class _NullTimer(object):
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+class NullProfile(object):
+    """
+    Profile doing nothing, used when exports are not profiled
+    """
+    enabled = False
+
+    def stage(self, name, items=0):
+        return _NullTimer()
+
+    def request(self):
+        return _NullTimer()
+
+    def start(self, export, conn=None):
+        pass
+
+    def stop(self):
+        pass
+
+
+NULL_PROFILE = NullProfile()
+
+
+class ExportProfile(object):
+    """
+    Time spent in each stage of an export, filled in by the export methods of ``opentargets.conn.IterableResult``
+    when passed as their `profile` argument
+    """
+    enabled = True
+
+    def __init__(self, memory=True, log=False):
+        """
+        Args:
+            memory (bool): measure the peak memory allocated by each stage with tracemalloc, which slows down
+                the export. Per stage peaks require python 3.9+, before only the peak of the whole export is known.
+                Peaks are process wide: they include the memory allocated by other threads at the same time, and
+                profiling exports in parallel resets the peaks of each other. Ignored if tracemalloc is not
+                available
+            log (bool): log the report as a warning when the export is over
+        """
+        self.memory = memory
+        self.log = log
+        self.export = None
+        self.stages = OrderedDict()
+        self.wall = None
+        self.cpu = None
+        self.peak_memory = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = None
+        self._tracing = False
+
+    def stage(self, name, items=0):
+        """
+        Args:
+            name (str): name of the stage, one of ``opentargets.profiling.STAGES``
+            items (int): number of items processed, can also be set on the returned object
+
+        Returns:
+            context manager measuring a run of the stage
+        """
+        return _StageTimer(self, name, items)
+
+    def request(self):
+        """
+        Returns:
+            context manager measuring a call to the REST API, as `network` and `decode` stages
+        """
+        return _RequestTimer(self)
+
+    def add(self, name, wall, cpu, items=0, peak_memory=None):
+        """
+        Add a run to the measures of a stage
+        """
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = dict(runs=0, wall=0., cpu=0., items=0, peak_memory=None)
+            stage['runs'] += 1
+            stage['wall'] += wall
+            stage['cpu'] += cpu
+            stage['items'] += items
+            if peak_memory is not None:
+                stage['peak_memory'] = max(stage['peak_memory'] or 0, peak_memory)
+
+    def _pre_request(self, request):
+        # the hooks see every request of the connection, only the ones made by the results exported are measured,
+        # i.e. from a thread running one of their calls
+        if getattr(self._local, 'network', None) is None:
+            return
+        request['_profile'] = (_wall_time(), _cpu_time())
+
+    def _post_request(self, request):
+        start = request.pop('_profile', None)
+        if start is None:
+            return
+        wall, cpu = _wall_time() - start[0], _cpu_time() - start[1]
+        self.add('network', wall, cpu, 1)
+        network = getattr(self._local, 'network', None)
+        if network is not None:
+            network[0] += wall
+            network[1] += cpu
+
+    def _memory_start(self):
+        if not self._tracing:
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_memory = max(self.peak_memory, peak - self._memory_baseline)
+        if _reset_peak is not None:
+            _reset_peak()
+        return current
+
+    def _memory_peak(self, start):
+        if start is None:
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_memory = max(self.peak_memory, peak - self._memory_baseline)
+        return peak - start if _reset_peak is not None else None
+
+    def start(self, export, conn=None):
+        """
+        Start profiling an export, measuring the requests its results make through their connection
+
+        Args:
+            export (str): name of the export method
+            conn (Connection): connection of the result exported
+        """
+        self.export = export
+        self._conn = None
+        if conn is not None and hasattr(conn, 'add_hook'):
+            conn.add_hook('pre_request', self._pre_request)
+            conn.add_hook('post_request', self._post_request)
+            self._conn = conn
+        if self.memory and tracemalloc_available:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            self._memory_baseline = tracemalloc.get_traced_memory()[0]
+            self.peak_memory = 0
+            self._tracing = True
+        self._start_cpu = _cpu_time()
+        self._start_wall = _wall_time()
+
+    def stop(self):
+        """
+        Stop profiling the export, and log the report if requested
+        """
+        self.wall = _wall_time() - self._start_wall
+        self.cpu = _cpu_time() - self._start_cpu
+        if self._conn is not None:
+            self._conn.remove_hook('pre_request', self._pre_request)
+            self._conn.remove_hook('post_request', self._post_request)
+            self._conn = None
+        if self._tracing:
+            self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1] - self._memory_baseline)
+            if self._started_tracing:
+                tracemalloc.stop()
+            self._tracing = False
+        if self.log:
+            # a warning, to be printed without configuring logging
+            logger.warning('profile of {}:\n{}'.format(self.export, self.format()))
+
+    def report(self):
+        """
+        Returns:
+            dict: the export method, its wall and CPU time in seconds and peak memory in bytes, and for each stage
+            the number of runs, wall and CPU time, items processed, peak memory and share of the wall time. The
+            time not spent in any stage is reported as `other`. Stages run by background threads, e.g. when
+            prefetching pages or compressing in parallel, overlap with the others. Peak memory is measured for
+            the whole process, see ``ExportProfile``
+        """
+        stages = OrderedDict()
+        for name in sorted(self.stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            stage = dict(self.stages[name])
+            stage['share'] = stage['wall'] / self.wall if self.wall else None
+            stages[name] = stage
+        accounted = sum(s['wall'] for s in stages.values())
+        return OrderedDict([('export', self.export),
+                            ('wall', self.wall),
+                            ('cpu', self.cpu),
+                            ('peak_memory', self.peak_memory),
+                            ('stages', stages),
+                            ('other', max(0., (self.wall or 0.) - accounted))])
+
+    def format(self):
+        """
+        Returns:
+            str: the report as a table
+        """
+        report = self.report()
+        header = '{:<10}{:>8}{:>10}{:>10}{:>8}{:>10}{:>11}'.format('stage', 'runs', 'wall s', 'cpu s', 'share',
+                                                                   'items', 'peak MB')
+        lines = [header, '-' * len(header)]
+        for name, stage in report['stages'].items():
+            lines.append('{:<10}{:>8}{:>10.3f}{:>10.3f}{:>8.1%}{:>10}{:>11}'.format(
+                name, stage['runs'], stage['wall'], stage['cpu'], stage['share'] or 0., stage['items'],
+                '-' if stage['peak_memory'] is None else '{:.1f}'.format(stage['peak_memory'] / 1024. / 1024.)))
+        lines.append('{:<10}{:>8}{:>10.3f}'.format('other', '', report['other']))
+        lines.append('{:<10}{:>8}{:>10.3f}{:>10.3f}{:>8}{:>10}{:>11}'.format(
+            'total', '', report['wall'] or 0., report['cpu'] or 0., '', '',
+            '-' if report['peak_memory'] is None else '{:.1f}'.format(report['peak_memory'] / 1024. / 1024.)))
+        return '\n'.join(lines)
+
+
+def get_profile(profile):
+    """
+    Args:
+        profile: an ``ExportProfile``, True for a new one logging its report, or a false value
+
+    Returns:
+        the profile to fill in, ``NULL_PROFILE`` if the export is not profiled
+    """
+    if isinstance(profile, ExportProfile):
+        return profile
+    if profile:
+        return ExportProfile(log=True)
+    return NULL_PROFILE
@@ -0,0 +1,86 @@
+"""
+This module selects fields of the results of the Open Targets REST API on the client side, for the endpoints not
+supporting the `fields` parameter. Fields are given as in the REST API, i.e. paths of keys separated by dots like
+`association_score.overall`, optionally followed by `.*` to select a whole object. `*` alone selects the whole
+result.
+"""
+from future.utils import string_types
+
+# element of a list in the paths checked by Projection.accepts, distinct from any key
+LIST_ITEM = object()
+
+
+class Projection(object):
+    """
+    Keep only some fields of the results, either after they are decoded or while they are decoded, so that the
+    unused parts of streamed results are never built. Fields inside lists, e.g. `evidence.sources.id`, are
+    selected in every element of the list
+    """
+
+    def __init__(self, fields, separator='.'):
+        """
+        Args:
+            fields: list of field paths, or a string of field paths separated by commas
+            separator (str): separator between nested keys
+        """
+        if isinstance(fields, string_types):
+            fields = fields.split(',')
+        self.fields = list(fields)
+        self.separator = separator
+        self.tree = {}
+        for field in self.fields:
+            keys = field.strip().split(separator)
+            if keys[-1] == '*':
+                keys = keys[:-1]
+            if not keys:
+                # the whole result is selected
+                self.tree = True
+                break
+            node = self.tree
+            for key in keys[:-1]:
+                child = node.setdefault(key, {})
+                if child is True:
+                    break
+                node = child
+            else:
+                node[keys[-1]] = True
+
+    def __call__(self, record):
+        """
+        Args:
+            record (dict): a decoded result
+
+        Returns:
+            dict: the result with the selected fields only
+        """
+        return self._project(record, self.tree)
+
+    def _project(self, value, tree):
+        if tree is True:
+            return value
+        if isinstance(value, dict):
+            return dict((k, self._project(v, tree[k])) for k, v in value.items() if k in tree)
+        if isinstance(value, list):
+            return [self._project(v, tree) for v in value]
+        return value
+
+    def accepts(self, path):
+        """
+        Check if a value is selected, or contains selected values
+
+        Args:
+            path (list): keys leading to the value from the root of a result, with `LIST_ITEM` for the elements of
+                lists
+
+        Returns:
+            bool: True if the value is needed to build the selected fields
+        """
+        node = self.tree
+        for key in path:
+            if node is True:
+                return True
+            if key in node:
+                node = node[key]
+            elif key is not LIST_ITEM:
+                return False
+        return True
@@ -0,0 +1,248 @@
+"""
+This module provides a client side rate limiter, to keep the request rate to the Open Targets REST API just under
+its fair usage limits instead of hitting them and backing off.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+USAGE_LIMIT_HEADER = re.compile(r'^x-usage-limit-(\d+)([smhd])$', re.IGNORECASE)
+USAGE_REMAINING_HEADER = 'x-usage-remaining-{}{}'
+
+
+class RateLimiter(object):
+    """
+    Thread safe token bucket limiting the rate of requests, adapting the rate to the feedback of the REST API.
+
+    The rate is raised slowly while requests succeed, up to the limits advertised by the usage headers sent by the
+    REST API (e.g. `X-Usage-Limit-10s` and `X-Usage-Remaining-10s`, or `X-RateLimit-Limit`,
+    `X-RateLimit-Remaining` and `X-RateLimit-Reset`), and halved when a 429 response is received, in which case
+    no request is sent until the time given by its `Retry-After` header.
+    """
+
+    def __init__(self, rate=None, burst=None, min_rate=.5, increase=.05, safety=.9, backoff=1., max_backoff=60.):
+        """
+        Args:
+            rate (float): maximum number of requests per second. None to start unlimited and only slow down when
+                the REST API signals a limit
+            burst (int): maximum number of requests sent at once after a pause. Defaults to one second of requests
+            min_rate (float): lower bound for the adapted rate
+            increase (float): fraction of the current rate added after each successful request
+            safety (float): fraction of the advertised limits to use, to stay just under them
+            backoff (float): seconds to wait after a 429 response without `Retry-After`, doubled at each
+                consecutive 429 response
+            max_backoff (float): maximum seconds to wait after a 429 response without `Retry-After`
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.increase = increase
+        self.safety = safety
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self._tokens = float(self._get_capacity())
+        self._last = time.time()
+        self._blocked_until = 0.
+        self._advertised_rate = None
+        self._consecutive_throttles = 0
+        self._recent = deque(maxlen=100)
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.wait_time = 0.
+
+    def _get_capacity(self):
+        if self.burst is not None:
+            return self.burst
+        if self.rate:
+            return max(1., self.rate)
+        return 1.
+
+    def reserve(self):
+        """
+        Reserve a token for a request, without waiting
+
+        Returns:
+            float: seconds to wait before sending the request
+        """
+        with self.lock:
+            now = time.time()
+            self.requests += 1
+            self._recent.append(now)
+            wait = max(0., self._blocked_until - now)
+            if self.rate:
+                capacity = self._get_capacity()
+                # tokens only start refilling again at the end of a block
+                self._tokens = min(capacity, self._tokens + max(0., now - self._last) * self.rate)
+                self._last = max(self._last, now)
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, self._last - now - self._tokens / self.rate)
+            if wait > 0:
+                self.waits += 1
+                self.wait_time += wait
+            return wait
+
+    def acquire(self):
+        """
+        Wait until a request can be sent
+
+        Returns:
+            float: seconds waited
+        """
+        wait = self.reserve()
+        if wait > 0:
+            logger.debug('rate limited, waiting {:.2f}s'.format(wait))
+            time.sleep(wait)
+        return wait
+
+    def release(self):
+        """
+        Give back the token reserved for a request that did not reach the REST API, e.g. served from the cache
+        """
+        with self.lock:
+            if self.rate:
+                self._tokens = min(self._get_capacity(), self._tokens + 1)
+
+    def update(self, status_code, headers):
+        """
+        Adapt the rate to a response of the REST API
+
+        Args:
+            status_code (int): HTTP status of the response
+            headers (dict): HTTP headers of the response
+        """
+        with self.lock:
+            now = time.time()
+            self._update_from_usage_headers(headers, now)
+            if status_code == 429:
+                self.throttled += 1
+                self._consecutive_throttles += 1
+                retry_after = self._parse_retry_after(self._get_header(headers, 'Retry-After'), now)
+                if retry_after is None:
+                    retry_after = min(self.max_backoff, self.backoff * 2 ** (self._consecutive_throttles - 1))
+                if self._blocked_until <= now:
+                    # slow down once for each throttling event, not for each request sent before it was noticed
+                    current = self.rate or self._advertised_rate or self._get_observed_rate()
+                    self._set_rate(current / 2.)
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self._last = max(self._last, self._blocked_until)
+                self._tokens = 0.
+                logger.warning('usage limit exceeded, waiting {:.2f}s and slowing down to {:.2f} requests/s'.format(
+                    retry_after, self.rate))
+            else:
+                self._consecutive_throttles = 0
+                if self.rate:
+                    self._set_rate(self.rate * (1 + self.increase))
+
+    def _set_rate(self, rate):
+        ceiling = min(r for r in (self.max_rate, self._advertised_rate, float('inf')) if r is not None)
+        rate = max(self.min_rate, min(rate, ceiling))
+        if self.rate is None:
+            self._last = time.time()
+            self._tokens = 0.
+        self.rate = rate
+
+    def _get_observed_rate(self):
+        """
+        Returns the rate of the recent requests, used as starting point when a limit is hit without a rate set
+        """
+        if len(self._recent) > 1:
+            elapsed = self._recent[-1] - self._recent[0]
+            if elapsed > 0:
+                return (len(self._recent) - 1) / elapsed
+        return self.min_rate
+
+    def _update_from_usage_headers(self, headers, now):
+        """
+        Cap the rate to the usage limits advertised by the REST API, and stop sending requests until the end of
+        the window if no usage is left
+        """
+        advertised_rate = None
+        headers = dict((name.lower(), value) for name, value in headers.items())
+        for name, value in headers.items():
+            match = USAGE_LIMIT_HEADER.match(name)
+            if match:
+                window = int(match.group(1)) * WINDOW_UNITS[match.group(2).lower()]
+                try:
+                    limit = float(value)
+                    remaining = float(headers.get(USAGE_REMAINING_HEADER.format(*match.groups()), 1))
+                except ValueError:
+                    continue
+                window_rate = limit / window * self.safety
+                advertised_rate = window_rate if advertised_rate is None else min(advertised_rate, window_rate)
+                if remaining <= 0:
+                    self._blocked_until = max(self._blocked_until, now + window)
+        if 'x-ratelimit-remaining' in headers:
+            try:
+                remaining = float(headers['x-ratelimit-remaining'])
+                reset = self._parse_reset(headers.get('x-ratelimit-reset'), now)
+            except ValueError:
+                reset = None
+            if reset:
+                window_rate = max(remaining, 0) / reset * self.safety
+                advertised_rate = window_rate if advertised_rate is None else min(advertised_rate, window_rate)
+                if remaining <= 0:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+        if advertised_rate is not None:
+            self._advertised_rate = max(self.min_rate, advertised_rate)
+            if self.rate is None or self.rate > self._advertised_rate:
+                self._set_rate(self._advertised_rate)
+
+    @staticmethod
+    def _get_header(headers, name):
+        for key, value in headers.items():
+            if key.lower() == name.lower():
+                return value
+        return None
+
+    @staticmethod
+    def _parse_reset(value, now):
+        """
+        Returns seconds until the reset of the usage window, from either a number of seconds or a unix timestamp
+        """
+        if value is None:
+            return None
+        reset = float(value)
+        if reset > now / 2:
+            reset -= now
+        return max(reset, 0.)
+
+    @staticmethod
+    def _parse_retry_after(value, now):
+        """
+        Returns seconds to wait from a `Retry-After` header, either a number of seconds or an HTTP date
+        """
+        if value is None:
+            return None
+        try:
+            return max(0., float(value))
+        except ValueError:
+            pass
+        try:
+            from email.utils import parsedate_tz, mktime_tz
+            return max(0., mktime_tz(parsedate_tz(value)) - now)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    def stats(self):
+        """
+        Returns usage statistics for the limiter
+
+        Returns:
+            dict: current rate, number of requests, throttled responses, waits and total seconds waited
+        """
+        with self.lock:
+            return dict(rate=self.rate,
+                        requests=self.requests,
+                        throttled=self.throttled,
+                        waits=self.waits,
+                        wait_time=self.wait_time)
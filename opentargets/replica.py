@@ -0,0 +1,416 @@
+"""
+This module mirrors the associations of a data release of the Open Targets REST API in a local SQLite database,
+indexed by target, disease, score and therapeutic area, so that ``OpenTargetsClient.filter_associations`` can be
+answered locally in well under a millisecond instead of a round trip to the REST API.
+
+Usage::
+
+    python -m opentargets.replica associations.db               # mirror the associations, if the release changed
+    python -m opentargets.replica associations.db --workers 2 --partition-by direct --partition-values true,false
+
+    >>> from opentargets import OpenTargetsClient
+    >>> ot = OpenTargetsClient(replica='associations.db')
+    >>> ot.filter_associations(target='ENSG00000157764', scorevalue_min=0.5)
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+
+import addict
+from future.utils import string_types
+
+from opentargets.codec import get_codec
+from opentargets.conn import HTTPMethods, IterableResult
+from opentargets.projection import Projection
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = '1'
+
+# filters of /public/association/filter answered by the replica
+FILTERS = ('target', 'disease', 'direct', 'scorevalue_min', 'scorevalue_max', 'therapeutic_area')
+PAGINATION_PARAMETERS = ('from', 'next', 'size', 'no_cache', 'fields')
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _as_bool(value):
+    if isinstance(value, string_types):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+class ReplicaPage(object):
+    """
+    Page of results read from the replica, with the same `info` and `data` as a ``opentargets.conn.Response``
+    """
+
+    def __init__(self, data, info):
+        self.data = data
+        self.info = info
+
+    def __len__(self):
+        return len(self.data)
+
+
+class AssociationReplica(object):
+    """
+    Local copy of the associations of a data release in a SQLite database. The database is rebuilt in a new file
+    and swapped with the previous one when synchronised, so that queries keep being answered meanwhile, also by
+    other processes sharing the file.
+    """
+
+    def __init__(self, path, codec=None, timeout=30):
+        """
+        Args:
+            path (str): path to the SQLite database file
+            codec: JSON codec used to store the associations, see ``opentargets.codec.get_codec``
+            timeout (float): seconds to wait for a lock held by another process before failing
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.codec = get_codec(codec)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _get_connection(self):
+        """
+        Get the SQLite connection for the current thread and process, opening it again if the database was
+        replaced by a synchronisation
+
+        Returns:
+            sqlite3.Connection: a connection to the database, None if the replica was never synchronised
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            return None
+        pid = os.getpid()
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != pid or self._local.inode != inode:
+            if db is not None and self._local.pid == pid:
+                with self._connections_lock:
+                    self._connections.remove((db, pid))
+                db.close()
+            # each connection is used by a single thread, but closed by the thread closing the replica
+            db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            self._local.db = db
+            self._local.pid = pid
+            self._local.inode = inode
+            with self._connections_lock:
+                self._connections.append((db, pid))
+        return db
+
+    def get_metadata(self, key):
+        """
+        Args:
+            key (str): `version`, `total`, `synced_at` or `schema`
+
+        Returns:
+            str: the metadata value, None if the replica was never synchronised
+        """
+        db = self._get_connection()
+        if db is None:
+            return None
+        row = db.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    @property
+    def version(self):
+        """
+        Data release of the associations in the replica, None if it was never synchronised
+        """
+        return self.get_metadata('version')
+
+    def is_current(self, remote_version):
+        """
+        Args:
+            remote_version: data release served by the REST API
+
+        Returns:
+            bool: True if the replica holds the associations of the data release
+        """
+        return self.version is not None and self.version == str(remote_version)
+
+    def sync(self, client, force=False, workers=1, batch_size=10000, partition_by=None, partition_values=None):
+        """
+        Mirror all the associations of the data release served by the REST API, if it changed since the last
+        synchronisation. The associations are written in a new database, swapped with the current one at the end.
+        Pages are followed with the `next` cursor, as deep `from` offsets get slower and slower to answer. To fetch
+        in parallel, the associations are split in one query for each value of a filter
+
+        Args:
+            client (OpenTargetsClient): client connected to the REST API
+            force (bool): synchronise even if the replica holds the current data release
+            workers (int): number of partitions of the associations fetched in parallel, requires `partition_by`
+                if more than one
+            batch_size (int): number of associations inserted per statement
+            partition_by (str): filter splitting the associations in partitions, e.g. `direct`
+            partition_values (iterable): values of `partition_by` matching each association exactly once, e.g.
+                `['true', 'false']`
+
+        Returns:
+            int: number of associations stored, None if the replica was already current
+        Raises:
+            AttributeError: if more than one worker is requested without partitions, or the partitions do not cover
+                exactly the associations
+        """
+        if workers > 1 and not partition_by:
+            raise AttributeError('partition_by and partition_values are required to synchronise with more than one '
+                                 'worker')
+        remote_version = client.conn._get_remote_version()
+        if not force and self.is_current(remote_version):
+            logger.info('replica {} already holds data release {}'.format(self.path, remote_version))
+            return None
+        result = IterableResult(client.conn, prefetch=1)(client._filter_associations_endpoint, size=1000)
+        if partition_by:
+            result = result.partitioned(workers=workers, partition_by=partition_by,
+                                        partition_values=partition_values)
+        sync_path = self.path + '.sync'
+        if os.path.exists(sync_path):
+            os.remove(sync_path)
+        db = sqlite3.connect(sync_path)
+        try:
+            db.execute('PRAGMA journal_mode=OFF')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute('CREATE TABLE associations ('
+                       'rowid INTEGER PRIMARY KEY, '
+                       'id TEXT NOT NULL, '
+                       'target TEXT, '
+                       'disease TEXT, '
+                       'is_direct INTEGER, '
+                       'score REAL, '
+                       'data BLOB NOT NULL)')
+            db.execute('CREATE TABLE therapeutic_areas (association INTEGER NOT NULL, code TEXT NOT NULL)')
+            db.execute('CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)')
+            rowid = 0
+            for batch in iter(lambda: list(islice(result, batch_size)), []):
+                rows = []
+                areas = []
+                for association in batch:
+                    rowid += 1
+                    rows.append(self._to_row(rowid, association))
+                    disease = association.get('disease') or {}
+                    therapeutic_area = (disease.get('efo_info') or {}).get('therapeutic_area') or {}
+                    areas.extend((rowid, code) for code in therapeutic_area.get('codes') or [])
+                db.executemany('INSERT INTO associations VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                db.executemany('INSERT INTO therapeutic_areas VALUES (?, ?)', areas)
+                logger.debug('{} of {} associations stored'.format(rowid, len(result)))
+            if rowid != len(result):
+                logger.warning('{} associations stored but the REST API reported {}'.format(rowid, len(result)))
+            db.execute('CREATE INDEX associations_score ON associations (score DESC)')
+            db.execute('CREATE INDEX associations_target ON associations (target, score DESC)')
+            db.execute('CREATE INDEX associations_disease ON associations (disease, score DESC)')
+            db.execute('CREATE INDEX associations_id ON associations (id)')
+            db.execute('CREATE INDEX therapeutic_areas_code ON therapeutic_areas (code, association)')
+            db.executemany('INSERT INTO metadata VALUES (?, ?)', [('version', str(remote_version)),
+                                                                  ('total', str(rowid)),
+                                                                  ('synced_at', str(time.time())),
+                                                                  ('schema', SCHEMA_VERSION)])
+            db.commit()
+            db.execute('ANALYZE')
+        finally:
+            db.close()
+        _replace(sync_path, self.path)
+        logger.info('replica {} synchronised with data release {}: {} associations'.format(
+            self.path, remote_version, rowid))
+        return rowid
+
+    def _to_row(self, rowid, association):
+        score = (association.get('association_score') or {}).get('overall')
+        return (rowid,
+                association.get('id'),
+                (association.get('target') or {}).get('id'),
+                (association.get('disease') or {}).get('id'),
+                association.get('is_direct'),
+                score,
+                sqlite3.Binary(self.codec.dumps_bytes(association)))
+
+    def supports(self, params):
+        """
+        Check if a query can be answered by the replica
+
+        Args:
+            params (dict): parameters of a /public/association/filter query
+
+        Returns:
+            bool: True if all the parameters are supported
+        """
+        return all(k in FILTERS or k in PAGINATION_PARAMETERS for k in params)
+
+    def _build_where(self, target=None, disease=None, direct=None, scorevalue_min=None, scorevalue_max=None,
+                     therapeutic_area=None):
+        conditions = []
+        values = []
+        for column, value in (('target', target), ('disease', disease)):
+            if value is not None:
+                value = _as_list(value)
+                conditions.append('{} IN ({})'.format(column, ', '.join('?' * len(value))))
+                values.extend(value)
+        if direct is not None:
+            conditions.append('is_direct = ?')
+            values.append(int(_as_bool(direct)))
+        if scorevalue_min is not None:
+            conditions.append('score >= ?')
+            values.append(float(scorevalue_min))
+        if scorevalue_max is not None:
+            conditions.append('score <= ?')
+            values.append(float(scorevalue_max))
+        if therapeutic_area is not None:
+            therapeutic_area = _as_list(therapeutic_area)
+            conditions.append('rowid IN (SELECT association FROM therapeutic_areas WHERE code IN ({}))'.format(
+                ', '.join('?' * len(therapeutic_area))))
+            values.extend(therapeutic_area)
+        return conditions, values
+
+    def query(self, projection=None, **params):
+        """
+        Get a page of associations matching the filters of a /public/association/filter query, sorted by
+        decreasing overall score. Pages follow each other with the `from` offset or, faster, with the `next`
+        cursor returned in the `next_` info of the previous page
+
+        Args:
+            projection (Projection): fields to keep in the associations, all if None
+        Keyword Args:
+            **params: filters and pagination parameters of the query
+
+        Returns:
+            ReplicaPage: the page, with the number of matching associations as `total` in its info if it is the
+                first one
+        Raises:
+            AttributeError: if a parameter is not supported or the replica was never synchronised
+        """
+        unsupported = [k for k in params if k not in FILTERS and k not in PAGINATION_PARAMETERS]
+        if unsupported:
+            raise AttributeError('{} cannot be used to query the replica'.format(', '.join(unsupported)))
+        db = self._get_connection()
+        if db is None:
+            raise AttributeError('replica {} was never synchronised'.format(self.path))
+        conditions, values = self._build_where(**dict((k, v) for k, v in params.items() if k in FILTERS))
+        size = int(params.get('size', 10))
+        offset = int(params.get('from', 0) or 0)
+        info = addict.Dict(size=size)
+        if params.get('next'):
+            score, rowid = params['next']
+            # associations without an overall score come last
+            if score is None:
+                page_conditions = conditions + ['(score IS NULL AND rowid > ?)']
+                page_values = values + [rowid]
+            else:
+                page_conditions = conditions + ['(score < ? OR (score = ? AND rowid > ?) OR score IS NULL)']
+                page_values = values + [score, score, rowid]
+            offset = 0
+        else:
+            page_conditions, page_values = conditions, values
+            info.from_ = offset
+            if not offset:
+                info.total = db.execute('SELECT COUNT(*) FROM associations' + self._where(conditions),
+                                        values).fetchone()[0]
+        rows = db.execute('SELECT rowid, score, data FROM associations' + self._where(page_conditions) +
+                          ' ORDER BY score DESC, rowid LIMIT ? OFFSET ?', page_values + [size, offset]).fetchall()
+        data = [self.codec.loads(bytes(row[2])) for row in rows]
+        if projection is not None:
+            data = [projection(d) for d in data]
+        if rows:
+            info.next_ = [rows[-1][1], rows[-1][0]]
+        info.size = len(data)
+        return ReplicaPage(data, info)
+
+    @staticmethod
+    def _where(conditions):
+        return ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+    def close(self):
+        """
+        Close the connections to the database opened by all the threads of the current process
+        """
+        pid = os.getpid()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for db, db_pid in connections:
+            if db_pid == pid:
+                db.close()
+
+
+class ReplicaResult(IterableResult):
+    """
+    IterableResult reading the pages of a /public/association/filter query from an ``AssociationReplica``
+    instead of the REST API
+    """
+    _chunkable = False
+
+    def __init__(self, replica, conn, prefetch=0):
+        """
+        Args:
+            replica (AssociationReplica): the replica to query
+            conn (Connection): connection to the REST API, used for its codec
+            prefetch (int): number of pages read in a background thread while the current one is consumed
+        """
+        super(ReplicaResult, self).__init__(conn, HTTPMethods.GET, prefetch=prefetch)
+        self.replica = replica
+
+    def _make_call(self):
+        return self.replica.query(projection=self._projection, **self._kwargs)
+
+    def _get_projection(self):
+        fields = self._kwargs.get('fields')
+        return Projection(fields) if fields else None
+
+    def _validate_filter(self, filter_type, value):
+        if filter_type not in FILTERS and filter_type not in PAGINATION_PARAMETERS:
+            raise AttributeError('{}={} cannot be used to query the replica'.format(filter_type, value))
+
+    def partitioned(self, *args, **kwargs):
+        """
+        Pages are read locally much faster than they can be fetched, the replica is not partitioned
+
+        Returns:
+            ReplicaResult: returns itself
+        """
+        return self
+
+
+def main(argv=None):
+    from opentargets import OpenTargetsClient
+
+    parser = argparse.ArgumentParser(description='Mirror the associations of the REST API in a local SQLite '
+                                                 'database, if the data release changed')
+    parser.add_argument('path', help='path of the SQLite database')
+    parser.add_argument('--host', default='https://api.opentargets.io', help='host serving the API')
+    parser.add_argument('--port', default=443, type=int, help='port to use for connection to the API')
+    parser.add_argument('--api-version', default='v3', help='api version to use')
+    parser.add_argument('--workers', default=1, type=int, help='number of partitions fetched in parallel')
+    parser.add_argument('--partition-by', help='filter splitting the associations in partitions, e.g. direct')
+    parser.add_argument('--partition-values', type=lambda s: s.split(','),
+                        help='comma separated values of --partition-by matching each association exactly once, '
+                             'e.g. true,false')
+    parser.add_argument('--force', action='store_true', help='synchronise even if the data release is the same')
+    args = parser.parse_args(argv)
+
+    replica = AssociationReplica(args.path)
+    client = OpenTargetsClient(host=args.host, port=args.port, api_version=args.api_version)
+    try:
+        stored = replica.sync(client, force=args.force, workers=args.workers, partition_by=args.partition_by,
+                              partition_values=args.partition_values)
+    finally:
+        client.close()
+    if stored is None:
+        print('{} already holds data release {}'.format(args.path, replica.version))
+    else:
+        print('{} associations of data release {} written to {}'.format(stored, replica.version, args.path))
+
+
+if __name__ == '__main__':
+    main()
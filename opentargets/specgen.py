@@ -0,0 +1,112 @@
+"""
+This module generates the endpoint bindings used by ``opentargets.conn.Connection`` from a snapshot of the REST API
+documentation, so that the swagger YAML does not need to be fetched and parsed at runtime.
+
+The bindings are written to ``opentargets/_endpoints.py`` and are only used when the remote data version matches
+the one of the snapshot; otherwise the connection falls back to the live documentation.
+
+Usage::
+
+    python -m opentargets.specgen                                  # snapshot of the live REST API
+    python -m opentargets.specgen --swagger swagger.yaml --remote-version 3.0.1
+"""
+import argparse
+import io
+import os
+import pprint
+
+import yaml
+
+from opentargets.conn import Connection, build_endpoints
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_endpoints.py')
+
+TEMPLATE = '''"""
+Endpoint bindings generated by opentargets.specgen from the REST API documentation. Do not edit.
+"""
+from opentargets.conn import Endpoint, compile_validators
+
+API_VERSION = {api_version!r}
+REMOTE_VERSION = {remote_version!r}
+
+ENDPOINTS = {{
+{endpoints}
+}}
+
+ENDPOINT_VALIDATION_DATA = dict((path, endpoint.parameters) for path, endpoint in ENDPOINTS.items())
+
+VALIDATORS = compile_validators(ENDPOINT_VALIDATION_DATA)
+
+SWAGGER_YAML = {swagger_yaml!r}
+'''
+
+
+def generate_bindings(swagger_yaml, remote_version, api_version='v3'):
+    """
+    Generate the source code of the endpoint bindings module
+
+    Args:
+        swagger_yaml (str): swagger documentation in YAML format
+        remote_version (str): data version of the REST API the documentation was taken from
+        api_version (str): api version the bindings are for
+
+    Returns:
+        str: python source code
+    """
+    endpoints = build_endpoints(yaml.safe_load(swagger_yaml))
+    endpoint_lines = []
+    for path in sorted(endpoints):
+        endpoint = endpoints[path]
+        parameters = pprint.pformat(endpoint.parameters).replace('\n', '\n' + ' ' * 19)
+        endpoint_lines.append('    {!r}: Endpoint(\n'
+                              '        path={!r},\n'
+                              '        methods={!r},\n'
+                              '        parameters={}),'.format(path, endpoint.path, endpoint.methods, parameters))
+    return TEMPLATE.format(api_version=api_version,
+                           remote_version=str(remote_version),
+                           endpoints='\n'.join(endpoint_lines),
+                           swagger_yaml=swagger_yaml)
+
+
+def write_bindings(swagger_yaml, remote_version, api_version='v3', output=DEFAULT_OUTPUT):
+    """
+    Generate the endpoint bindings module and write it to a file
+
+    Args:
+        swagger_yaml (str): swagger documentation in YAML format
+        remote_version (str): data version of the REST API the documentation was taken from
+        api_version (str): api version the bindings are for
+        output (str): path of the module to write
+    """
+    with io.open(output, 'w', encoding='utf-8') as fh:
+        fh.write(generate_bindings(swagger_yaml, remote_version, api_version))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate endpoint bindings from the REST API documentation')
+    parser.add_argument('--host', default='https://api.opentargets.io', help='host serving the API')
+    parser.add_argument('--port', default=443, type=int, help='port to use for connection to the API')
+    parser.add_argument('--api-version', default='v3', help='api version to generate the bindings for')
+    parser.add_argument('--swagger', help='read the documentation from a local YAML file instead of the API')
+    parser.add_argument('--remote-version', help='data version of the local YAML file')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='path of the module to write')
+    args = parser.parse_args(argv)
+
+    if args.swagger:
+        if not args.remote_version:
+            parser.error('--remote-version is required with --swagger')
+        with io.open(args.swagger, encoding='utf-8') as fh:
+            swagger_yaml = fh.read()
+        remote_version = args.remote_version
+    else:
+        conn = Connection(host=args.host, port=args.port, api_version=args.api_version, spec_cache_dir=None)
+        remote_version = conn._get_remote_version()
+        conn._get_remote_api_specs()
+        swagger_yaml = conn.swagger_yaml
+        conn.close()
+    write_bindings(swagger_yaml, remote_version, args.api_version, args.output)
+    print('endpoint bindings for version {} written to {}'.format(remote_version, args.output))
+
+
+if __name__ == '__main__':
+    main()
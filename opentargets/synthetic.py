@@ -0,0 +1,406 @@
+"""
+This module runs a synthetic Open Targets REST API in a background thread, serving generated associations and
+evidence with a configurable number of results, result size and latency. It answers the documentation, version,
+ping, search, association and evidence filter endpoints, with offset and cursor pagination, so that the client can
+be benchmarked and profiled offline.
+
+Usage::
+
+    >>> from opentargets import OpenTargetsClient
+    >>> from opentargets.synthetic import SyntheticServer
+    >>> with SyntheticServer(total=100000, latency=0.05) as server:
+    ...     ot = OpenTargetsClient(host=server.host, port=server.port)
+    ...     ot.filter_associations().to_file('associations.json.gz')
+"""
+import json
+import threading
+import time
+
+from future.moves.http.server import BaseHTTPRequestHandler, HTTPServer
+from future.moves.socketserver import ThreadingMixIn
+from future.moves.urllib.parse import parse_qs, urlparse
+
+SWAGGER = """
+swagger: '2.0'
+paths:
+  /public/search:
+    get:
+      parameters:
+        - {name: q, type: string}
+        - {name: size, type: number}
+        - {name: from, type: number}
+        - {name: filter, type: string}
+  /public/association/filter:
+    get:
+      parameters:
+        - {name: target, type: string}
+        - {name: disease, type: string}
+        - {name: direct, type: boolean}
+        - {name: scorevalue_min, type: number}
+        - {name: scorevalue_max, type: number}
+        - {name: therapeutic_area, type: string}
+        - {name: datasource, type: string}
+        - {name: size, type: number}
+        - {name: from, type: number}
+        - {name: next, type: string}
+    post:
+      parameters:
+        - {name: body, type: string}
+  /public/evidence/filter:
+    get:
+      parameters:
+        - {name: target, type: string}
+        - {name: disease, type: string}
+        - {name: datasource, type: string}
+        - {name: size, type: number}
+        - {name: from, type: number}
+        - {name: next, type: string}
+    post:
+      parameters:
+        - {name: body, type: string}
+  /private/target:
+    post:
+      parameters:
+        - {name: body, type: string}
+  /private/target/{target}:
+    get:
+      parameters:
+        - {name: target, type: string}
+  /private/disease/{disease}:
+    get:
+      parameters:
+        - {name: disease, type: string}
+  /public/utils/version:
+    get: {}
+  /public/utils/ping:
+    get: {}
+"""
+
+DATASOURCES = ('gwas_catalog', 'chembl', 'uniprot', 'europepmc', 'expression_atlas', 'reactome')
+DATATYPES = ('genetic_association', 'known_drug', 'literature', 'rna_expression', 'affected_pathway')
+
+MAX_PAGE_SIZE = 10000
+
+
+class SyntheticData(object):
+    """
+    Deterministic associations and evidence, generated from their position in the result set
+    """
+
+    def __init__(self, total=10000, record_size=None, targets=1000, diseases=500, therapeutic_areas=20):
+        """
+        Args:
+            total (int): number of associations and of evidence
+            record_size (int): approximate size in bytes of the encoded results, padded with a text field.
+                Defaults to the size of the generated fields only, about 1KB
+            targets (int): number of distinct targets
+            diseases (int): number of distinct diseases
+            therapeutic_areas (int): number of distinct therapeutic areas
+        """
+        self.total = total
+        self.targets = targets
+        self.diseases = diseases
+        self.therapeutic_areas = therapeutic_areas
+        self._padding = ''
+        if record_size:
+            base_size = len(json.dumps(self.association(0)))
+            self._padding = 'x' * max(0, record_size - base_size - len(', "description": ""'))
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    def _target(self, i):
+        return 'ENSG%011d' % (i % self.targets)
+
+    def _disease(self, i):
+        return 'EFO_%07d' % ((i // self.targets) % self.diseases)
+
+    def target(self, target_id):
+        """
+        Returns:
+            dict: the target with an ID, None if there is none
+        """
+        if not target_id.startswith('ENSG') or not target_id[4:].isdigit() or int(target_id[4:]) >= self.targets:
+            return None
+        return {'id': target_id, 'approved_symbol': 'GENE{}'.format(int(target_id[4:]))}
+
+    def disease(self, disease_id):
+        """
+        Returns:
+            dict: the disease with an ID, None if there is none
+        """
+        if not disease_id.startswith('EFO_') or not disease_id[4:].isdigit() or int(disease_id[4:]) >= self.diseases:
+            return None
+        return {'id': disease_id, 'label': 'synthetic disease {}'.format(int(disease_id[4:]))}
+
+    def score(self, i):
+        """
+        Scores decrease with the position, like the default sorting of the REST API
+        """
+        return round(1. - float(i) / max(1, self.total), 6)
+
+    def association(self, i):
+        target, disease = self._target(i), self._disease(i)
+        score = self.score(i)
+        area = (i // self.targets) % self.therapeutic_areas
+        association = {
+            'id': '{}-{}'.format(target, disease),
+            'is_direct': i % 3 != 0,
+            'target': {'id': target,
+                       'gene_info': {'symbol': 'GENE{}'.format(i % self.targets),
+                                     'name': 'synthetic gene {}'.format(i % self.targets)}},
+            'disease': {'id': disease,
+                        'efo_info': {'label': 'synthetic disease {}'.format((i // self.targets) % self.diseases),
+                                     'path': [['EFO_0000408', disease]],
+                                     'therapeutic_area': {'codes': ['EFO_%07d' % (9000000 + area)],
+                                                          'labels': ['therapeutic area {}'.format(area)]}}},
+            'association_score': {'overall': score,
+                                  'datatypes': dict((d, round(score / (j + 1), 6))
+                                                    for j, d in enumerate(DATATYPES)),
+                                  'datasources': dict((d, round(score / (j + 2), 6))
+                                                      for j, d in enumerate(DATASOURCES))},
+            'evidence_count': {'total': i % 97 + 1,
+                               'datatypes': dict((d, i % (j + 7)) for j, d in enumerate(DATATYPES))},
+        }
+        if self._padding:
+            association['description'] = self._padding
+        return association
+
+    def evidence(self, i):
+        target, disease = self._target(i), self._disease(i)
+        evidence = {
+            'id': '%032x' % i,
+            'sourceID': DATASOURCES[i % len(DATASOURCES)],
+            'type': DATATYPES[i % len(DATATYPES)],
+            'target': {'id': target, 'gene_info': {'symbol': 'GENE{}'.format(i % self.targets)}},
+            'disease': {'id': disease, 'efo_info': {'label': 'synthetic disease {}'.format(
+                (i // self.targets) % self.diseases)}},
+            'scores': {'association_score': self.score(i)},
+            'evidence': {'literature_ref': {'lit_id': 'http://europepmc.org/abstract/MED/{}'.format(i)},
+                         'date_asserted': '2019-01-01T00:00:00Z'},
+        }
+        if self._padding:
+            evidence['description'] = self._padding
+        return evidence
+
+    def matches(self, filters):
+        """
+        Positions of the results matching the target, disease and datasource filters, in order
+
+        Args:
+            filters (dict): filter name to list of values
+
+        Returns:
+            list: positions, None if nothing is filtered
+        """
+        key = tuple(sorted((k, tuple(v)) for k, v in filters.items()))
+        if not key:
+            return None
+        with self._lock:
+            if key not in self._matches:
+                targets = set(filters.get('target', ()))
+                diseases = set(filters.get('disease', ()))
+                datasources = set(filters.get('datasource', ()))
+                self._matches[key] = [i for i in range(self.total)
+                                      if (not targets or self._target(i) in targets) and
+                                      (not diseases or self._disease(i) in diseases) and
+                                      (not datasources or DATASOURCES[i % len(DATASOURCES)] in datasources)]
+            return self._matches[key]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are sent in separate writes, wait for neither
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._route(url.path, parse_qs(url.query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8') or '{}') if length else {}
+        params = dict((k, v if isinstance(v, list) else [v]) for k, v in body.items())
+        self._route(urlparse(self.path).path, params)
+
+    def _send(self, body, status=200, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, path, params):
+        server = self.server.synthetic
+        server._count_request()
+        if server.latency and not path.endswith('/swagger'):
+            time.sleep(server.latency)
+        if path.endswith('/platform/swagger'):
+            return self._send(SWAGGER, content_type='text/yaml')
+        if path.endswith('/utils/version'):
+            return self._send(json.dumps(server.version))
+        if path.endswith('/utils/ping'):
+            return self._send('pong', content_type='text/plain')
+        if path.endswith('/public/search'):
+            query = (params.get('q') or [''])[0]
+            if 'invalid' in query:
+                return self._send(json.dumps({'error': 'invalid query'}), status=400)
+            return self._send(json.dumps({'total': 1, 'size': 1, 'from': 0,
+                                          'data': [{'id': server.data._target(sum(bytearray(query.encode('utf-8')))),
+                                                    'type': 'search-object-target',
+                                                    'data': {'approved_symbol': query}}]}))
+        if path.endswith('/private/target'):
+            # batched lookup, unknown IDs are left out
+            ids = params.get('id') or []
+            if any('invalid' in i for i in ids):
+                return self._send(json.dumps({'error': 'invalid id'}), status=400)
+            return self._send(json.dumps({'data': [server.data.target(i) for i in ids if server.data.target(i)]}))
+        if '/private/target/' in path or '/private/disease/' in path:
+            object_id = path.rsplit('/', 1)[1]
+            if 'invalid' in object_id:
+                return self._send(json.dumps({'error': 'invalid id'}), status=400)
+            found = server.data.target(object_id) if '/target/' in path else server.data.disease(object_id)
+            if found is None:
+                return self._send(json.dumps({'error': 'not found'}), status=404)
+            return self._send(json.dumps(found))
+        if path.endswith('/filter') and server._should_fail(params):
+            headers = {'Retry-After': str(server.retry_after)} if server.retry_after is not None else None
+            return self._send(json.dumps({'error': 'synthetic failure'}), status=server.fail_status, headers=headers)
+        if path.endswith('/association/filter'):
+            return self._send(server.page(server.data.association, params))
+        if path.endswith('/evidence/filter'):
+            return self._send(server.page(server.data.evidence, params))
+        self._send(json.dumps({'error': 'not found'}), status=404)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class SyntheticServer(object):
+    """
+    Synthetic REST API served from a background thread
+    """
+
+    def __init__(self, total=10000, record_size=None, latency=0., version='3.0.1', host='127.0.0.1', port=0,
+                 fail_status=None, fail_from=0, fail_times=None, retry_after=None, cursor=True, **kwargs):
+        """
+        Args:
+            total (int): number of associations and of evidence
+            record_size (int): approximate size in bytes of the encoded results
+            latency (float): seconds waited before answering each request
+            version (str): data release returned by the version endpoint
+            host (str): address to listen to
+            port (int): port to listen to, 0 for any free port
+            fail_status (int): HTTP status answered to the filter requests for pages starting at or after
+                `fail_from`, e.g. 429 to simulate throttling. None to answer them all. Can be changed while serving
+            fail_from (int): offset of the first page answered with `fail_status`
+            fail_times (int): number of filter requests answered with `fail_status` before answering them
+                normally again, e.g. 1 to test retries. None to keep failing. Can be changed while serving
+            retry_after: value of the `Retry-After` header sent with the `fail_status` answers, None to send none
+            cursor (bool): if True pages carry the `next` cursor of the following page, if False the results can
+                only be paginated by offset
+        Keyword Args:
+            **kwargs: forwarded to SyntheticData
+        """
+        self.data = SyntheticData(total=total, record_size=record_size, **kwargs)
+        self.latency = latency
+        self.version = version
+        self.fail_status = fail_status
+        self.fail_from = fail_from
+        self.fail_times = fail_times
+        self.retry_after = retry_after
+        self.cursor = cursor
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer((host, port), _Handler)
+        self._server.synthetic = self
+        self._thread = None
+
+    @property
+    def host(self):
+        """
+        URL of the host, to use as `host` of ``opentargets.conn.Connection``
+        """
+        return 'http://{}'.format(self._server.server_address[0])
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _should_fail(self, params):
+        """
+        Whether to answer a filter request with `fail_status`, counting down `fail_times`
+        """
+        with self._lock:
+            if not self.fail_status or self._offset(params) < self.fail_from or self.fail_times == 0:
+                return False
+            if self.fail_times is not None:
+                self.fail_times -= 1
+            return True
+
+    @staticmethod
+    def _offset(params):
+        cursor = params.get('next')
+        if cursor:
+            # the cursor is the index of the last result of the previous page
+            return int(cursor[0]) + 1
+        return int((params.get('from') or [0])[0])
+
+    def page(self, build, params):
+        """
+        Encode a page of results
+
+        Args:
+            build (callable): builds the result at a position
+            params (dict): query parameters, as lists of values
+
+        Returns:
+            bytes: the encoded page, with the total, the offset and the cursor of the next page
+        """
+        filters = dict((k, params[k]) for k in ('target', 'disease', 'datasource') if params.get(k))
+        positions = self.data.matches(filters)
+        total = len(positions) if positions is not None else self.data.total
+        size = min(int((params.get('size') or [10])[0]), MAX_PAGE_SIZE)
+        offset = self._offset(params)
+        page = range(offset, min(offset + size, total))
+        data = [build(positions[i] if positions is not None else i) for i in page]
+        body = {'total': total, 'size': len(data), 'from': offset, 'data': data}
+        if data and self.cursor:
+            body['next'] = [str(page[-1])]
+        return json.dumps(body).encode('utf-8')
+
+    def start(self):
+        """
+        Start serving requests in a background thread
+
+        Returns:
+            SyntheticServer: returns itself
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='opentargets-synthetic')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
@@ -0,0 +1,274 @@
+"""
+This module converts flattened results of the Open Targets REST API to Apache Arrow record batches and Parquet
+files a batch at a time, so that exports of any size run in constant memory. Requires pyarrow.
+"""
+import json
+import os
+from collections import OrderedDict
+
+from future.utils import string_types
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+
+def _to_text(value):
+    if value is None or isinstance(value, string_types):
+        return value
+    return json.dumps(value)
+
+
+def _build_array(values, type=None):
+    """
+    Build an array from python values. Values that cannot share a type, e.g. strings and numbers, are stored as
+    JSON text
+    """
+    if type is not None and pyarrow.types.is_string(type):
+        return pyarrow.array([_to_text(v) for v in values], type)
+    try:
+        return pyarrow.array(values, type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError):
+        if type is not None:
+            raise
+        return pyarrow.array([_to_text(v) for v in values], pyarrow.string())
+
+
+def _conform_array(array, type):
+    """
+    Cast an array to a type returned by ``merge_types``, going through python values when Arrow cannot cast it
+    """
+    if array.type == type:
+        return array
+    if pyarrow.types.is_null(array.type):
+        return pyarrow.nulls(len(array), type)
+    if not pyarrow.types.is_string(type):
+        try:
+            return array.cast(type)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError):
+            pass
+    return _build_array(array.to_pylist(), type)
+
+
+def merge_types(a, b):
+    """
+    Find a type able to hold the values of two types. Nulls take the other type, integers are widened to floats,
+    lists and structs merge their children, and any other conflict falls back to strings holding JSON text
+
+    Args:
+        a (pyarrow.DataType): a type
+        b (pyarrow.DataType): another type
+
+    Returns:
+        pyarrow.DataType: the merged type
+    """
+    types = pyarrow.types
+    if a == b:
+        return a
+    if types.is_null(a):
+        return b
+    if types.is_null(b):
+        return a
+    if types.is_integer(a) and types.is_integer(b):
+        return pyarrow.int64()
+    if (types.is_integer(a) or types.is_floating(a)) and (types.is_integer(b) or types.is_floating(b)):
+        return pyarrow.float64()
+    if types.is_list(a) and types.is_list(b):
+        return pyarrow.list_(merge_types(a.value_type, b.value_type))
+    if types.is_struct(a) and types.is_struct(b):
+        fields = OrderedDict((a.field(i).name, a.field(i).type) for i in range(a.num_fields))
+        for i in range(b.num_fields):
+            field = b.field(i)
+            fields[field.name] = merge_types(fields[field.name], field.type) if field.name in fields else field.type
+        return pyarrow.struct(list(fields.items()))
+    return pyarrow.string()
+
+
+def merge_schemas(a, b):
+    """
+    Find a schema able to hold the rows of two schemas, with the fields of both merged by ``merge_types``
+
+    Args:
+        a (pyarrow.Schema): a schema
+        b (pyarrow.Schema): another schema
+
+    Returns:
+        pyarrow.Schema: the merged schema
+    """
+    fields = OrderedDict((field.name, field.type) for field in a)
+    for field in b:
+        fields[field.name] = merge_types(fields[field.name], field.type) if field.name in fields else field.type
+    return pyarrow.schema(list(fields.items()))
+
+
+def conform_table(table, schema):
+    """
+    Cast a table to a schema extending its own, filling the missing columns with nulls
+
+    Args:
+        table (pyarrow.Table): a table
+        schema (pyarrow.Schema): the schema to cast the table to
+
+    Returns:
+        pyarrow.Table: the table with the new schema
+    """
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            columns.append(pyarrow.chunked_array([_conform_array(chunk, field.type) for chunk in column.chunks],
+                                                 field.type))
+        else:
+            columns.append(pyarrow.nulls(table.num_rows, field.type))
+    return pyarrow.Table.from_arrays(columns, schema=schema)
+
+
+class RecordBatchBuilder(object):
+    """
+    Convert lists of flat dictionaries to record batches. The schema is inferred from the values, extended when
+    new fields appear and widened when the values of a field do not fit its type anymore
+    """
+
+    def __init__(self, schema=None):
+        """
+        Args:
+            schema (pyarrow.Schema): initial schema, inferred from the first batch if None
+        Raises:
+            ImportError: if pyarrow is not available
+        """
+        if not pyarrow_available:
+            raise ImportError('pyarrow library is not installed but is required to create Arrow and Parquet data')
+        self.schema = schema if schema is not None else pyarrow.schema([])
+
+    def build(self, rows):
+        """
+        Convert rows to a record batch, updating the schema with the fields and the types found in the rows
+
+        Args:
+            rows (list): flat dictionaries
+
+        Returns:
+            pyarrow.RecordBatch: a batch with the updated schema
+        """
+        names = OrderedDict()
+        for row in rows:
+            for name in row:
+                names[name] = None
+        arrays = dict((name, _build_array([row.get(name) for row in rows])) for name in names)
+        fields = OrderedDict((field.name, field.type) for field in self.schema)
+        for name in names:
+            array_type = arrays[name].type
+            fields[name] = merge_types(fields[name], array_type) if name in fields else array_type
+        self.schema = pyarrow.schema(list(fields.items()))
+        columns = [_conform_array(arrays[name], type) if name in arrays else pyarrow.nulls(len(rows), type)
+                   for name, type in fields.items()]
+        return pyarrow.RecordBatch.from_arrays(columns, schema=self.schema)
+
+
+class ParquetFileWriter(object):
+    """
+    Write record batches to a Parquet file, one row group at a time. When a batch comes with a schema different
+    from the one of the batch before, e.g. extended with new fields, the following batches are written to a new
+    part file. When closed, the parts are merged into the file with a schema merging all of theirs, so that each
+    row group is written at most twice whatever the number of schema changes
+    """
+
+    def __init__(self, path, **kwargs):
+        """
+        Args:
+            path (str): path of the Parquet file
+        Keyword Args:
+            **kwargs: forwarded to pyarrow.parquet.ParquetWriter
+        """
+        self.path = path
+        self.schema = None
+        self._kwargs = kwargs
+        self._writer = None
+        self._part_schema = None
+        self._parts = []
+
+    def write(self, batch):
+        """
+        Write a record batch as a row group
+
+        Args:
+            batch (pyarrow.RecordBatch): the batch to write
+        """
+        if self._writer is not None and not batch.schema.equals(self._part_schema):
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            self.schema = batch.schema if self.schema is None else merge_schemas(self.schema, batch.schema)
+            part = '{}.part{}'.format(self.path, len(self._parts))
+            self._writer = pyarrow.parquet.ParquetWriter(part, batch.schema, **self._kwargs)
+            self._part_schema = batch.schema
+            self._parts.append(part)
+        self._writer.write_table(pyarrow.Table.from_batches([batch]))
+
+    def _merge(self):
+        """
+        Write the row groups of all the parts to the file with the merged schema. The parts are only removed once
+        the file is complete
+        """
+        merged = self.path + '.merging'
+        try:
+            writer = pyarrow.parquet.ParquetWriter(merged, self.schema, **self._kwargs)
+            try:
+                for part in self._parts:
+                    with open(part, 'rb') as fh:
+                        source = pyarrow.parquet.ParquetFile(fh)
+                        for i in range(source.num_row_groups):
+                            writer.write_table(conform_table(source.read_row_group(i), self.schema))
+            finally:
+                writer.close()
+        except Exception:
+            if os.path.exists(merged):
+                os.remove(merged)
+            raise
+        self._replace(merged)
+        for part in self._parts:
+            os.remove(part)
+
+    def _replace(self, source):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(source, self.path)
+
+    def close(self):
+        """
+        Finish the file, merging the parts written with different schemas
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if len(self._parts) == 1:
+            self._replace(self._parts[0])
+        elif self._parts:
+            self._merge()
+        self._parts = []
+
+    def abort(self):
+        """
+        Discard the parts written so far, leaving the file untouched
+        """
+        try:
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            self._writer = None
+            for part in self._parts:
+                if os.path.exists(part):
+                    os.remove(part)
+            self._parts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.close()
+        else:
+            self.abort()
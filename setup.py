@@ -1,6 +1,22 @@
 #!/usr/bin/env python
 
+import sys
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPy(build_py):
+    """
+    Leave out the asyncio based client when building for python 2, which cannot compile it
+    """
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [m for m in modules if m[:2] != ('opentargets', 'aio')]
+        return modules
+
 
 # importing __<vars>__ into the namespace
 with open('opentargets/version.py') as fv:
@@ -13,6 +29,7 @@ setup(name=__pkgname__,
       author_email=__author_email__,
       url=__homepage__,
       packages=['opentargets'],
+      cmdclass={'build_py': BuildPy},
       license=__license__,
       download_url=__homepage__ + '/archive/' + __version__ + '.tar.gz',
       keywords=['opentargets', 'bioinformatics', 'python3'],
@@ -21,14 +38,32 @@ setup(name=__pkgname__,
           'cachecontrol==0.11.6',
           'future==0.16.0',
           'PyYAML',
-          'addict'],
+          'addict',
+          'futures; python_version < "3"'],
       extras_require={
           'tests': [
               'nose',
               'pandas',
               'xlwt',
-              'tqdm'
+              'tqdm',
+              'ijson>=3.1',
+              'pyarrow; python_version >= "3.5"',
+              'zstandard',
+              'lz4',
+              'aiohttp; python_version >= "3.5"'
               ],
+          'async': [
+              'aiohttp; python_version >= "3.5"'],
+          'stream': [
+              'ijson>=3.1'],
+          'parquet': [
+              'pyarrow'],
+          'compression': [
+              'zstandard',
+              'lz4'],
+          'fast': [
+              'orjson; python_version >= "3.6"',
+              'ujson; python_version < "3.6"'],
           'docs': [
               'sphinx >= 1.4',
               'sphinx_rtd_theme']}
@@ -0,0 +1,6 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # asyncio based client and tests, with async syntax that python 2 cannot compile
+    collect_ignore.append('test_aio.py')
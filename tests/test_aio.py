@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import unittest
+
+from opentargets.aio import AsyncOpenTargetsClient, aiohttp_available
+from opentargets.ratelimit import RateLimiter
+from opentargets.synthetic import SyntheticServer
+
+if aiohttp_available:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+@unittest.skipUnless(aiohttp_available, 'requires aiohttp')
+class AsyncOpenTargetClientTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = AsyncOpenTargetsClient()
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def testSearchTargetCorrectResult(self):
+        target_symbol = 'BRAF'
+        response = self.run_async(self.client.search(target_symbol))
+        self.assertGreater(len(response), 0)
+        result = self.run_async(response.__anext__())
+        self.assertEqual(result['type'], 'search-object-target')
+        self.assertEqual(result['id'], 'ENSG00000157764')
+
+    def testGetAssociationsForTargetFetchAllResults(self):
+        target_symbol = 'BRAF'
+        response = self.run_async(self.client.get_associations_for_target(target_symbol))
+        total_results = len(response)
+        self.assertGreater(total_results, 0)
+        results = self.run_async(response.to_list())
+        self.assertEqual(total_results, len(results))
+        self.assertEqual(total_results, len(set(r['id'] for r in results)))
+
+    def testConcurrentQueries(self):
+        targets = ['ENSG00000157764', 'ENSG00000171862', 'ENSG00000136997']
+
+        async def filter_all():
+            return await asyncio.gather(*[self.client.filter_associations(target=t) for t in targets])
+
+        responses = self.run_async(filter_all())
+        for target, response in zip(targets, responses):
+            result = self.run_async(response.__anext__())
+            self.assertEqual(result['target']['id'], target)
+
+    def testFilterAssociations(self):
+        response = self.run_async(self.client.filter_associations(target='ENSG00000157764'))
+        total = len(response)
+        self.run_async(response.filter(direct=True))
+        self.assertLess(len(response), total)
+
+    def testGetTarget(self):
+        response = self.run_async(self.client.get_target('ENSG00000157764'))
+        self.assertEqual(len(response), 1)
+
+    def testPing(self):
+        response = self.run_async(self.client.conn.ping())
+        if isinstance(response, bool):
+            self.assertTrue(response)
+        else:
+            self.assertIsNotNone(response)
+
+
+@unittest.skipUnless(aiohttp_available, 'requires aiohttp')
+class AsyncSyntheticTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = SyntheticServer(total=5000, cursor=False).start()
+        self.client = AsyncOpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                             max_in_flight=3, backoff_factor=.01,
+                                             rate_limit=RateLimiter(backoff=.01, max_backoff=.02))
+
+    def tearDown(self):
+        self.run_async(self._cancel_tasks())
+        self.loop.run_until_complete(self.client.close())
+        self.loop.close()
+        self.server.stop()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    @staticmethod
+    async def _cancel_tasks():
+        # page requests left running by the tests that stop early
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _expected_ids(self, total=5000):
+        return [self.server.data.association(i)['id'] for i in range(total)]
+
+    def testConcurrentPages(self):
+        requests_before = self.server.requests
+        response = self.run_async(self.client.filter_associations())
+        self.assertEqual(len(response), 5000)
+        first_page = len(response._data)
+        for _ in range(first_page + 1):
+            self.run_async(response.__anext__())
+        # the page being consumed was the first requested, the following ones run in the background
+        self.assertEqual(len(response._pending), 3)
+        results = self.run_async(response.to_list())
+        self.assertEqual([r['id'] for r in results], self._expected_ids()[first_page + 1:])
+        self.assertFalse(response._pending)
+        # the first page, then one request for each page of 1000 results left
+        self.assertEqual(self.server.requests - requests_before, 6)
+
+    def testAllResultsOnce(self):
+        response = self.run_async(self.client.filter_associations())
+        self.assertEqual([r['id'] for r in self.run_async(response.to_list())], self._expected_ids())
+
+    def testCursorPages(self):
+        self.server.cursor = True
+        response = self.run_async(self.client.filter_associations())
+        self.assertIsNotNone(response._search_after_last)
+        self.run_async(response.__anext__())
+        self.assertEqual(len(response._pending), 0)
+        results = self.run_async(response.to_list())
+        self.assertEqual([r['id'] for r in results], self._expected_ids()[1:])
+
+    def testCancel(self):
+        response = self.run_async(self.client.filter_associations())
+        for _ in range(len(response._data) + 1):
+            self.run_async(response.__anext__())
+        pending = list(response._pending)
+        response.cancel()
+        self.run_async(asyncio.sleep(0))
+        self.assertFalse(response._pending)
+        self.assertTrue(all(p.cancelled() or p.done() for p in pending))
+
+    def _retried(self, status, retry_after=None):
+        response = self.run_async(self.client.filter_associations())
+        self.server.fail_status, self.server.fail_times, self.server.retry_after = status, 1, retry_after
+        requests_before = self.server.requests
+        results = self.run_async(response.to_list())
+        self.assertEqual([r['id'] for r in results], self._expected_ids())
+        self.assertEqual(self.server.fail_times, 0)
+        # five pages of 1000 results left after the first page, one of them sent twice
+        self.assertEqual(self.server.requests - requests_before, 6)
+        return self.client.conn.stats()['endpoints']['/platform/public/association/filter']
+
+    def testRetriesThrottled(self):
+        stats = self._retried(429)
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(self.client.conn.rate_limiter.stats()['throttled'], 1)
+
+    def testRetriesUnavailable(self):
+        stats = self._retried(503, retry_after=0)
+        self.assertEqual(stats['retries'], 1)
+
+    def testRetriesServerError(self):
+        stats = self._retried(502)
+        self.assertEqual(stats['retries'], 1)
+
+    def testUnavailableWithoutRetryAfter(self):
+        response = self.run_async(self.client.filter_associations())
+        self.server.fail_status, self.server.fail_times = 503, 1
+        with self.assertRaises(aiohttp.ClientResponseError) as context:
+            self.run_async(response.to_list())
+        self.assertEqual(context.exception.status, 503)
+
+    def testGivesUpAfterRetries(self):
+        self.client.conn.max_retries = 2
+        response = self.run_async(self.client.filter_associations())
+        self.server.fail_status = 502
+        response.max_in_flight = 1
+        requests_before = self.server.requests
+        self.assertRaises(aiohttp.ClientResponseError, self.run_async, response.to_list())
+        self.assertEqual(self.server.requests - requests_before, 3)
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient
+from opentargets.synthetic import SyntheticServer
+
+
+class BulkLookupTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=100, targets=300, diseases=50).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                        cache_max_entries=0)
+        # load the REST API documentation before counting requests
+        self.client.conn.api_specs
+
+    def tearDown(self):
+        self.client.close()
+
+    def testGetTargetsBatched(self):
+        ids = ['ENSG%011d' % i for i in range(250)] + ['ENSG00000000001', 'ENSG99999999999']
+        requests_before = self.server.requests
+        targets = list(self.client.get_targets(ids, workers=2))
+        # duplicates are fetched once, in batches of 100 IDs
+        self.assertEqual(self.server.requests - requests_before, 3)
+        self.assertEqual([i for i, _ in targets], ids[:250] + ['ENSG99999999999'])
+        self.assertEqual([t['id'] for _, t in targets[:250]], ids[:250])
+        self.assertIsNone(targets[-1][1])
+
+    def testGetTargetsUnordered(self):
+        ids = ['ENSG%011d' % i for i in range(250)]
+        targets = list(self.client.get_targets(ids, ordered=False, workers=3, batch_size=10))
+        self.assertEqual(sorted(i for i, _ in targets), ids)
+        self.assertTrue(all(i == t['id'] for i, t in targets))
+
+    def testGetDiseasesOneByOne(self):
+        ids = ['EFO_%07d' % i for i in range(40)] + ['EFO_9999999']
+        requests_before = self.server.requests
+        diseases = list(self.client.get_diseases(ids, workers=4))
+        # the disease endpoint does not accept batches
+        self.assertEqual(self.server.requests - requests_before, 41)
+        self.assertEqual([i for i, _ in diseases], ids)
+        self.assertEqual([d['id'] for _, d in diseases[:40]], ids[:40])
+        self.assertIsNone(diseases[-1][1])
+
+    def testErrorPropagates(self):
+        ids = ['ENSG%011d' % i for i in range(250)]
+        self.assertRaises(requests.exceptions.HTTPError, list,
+                          self.client.get_targets(ids[:150] + ['invalid'] + ids[150:], workers=2))
+        self.assertRaises(requests.exceptions.HTTPError, list,
+                          self.client.get_diseases(['EFO_0000001', 'invalid', 'EFO_0000002'], workers=2))
+
+
+class ResolveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = SyntheticServer(total=100).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _client(self, **kwargs):
+        client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                   cache_max_entries=0, **kwargs)
+        self.addCleanup(client.close)
+        client.conn.api_specs
+        return client
+
+    def _search(self, query):
+        return requests.get('{}:{}/v3/platform/public/search'.format(self.server.host, self.server.port),
+                            params={'q': query}).json()['data'][0]['id']
+
+    def testResolveMany(self):
+        client = self._client()
+        symbols = ['GENE{}'.format(i) for i in range(20)]
+        requests_before = self.server.requests
+        resolved = client.resolve_targets(symbols + ['ENSG00000000042', 'GENE3'], workers=4)
+        # one search for each distinct name
+        self.assertEqual(self.server.requests - requests_before, len(symbols))
+        self.assertEqual(list(resolved), symbols + ['ENSG00000000042'])
+        self.assertEqual(list(resolved.values()), [self._search(s) for s in symbols] + ['ENSG00000000042'])
+        # resolved again from the cache
+        requests_before = self.server.requests
+        self.assertEqual(list(client.resolve_targets(symbols, workers=4).items()), list(resolved.items())[:-1])
+        self.assertEqual(self.server.requests, requests_before)
+
+    def testPersistentCacheFollowsDataRelease(self):
+        path = os.path.join(self.directory, 'resolve.sqlite')
+        symbols = ['GENE{}'.format(i) for i in range(20)]
+        client = self._client(resolve_cache=path, version_ttl=0)
+        resolved = client.resolve_targets(symbols, workers=8)
+        self.assertEqual(client.resolve_cache.namespace, '3.0.1')
+        requests_before = self.server.requests
+        self.assertEqual(self._client(resolve_cache=path).resolve_targets(symbols, workers=8), resolved)
+        # the version and the documentation fetched by the new client, no search
+        self.assertEqual(self.server.requests - requests_before, 2)
+        self.server.version = '3.1.0'
+        time.sleep(.01)
+        requests_before = self.server.requests
+        self.assertEqual(client.resolve_targets(symbols, workers=8), resolved)
+        self.assertEqual(client.resolve_cache.namespace, '3.1.0')
+        self.assertGreaterEqual(self.server.requests - requests_before, len(symbols))
+
+    def testErrorPropagates(self):
+        client = self._client()
+        self.assertRaises(requests.exceptions.HTTPError, client.resolve_targets,
+                          ['GENE{}'.format(i) for i in range(10)] + ['invalid'], workers=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
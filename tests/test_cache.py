@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from opentargets.cache import LRUCache, SQLiteCache
+from opentargets.conn import Connection
+from opentargets.synthetic import SyntheticServer
+
+
+class LRUCacheTest(unittest.TestCase):
+    def testEvictsLeastRecentlyUsedByEntries(self):
+        cache = LRUCache(max_entries=2, max_bytes=None)
+        cache.set('a', b'1')
+        cache.set('b', b'2')
+        cache.get('a')
+        cache.set('c', b'3')
+        self.assertEqual(cache.get('a'), b'1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def testEvictsBySize(self):
+        cache = LRUCache(max_entries=None, max_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.set('c', b'12345')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 10)
+        cache.set('d', b'12345678901')
+        self.assertIsNone(cache.get('d'))
+
+    def testExpiresAfterTTL(self):
+        cache = LRUCache(ttl=.01)
+        cache.set('a', b'1')
+        time.sleep(.02)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def testStats(self):
+        cache = LRUCache()
+        cache.set('a', b'123')
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 3)
+
+
+class SQLiteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'cache.sqlite')
+        self.cache = SQLiteCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def testBypassedWithoutNamespace(self):
+        self.cache.set('key', b'value')
+        self.assertIsNone(self.cache.get('key'))
+
+    def testSetGetDelete(self):
+        self.cache.set_namespace('3.0.1')
+        self.cache.set('key', b'value')
+        self.assertEqual(self.cache.get('key'), b'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def testSharedAcrossInstances(self):
+        self.cache.set_namespace('3.0.1')
+        self.cache.set('key', b'value')
+        other_cache = SQLiteCache(self.path)
+        other_cache.set_namespace('3.0.1')
+        self.assertEqual(other_cache.get('key'), b'value')
+        other_cache.close()
+
+    def testNewReleaseInvalidatesEntries(self):
+        self.cache.set_namespace('3.0.1')
+        self.cache.set('key', b'value')
+        self.cache.set_namespace('3.1.0')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set_namespace('3.0.1')
+        self.assertIsNone(self.cache.get('key'))
+
+    def testCloseAllThreads(self):
+        self.cache.set_namespace('3.0.1')
+        threads = [threading.Thread(target=self.cache.get, args=('key',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        connections = [db for db, pid in self.cache._connections]
+        self.assertEqual(len(connections), 4)
+        self.cache.close()
+        self.assertEqual(self.cache._connections, [])
+        for db in connections:
+            self.assertRaises(Exception, db.execute, 'SELECT 1')
+        # the cache can still be used, with new connections
+        self.cache.set('key', b'value')
+        self.assertEqual(self.cache.get('key'), b'value')
+
+
+class ConnectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = SyntheticServer(total=100).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def testNamespaceFollowsDataRelease(self):
+        conn = Connection(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                          cache=os.path.join(self.tmp_dir, 'cache.sqlite'), version_ttl=0)
+        try:
+            conn.get('/platform/public/association/filter')
+            self.assertEqual(conn.cache.namespace, '3.0.1')
+            self.server.version = '3.1.0'
+            time.sleep(.01)
+            conn.get('/platform/public/association/filter')
+            self.assertEqual(conn.remote_version, '3.1.0')
+            self.assertEqual(conn.cache.namespace, '3.1.0')
+        finally:
+            conn.close()
+
+    def testVersionCheckedOnce(self):
+        conn = Connection(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                          cache=os.path.join(self.tmp_dir, 'cache.sqlite'), version_ttl=None)
+        try:
+            conn.get('/platform/public/association/filter')
+            self.server.version = '3.1.0'
+            conn.get('/platform/public/association/filter')
+            self.assertEqual(conn.cache.namespace, '3.0.1')
+        finally:
+            conn.close()
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient
+from opentargets.cassette import Cassette, CassetteAdapter, mount_cassette
+from opentargets.synthetic import SyntheticServer
+
+
+class CassetteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.cassette')
+        self.server = SyntheticServer(total=1500, record_size=1000).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def _client(self, **kwargs):
+        client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def _record(self):
+        client = self._client()
+        adapter = mount_cassette(client.conn, self.path, mode='record')
+        associations = list(client.filter_associations())
+        self.assertEqual(adapter.recorded, self.server.requests)
+        self.server.stop()
+        return associations
+
+    def testReplay(self):
+        associations = self._record()
+        client = self._client()
+        adapter = mount_cassette(client.conn, self.path)
+        self.assertEqual(list(client.filter_associations()), associations)
+        self.assertEqual(adapter.replayed, len(Cassette(self.path)))
+
+    def testReplayStream(self):
+        associations = self._record()
+        client = self._client(stream=True)
+        mount_cassette(client.conn, self.path)
+        self.assertEqual(list(client.filter_associations()), associations)
+
+    def testReplayMiss(self):
+        self._record()
+        client = self._client()
+        mount_cassette(client.conn, self.path)
+        self.assertRaises(requests.exceptions.ConnectionError, client.filter_associations,
+                          target='ENSG00000000001')
+
+    def testAuto(self):
+        client = self._client()
+        adapter = mount_cassette(client.conn, self.path, mode='auto')
+        first = list(client.filter_associations())
+        recorded = adapter.recorded
+        client = self._client()
+        adapter = mount_cassette(client.conn, self.path, mode='auto')
+        self.assertEqual(list(client.filter_associations()), first)
+        self.assertEqual(adapter.recorded, 0)
+        self.assertEqual(adapter.replayed, recorded)
+
+    def testSimulatedNetwork(self):
+        self._record()
+        client = self._client()
+        adapter = mount_cassette(client.conn, self.path, latency=0.05, bandwidth=2 * 1024 * 1024)
+        start = time.time()
+        associations = list(client.filter_associations())
+        size = sum(len(json.dumps(a)) for a in associations)
+        self.assertGreaterEqual(time.time() - start, adapter.replayed * 0.05 + size / (2. * 1024 * 1024))
+
+    def testInvalidMode(self):
+        self.assertRaises(AttributeError, CassetteAdapter, self.path, mode='rewind')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import addict
+
+from opentargets.checkpoint import ExportCheckpoint
+from opentargets.codec import get_codec
+from opentargets.conn import IterableResult
+
+
+class PagedConnection(object):
+    """
+    Serves pages of results from memory like the REST API, failing at the requested page
+    """
+    codec = get_codec('json')
+
+    def __init__(self, total=2500, fail_at=None):
+        self.records = [{'id': 'ENSG%011d' % i, 'score': {'overall': i / 10.}} for i in range(total)]
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def get(self, endpoint, params=None, stream=False, projection=None):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise IOError('connection lost')
+        start = int(params['next'][0]) + 1 if params.get('next') else int(params.get('from', 0))
+        page = self.records[start:start + int(params.get('size', 10))]
+        info = addict.Dict(total=len(self.records), size=len(page))
+        if page:
+            info.next_ = [start + len(page) - 1]
+        return addict.Dict(info=info, data=page)
+
+
+class ExportCheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'associations.json.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self):
+        with gzip.open(self.filename, 'rb') as fh:
+            return [json.loads(line.decode('utf-8')) for line in fh]
+
+    def testResumeAfterFailure(self):
+        conn = PagedConnection(fail_at=3)
+        with self.assertRaises(IOError):
+            IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True,
+                                                                       checkpoint_every=1)
+        self.assertTrue(os.path.isfile(self.filename + '.checkpoint'))
+        IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True)
+        self.assertFalse(os.path.isfile(self.filename + '.checkpoint'))
+        self.assertEqual(self.read(), conn.records)
+
+    def testResumePrefetchedExport(self):
+        conn = PagedConnection()
+        result = IterableResult(conn, prefetch=2)('/public/association/filter')
+        _next_page = result._next_page
+        calls = []
+
+        def next_page():
+            if len(calls) == 2:
+                # the background thread fetches the following pages meanwhile
+                time.sleep(.2)
+                raise IOError('disk full')
+            calls.append(None)
+            return _next_page()
+        result._next_page = next_page
+        with self.assertRaises(IOError):
+            result.to_file(self.filename, checkpoint=True, checkpoint_every=1)
+        self.assertIsNotNone(result._prefetcher)
+        self.assertGreater(result._fetched, 10 + 2 * 1000)
+        # the checkpoint is after the pages written, not after the pages fetched ahead
+        IterableResult(conn, prefetch=2)('/public/association/filter').to_file(self.filename, checkpoint=True)
+        self.assertEqual(self.read(), conn.records)
+
+    def testCheckpointOfAnotherQuery(self):
+        conn = PagedConnection(fail_at=3)
+        with self.assertRaises(IOError):
+            IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True,
+                                                                       checkpoint_every=1)
+        with self.assertRaises(AttributeError):
+            IterableResult(conn)('/public/association/filter', target='ENSG00000157764').to_file(
+                self.filename, checkpoint=True)
+
+    def testMissingOutputStartsOver(self):
+        conn = PagedConnection()
+        checkpoint = ExportCheckpoint(self.filename + '.checkpoint', self.filename)
+        checkpoint.save(IterableResult(conn)('/public/association/filter'), 100)
+        self.assertIsNone(checkpoint.load())
+        IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True)
+        self.assertEqual(self.read(), conn.records)
+
+    def testShortOutputStartsOver(self):
+        conn = PagedConnection(fail_at=3)
+        with self.assertRaises(IOError):
+            IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True,
+                                                                       checkpoint_every=1)
+        checkpoint = ExportCheckpoint(self.filename + '.checkpoint', self.filename)
+        size = checkpoint.load()['size']
+        with open(self.filename, 'r+b') as fh:
+            fh.truncate(size - 1)
+        self.assertIsNone(checkpoint.load())
+        IterableResult(conn)('/public/association/filter').to_file(self.filename, checkpoint=True)
+        self.assertEqual(self.read(), conn.records)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 import os
@@ -46,6 +47,38 @@ class OpenTargetClientTest(unittest.TestCase):
         self.assertEqual(result['type'], 'search-object-disease')
         self.assertEqual(result['id'], 'EFO_0000311')
 
+    def testPrefetchFetchAllResults(self):
+        client = OpenTargetsClient(prefetch=2)
+        response = client.filter_associations(target='ENSG00000157764', size=100)
+        total_results = len(response)
+        self.assertGreater(total_results, 0)
+        ids = [i['id'] for i in response]
+        self.assertEqual(total_results, len(ids))
+        self.assertEqual(total_results, len(set(ids)))
+        client.close()
+
+    def testStreamFetchAllResults(self):
+        client = OpenTargetsClient(stream=True)
+        response = client.filter_associations(target='ENSG00000157764', size=100)
+        total_results = len(response)
+        self.assertGreater(total_results, 0)
+        ids = [i['id'] for i in response]
+        self.assertEqual(total_results, len(ids))
+        self.assertEqual(total_results, len(set(ids)))
+        client.close()
+
+    def testPartitionedFetchAllResults(self):
+        response = self.client.filter_associations(target='ENSG00000157764')
+        ids = [i['id'] for i in response]
+        partitioned = self.client.filter_associations(target='ENSG00000157764').partitioned(workers=2,
+                                                                                             slice_size=100)
+        self.assertEqual(len(partitioned), len(ids))
+        self.assertEqual(ids, [i['id'] for i in partitioned])
+        unordered = self.client.filter_associations(target='ENSG00000157764').partitioned(workers=2,
+                                                                                           slice_size=100,
+                                                                                           ordered=False)
+        self.assertEqual(sorted(ids), sorted(i['id'] for i in unordered))
+
     # #this takes a lot to run
     # def testSearchDiseaseFetchAllResults(self):
     #     disease_label = 'cancer'
@@ -132,6 +165,17 @@ class OpenTargetClientTest(unittest.TestCase):
             if i>100:
                 break
 
+    def testResolveTargets(self):
+        resolved = self.client.resolve_targets(['BRAF', 'ENSG00000171862', 'BRAF'])
+        self.assertEqual(list(resolved.items()), [('BRAF', 'ENSG00000157764'),
+                                                  ('ENSG00000171862', 'ENSG00000171862')])
+        self.assertEqual(self.client.resolve_cache.get('target:BRAF'), b'ENSG00000157764')
+
+    def testResolveDiseases(self):
+        resolved = self.client.resolve_diseases(['EFO_0000270', 'asthma'])
+        self.assertEqual(resolved['EFO_0000270'], 'EFO_0000270')
+        self.assertEqual(resolved['asthma'], 'EFO_0000270')
+
     def testGetSimilarTargets(self):
         target_symbol = 'BRAF'
         response = self.client.get_similar_target(target_symbol)
@@ -180,6 +224,27 @@ class OpenTargetClientTest(unittest.TestCase):
         dataframe = response.to_dataframe()
         self.assertEqual(len(dataframe), items)
 
+    def testResultToCompactPandasDataFrame(self):
+        response = self.client.filter_associations(target='ENSG00000157764')
+        items = len(response)
+        dataframe = response.to_dataframe(columns=['disease.id', 'target.id', 'association_score.overall'],
+                                          categories=['target.id'],
+                                          downcast=True,
+                                          chunk_size=100)
+        self.assertEqual(len(dataframe), items)
+        self.assertEqual(list(dataframe.columns), ['disease.id', 'target.id', 'association_score.overall'])
+        self.assertEqual(str(dataframe['target.id'].dtype), 'category')
+        self.assertEqual(str(dataframe['association_score.overall'].dtype), 'float32')
+
+    def testSelectFields(self):
+        response = self.client.filter_evidence(target='ENSG00000157764',
+                                               fields=['target.id', 'disease.id', 'scores.association_score'],
+                                               size=10)
+        self.assertGreater(len(response), 0)
+        for evidence in response[:10]:
+            self.assertTrue(set(evidence).issubset({'target', 'disease', 'scores'}))
+            self.assertEqual(evidence['target']['id'], 'ENSG00000157764')
+
     def testResultToPandasCSV(self):
         target_symbol = 'BRAF'
         response = self.client.get_associations_for_target(target_symbol,
@@ -209,6 +274,29 @@ class OpenTargetClientTest(unittest.TestCase):
         self.assertTrue(os.path.isfile(filename))
         os.remove(filename)
 
+    def testResultToParquet(self):
+        target_symbol = 'BRAF'
+        response = self.client.get_associations_for_target(target_symbol,
+                                                           fields=['association_score.*',
+                                                                   'target.gene_info.symbol',
+                                                                   'disease.efo_info.*']
+                                                           )
+        items = len(response)
+        self.assertGreater(items, 0)
+        filename = 'braf_associations.parquet'
+        schema = response.to_parquet(filename, row_group_size=100)
+        self.assertIn('target.gene_info.symbol', schema.names)
+        import pyarrow.parquet
+        self.assertEqual(pyarrow.parquet.ParquetFile(filename).metadata.num_rows, items)
+        os.remove(filename)
+
+    def testResultToArrowBatches(self):
+        response = self.client.filter_associations(target='ENSG00000157764')
+        items = len(response)
+        batches = list(response.to_arrow_batches(batch_size=100))
+        self.assertEqual(sum(batch.num_rows for batch in batches), items)
+        self.assertTrue(all(batch.num_rows <= 100 for batch in batches))
+
     def testResultToFile(self):
         target_symbol = 'BRAF'
         response = self.client.get_associations_for_target(target_symbol,
@@ -222,6 +310,15 @@ class OpenTargetClientTest(unittest.TestCase):
         self.assertTrue(os.path.isfile(filename))
         os.remove(filename)
 
+    def testResultToFileParallelCompression(self):
+        response = self.client.get_associations_for_target('BRAF')
+        items = len(response)
+        filename = 'braf_associations.json.gz'
+        response.to_file(filename, compress='gzip', workers=4, block_size=64 * 1024)
+        with gzip.open(filename, 'rb') as fh:
+            self.assertEqual(len(fh.read().splitlines()), items)
+        os.remove(filename)
+
 
     def testSerialiseToObject(self):
         target_symbol = 'BRAF'
@@ -237,6 +334,17 @@ class OpenTargetClientTest(unittest.TestCase):
         response = self.client.get_stats()
         self.assertEquals(len(response), 1)
 
+    def testChunkedFilter(self):
+        targets = ['ENSG00000157764', 'ENSG00000171862', 'ENSG00000136997', 'ENSG00000012048', 'ENSG00000139618']
+        response = self.client.filter_associations(target=targets, scorevalue_min=0.5)
+        client = OpenTargetsClient(filter_chunk_size=2, filter_chunk_workers=2)
+        chunked = client.filter_associations(target=targets, scorevalue_min=0.5)
+        self.assertEqual(len(chunked), len(response))
+        chunked_ids = [a['id'] for a in chunked]
+        self.assertEqual(len(chunked_ids), len(set(chunked_ids)))
+        self.assertEqual(set(chunked_ids), set(a['id'] for a in response))
+        client.close()
+
     def testAutodetectPost(self):
         self.assertFalse(Connection._auto_detect_post({'target': ['ENSG00000157764']}))
         self.assertTrue(Connection._auto_detect_post({'target': ['ENSG00000157764',
@@ -275,6 +383,31 @@ class OpenTargetClientTest(unittest.TestCase):
 
         self.assertLess(i, len(response))
 
+    def testSharedConnectionAcrossThreads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        client = OpenTargetsClient(pool_maxsize=8, pool_block=True)
+        targets = ['ENSG00000157764', 'ENSG00000171862', 'ENSG00000136997', 'ENSG00000012048'] * 4
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda t: client.get_target(t)[0], targets))
+        for target, result in zip(targets, results):
+            self.assertEqual(result['id'], target)
+        client.close()
+
+    def testGetTargets(self):
+        targets = ['ENSG00000157764', 'ENSG00000171862', 'ENSG00000136997', 'ENSG00000157764']
+        results = list(self.client.get_targets(targets))
+        self.assertEqual([target_id for target_id, target in results], targets[:3])
+        for target_id, target in results:
+            self.assertEqual(target['id'], target_id)
+        unordered = dict(self.client.get_targets(targets, ordered=False, batch_size=1))
+        self.assertEqual(set(unordered), set(targets))
+
+    def testGetDiseases(self):
+        diseases = ['EFO_0000270', 'EFO_0000311']
+        results = dict(self.client.get_diseases(diseases))
+        for disease_id in diseases:
+            self.assertEqual(results[disease_id]['id'], disease_id)
+
     def testGetAvailableEndpoints(self):
         endpoints = self.client.conn.get_api_endpoints()
         self.assertTrue('/platform/public/search' in endpoints)
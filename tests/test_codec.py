@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from opentargets.codec import JSONCodec, available_codecs, get_codec
+from opentargets.conn import _encode_iterable_result
+
+
+class JSONCodecTest(unittest.TestCase):
+    document = {'id': 'ENSG00000157764-EFO_0000270',
+                'association_score': {'overall': 0.5, 'datatypes': {'literature': 1}},
+                'target': {'gene_info': {'symbol': u'BRAF', 'name': u'B-Raf – proto-oncogene'}},
+                'is_direct': True,
+                'evidence_count': None,
+                'codes': ['EFO_0000270', 'http://www.ebi.ac.uk/efo/EFO_0000270']}
+
+    def testRoundTrip(self):
+        for name in available_codecs():
+            codec = get_codec(name)
+            self.assertEqual(codec.name, name)
+            self.assertEqual(codec.loads(codec.dumps(self.document)), self.document)
+            self.assertEqual(codec.loads(codec.dumps_bytes(self.document)), self.document)
+            self.assertIsInstance(codec.dumps_bytes(self.document), bytes)
+
+    def testDecodeInvalidRaisesValueError(self):
+        for name in available_codecs():
+            with self.assertRaises(ValueError):
+                get_codec(name).loads(b'pong')
+
+    def testDefaultIsFastestAvailable(self):
+        self.assertEqual(get_codec().name, available_codecs()[0])
+        self.assertEqual(available_codecs()[-1], 'json')
+
+    def testGetCodec(self):
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+        with self.assertRaises(AttributeError):
+            get_codec('yaml')
+
+    def testDefaultFunction(self):
+        with self.assertRaises(TypeError):
+            _encode_iterable_result(object())
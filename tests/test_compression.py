@@ -0,0 +1,70 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from opentargets.compression import BlockWriter, get_compressor, lz4_available, zstandard_available
+
+if zstandard_available:
+    import zstandard
+if lz4_available:
+    import lz4.frame
+
+
+class BlockWriterTest(unittest.TestCase):
+    lines = [('{"id": "ENSG%011d", "score": %d}\n' % (i, i % 100)).encode('utf-8') for i in range(20000)]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, compression, workers=1, mode='wb'):
+        with BlockWriter(self.filename, compression, workers=workers, block_size=16 * 1024, mode=mode) as fh:
+            for i in range(0, len(self.lines), 100):
+                fh.write(b''.join(self.lines[i:i + 100]))
+        return fh
+
+    def testGzipBlocksAreReadAsOneStream(self):
+        for workers in (1, 4):
+            fh = self.write('gzip', workers)
+            with gzip.open(self.filename, 'rb') as compressed:
+                self.assertEqual(compressed.read(), b''.join(self.lines))
+            self.assertEqual(fh.bytes_in, len(b''.join(self.lines)))
+            self.assertEqual(fh.bytes_out, os.path.getsize(self.filename))
+
+    def testAppend(self):
+        self.write('gzip')
+        self.write('gzip', mode='ab')
+        with gzip.open(self.filename, 'rb') as compressed:
+            self.assertEqual(compressed.read(), b''.join(self.lines) * 2)
+
+    def testNoCompression(self):
+        self.write('none', workers=4)
+        with open(self.filename, 'rb') as fh:
+            self.assertEqual(fh.read(), b''.join(self.lines))
+
+    @unittest.skipUnless(zstandard_available, 'zstandard is not installed')
+    def testZstdFrames(self):
+        self.write('zstd', workers=4)
+        with open(self.filename, 'rb') as fh:
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(fh.read()), read_across_frames=True)
+            self.assertEqual(reader.read(), b''.join(self.lines))
+
+    @unittest.skipUnless(lz4_available, 'lz4 is not installed')
+    def testLz4Frames(self):
+        self.write('lz4', workers=4)
+        with lz4.frame.open(self.filename, 'rb') as fh:
+            self.assertEqual(fh.read(), b''.join(self.lines))
+
+    def testUnknownCompression(self):
+        with self.assertRaises(AttributeError):
+            get_compressor('brotli')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient
+from opentargets.conn import flatten, pandas_available
+from opentargets.synthetic import SyntheticServer
+
+if pandas_available:
+    import pandas
+    from opentargets.conn import _concat_column
+
+
+@unittest.skipUnless(pandas_available, 'pandas is not installed')
+class ChunkedDataframeTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=2500, targets=100).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.fail_status = None
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None)
+
+    def tearDown(self):
+        self.client.close()
+
+    def testSameAsWholeDataframe(self):
+        records = list(self.client.filter_associations())
+        expected = pandas.DataFrame([flatten(r) for r in records])
+        dataframe = self.client.filter_associations().to_dataframe(chunk_size=300)
+        self.assertEqual(list(dataframe.columns), list(expected.columns))
+        pandas.testing.assert_frame_equal(dataframe, expected)
+        pandas.testing.assert_frame_equal(self.client.filter_associations().to_dataframe(chunk_size=100000),
+                                          expected)
+
+    def testColumnsAndDtypes(self):
+        columns = ['id', 'target.id', 'association_score.overall']
+        dataframe = self.client.filter_associations().to_dataframe(columns=columns, categories=True,
+                                                                   downcast=True, chunk_size=700)
+        self.assertEqual(list(dataframe.columns), columns)
+        self.assertEqual(len(dataframe), 2500)
+        # target IDs repeat in the first chunk, association IDs do not
+        self.assertEqual(str(dataframe['target.id'].dtype), 'category')
+        self.assertEqual(dataframe['target.id'].nunique(), 100)
+        self.assertNotEqual(str(dataframe['id'].dtype), 'category')
+        self.assertEqual(str(dataframe['association_score.overall'].dtype), 'float32')
+
+    def testEmpty(self):
+        dataframe = self.client.filter_associations(target='ENSG99999999999').to_dataframe(columns=['id'])
+        self.assertEqual(list(dataframe.columns), ['id'])
+        self.assertEqual(len(dataframe), 0)
+
+    def testErrorPropagates(self):
+        result = self.client.filter_associations().partitioned(workers=2)
+        self.server.fail_status, self.server.fail_from = 400, 1000
+        self.assertRaises(requests.exceptions.HTTPError, result.to_dataframe, chunk_size=500)
+
+    def testConcatMissingChunks(self):
+        column = _concat_column([pandas.Series([1., 2.]), 3, pandas.Series([4.])], downcast=False)
+        self.assertEqual(column.isnull().tolist(), [False, False, True, True, True, False])
+        self.assertEqual(column.dtype.kind, 'f')
+        column = _concat_column([2, pandas.Series(['a', 'b'], dtype='category'),
+                                 pandas.Series(['c'], dtype='category')], downcast=False)
+        self.assertEqual(str(column.dtype), 'category')
+        self.assertEqual(column.tolist()[2:], ['a', 'b', 'c'])
+        self.assertEqual(sorted(column.cat.categories), ['a', 'b', 'c'])
+
+    def testConcatChunksWithoutValues(self):
+        column = _concat_column([pandas.Series(['x', 'x'], dtype='category'),
+                                 pandas.Series([None, None]).astype('category')], downcast=False)
+        self.assertEqual(str(column.dtype), 'category')
+        self.assertEqual(column.isnull().tolist(), [False, False, True, True])
+        column = _concat_column([pandas.Series(['x'], dtype='category'), pandas.Series([1, 2], dtype='category')],
+                                downcast=False)
+        self.assertEqual(column.tolist(), ['x', 1, 2])
+        column = _concat_column([pandas.Series([None, None]), pandas.Series([.5])], downcast=True)
+        self.assertEqual(str(column.dtype), 'float32')
+
+    def testChunksWithoutValuesSameDtypes(self):
+        rows = [{'id': str(i), 'label': None if i < 10 else 'l{}'.format(i % 2),
+                 'score': None if i >= 10 else i / 10.} for i in range(20)]
+        dataframes = []
+        for chunk_size in (20, 5):
+            result = self.client.filter_associations()
+            result._iter_flat_batches = lambda size, compress_lists: (rows[i:i + size]
+                                                                      for i in range(0, len(rows), size))
+            dataframes.append(result.to_dataframe(categories=['label'], chunk_size=chunk_size))
+        whole, chunked = dataframes
+        self.assertEqual(list(chunked.dtypes), list(whole.dtypes))
+        self.assertEqual(chunked['score'].dtype.kind, 'f')
+        self.assertEqual(chunked['label'].tolist(), whole['label'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
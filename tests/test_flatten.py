@@ -0,0 +1,59 @@
+import copy
+import unittest
+
+from opentargets.conn import Flattener, flatten, compress_list_values
+
+
+class FlattenerTest(unittest.TestCase):
+    record = {'id': 'ENSG00000157764-EFO_0000270',
+              'target': {'id': 'ENSG00000157764', 'gene_info': {'symbol': 'BRAF'}},
+              'disease': {'id': 'EFO_0000270',
+                          'efo_info': {'label': 'asthma', 'therapeutic_area': {'codes': ['EFO_0000540']}}},
+              'association_score': {'overall': 0.5, 'datatypes': {'literature': 1}},
+              'is_direct': True,
+              'evidence_count': None}
+
+    def variants(self):
+        variants = []
+        for change in (lambda r: None,
+                       lambda r: r['disease'].update(efo_info=None),
+                       lambda r: r.update(target={}),
+                       lambda r: r.update(target=[]),
+                       lambda r: r['target'].update(gene_info={'symbol': 'BRAF', 'name': {'short': 'B-Raf'}}),
+                       lambda r: r['association_score'].update(overall={'value': 0.5}),
+                       lambda r: r.update(extra={'codes': [1, {'a': 2}]})):
+            record = copy.deepcopy(self.record)
+            change(record)
+            variants.append(record)
+        return variants
+
+    def testSameAsFlatten(self):
+        flattener = Flattener()
+        for _ in range(2):
+            for record in self.variants():
+                self.assertEqual(flattener(record), flatten(record))
+
+    def testSameAsCompressListValues(self):
+        flattener = Flattener(compress_lists=True)
+        for _ in range(2):
+            for record in self.variants():
+                self.assertEqual(flattener(record), compress_list_values(flatten(record)))
+
+    def testCompressListValues(self):
+        flat = Flattener(compress_lists=True)(self.record)
+        self.assertEqual(flat['disease.efo_info.therapeutic_area.codes'], 'EFO_0000540')
+        self.assertIs(flat['is_direct'], True)
+        self.assertIsNone(flat['evidence_count'])
+
+    def testKeyOrderFollowsRecord(self):
+        self.assertEqual(list(Flattener()(self.record)), list(flatten(self.record)))
+
+    def testShapesLimit(self):
+        flattener = Flattener(max_shapes=1)
+        for record in self.variants():
+            self.assertEqual(flattener(record), flatten(record))
+        self.assertEqual(sum(len(e) for e in flattener._shapes.values()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
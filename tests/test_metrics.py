@@ -0,0 +1,130 @@
+import unittest
+
+import requests
+
+from opentargets.conn import Connection
+from opentargets.metrics import Histogram, RequestMetrics, to_opentelemetry, to_prometheus
+from opentargets.synthetic import SyntheticServer
+
+
+def _request(endpoint='/platform/public/search', status=200, elapsed=.02, size=2000, **kwargs):
+    request = dict(endpoint=endpoint, status=status, elapsed=elapsed, size=size, retries=0, from_cache=False,
+                   throttled=0, throttle_wait=0.)
+    request.update(kwargs)
+    return request
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def testObserve(self):
+        histogram = Histogram((1, 10))
+        for value in (.5, 2, 3, 50):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['sum'], 55.5)
+        self.assertEqual(list(snapshot['buckets'].values()), [1, 3, 4])
+        self.assertEqual((snapshot['min'], snapshot['max']), (.5, 50))
+
+    def testQuantile(self):
+        histogram = Histogram((1, 2, 3, 4))
+        self.assertIsNone(histogram.quantile(.5))
+        for value in (.5, 1.5, 2.5, 3.5):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(.5), 2)
+        self.assertEqual(histogram.quantile(1), 3.5)
+
+
+class RequestMetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+        self.metrics.record(_request())
+        self.metrics.record(_request(from_cache=True, retries=2))
+        self.metrics.record(_request(status=None, elapsed=1.5, size=None, error=IOError()))
+        self.metrics.record(_request(endpoint='/platform/public/association/filter', status=404, throttled=1,
+                                     throttle_wait=.5))
+
+    def testSnapshot(self):
+        endpoints = self.metrics.snapshot()['endpoints']
+        self.assertEqual(list(endpoints), ['/platform/public/association/filter', '/platform/public/search'])
+        search = endpoints['/platform/public/search']
+        self.assertEqual(search['requests'], 3)
+        self.assertEqual(search['errors'], 1)
+        self.assertEqual(search['statuses'], {200: 2})
+        self.assertEqual(search['retries'], 2)
+        self.assertEqual((search['cache_hits'], search['cache_misses']), (1, 2))
+        self.assertEqual(search['bytes'], 4000)
+        self.assertEqual(search['latency']['count'], 3)
+        self.assertEqual(search['size']['count'], 2)
+        association = endpoints['/platform/public/association/filter']
+        self.assertEqual((association['errors'], association['throttled'], association['throttle_wait']),
+                         (1, 1, .5))
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot()['endpoints'], {})
+
+    def testPrometheus(self):
+        text = to_prometheus(self.metrics.snapshot())
+        self.assertIn('opentargets_client_requests_total{endpoint="/platform/public/search"} 3\n', text)
+        self.assertIn('opentargets_client_responses_total{endpoint="/platform/public/association/filter",'
+                      'status="404"} 1\n', text)
+        self.assertIn('opentargets_client_request_duration_seconds_bucket{endpoint="/platform/public/search",'
+                      'le="+Inf"} 3\n', text)
+        self.assertIn('# TYPE opentargets_client_response_size_bytes histogram\n', text)
+
+    def testOpenTelemetry(self):
+        export = to_opentelemetry(self.metrics.snapshot())
+        metrics = dict((m['name'], m) for m in export['resourceMetrics'][0]['scopeMetrics'][0]['metrics'])
+        points = metrics['opentargets.client.requests']['sum']['dataPoints']
+        self.assertEqual(sorted(p['asInt'] for p in points), ['1', '3'])
+        for point in metrics['opentargets.client.request.duration']['histogram']['dataPoints']:
+            self.assertEqual(len(point['bucketCounts']), len(point['explicitBounds']) + 1)
+            self.assertEqual(sum(int(c) for c in point['bucketCounts']), int(point['count']))
+
+
+class ConnectionMetricsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=500).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.conn = Connection(host=self.server.host, port=self.server.port, spec_cache_dir=None)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def testHooksAndStats(self):
+        calls = []
+        self.conn.add_hook('pre_request', lambda request: request.update(params=[('size', 100)]))
+        self.conn.add_hook('post_request', lambda request: calls.append(request))
+        self.conn.add_hook('post_request', lambda request: 1 / 0)
+        response = self.conn.get('/platform/public/association/filter')
+        self.assertEqual(len(response.data), 100)
+        self.assertRaises(requests.exceptions.HTTPError, self.conn.get, '/platform/public/unknown')
+        self.assertEqual([(c['status'], c['error']) for c in calls], [(200, None), (404, None)])
+        self.assertEqual(calls[0]['size'], len(calls[0]['response'].content))
+        stats = self.conn.stats()
+        association = stats['endpoints']['/platform/public/association/filter']
+        self.assertEqual((association['requests'], association['cache_misses']), (1, 1))
+        self.assertGreater(association['latency']['sum'], 0)
+        self.assertEqual(stats['endpoints']['/platform/public/unknown']['errors'], 1)
+        self.assertIn('rate_limiter', stats)
+        self.assertIn('cache', stats)
+        text = to_prometheus(stats)
+        self.assertIn('# TYPE opentargets_client_rate_limiter_requests_total counter\n', text)
+        self.assertIn('# TYPE opentargets_client_response_cache_misses_total counter\n', text)
+        self.assertIn('# TYPE opentargets_client_response_cache_entries gauge\n', text)
+        families = [line.split()[2] for line in text.splitlines() if line.startswith('# TYPE')]
+        self.assertEqual(len(families), len(set(families)))
+
+    def testUnknownHook(self):
+        self.assertRaises(AttributeError, self.conn.add_hook, 'on_response', len)
+
+
+if __name__ == '__main__':
+    unittest.main()
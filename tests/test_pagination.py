@@ -0,0 +1,192 @@
+import gc
+import time
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient
+from opentargets.synthetic import DATASOURCES, SyntheticServer
+
+
+def _ids(results):
+    return [r['id'] for r in results]
+
+
+class PrefetchTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=10000).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.fail_status = None
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                        cache_max_entries=0, prefetch=2)
+        self.sequential = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                            cache_max_entries=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.sequential.close()
+
+    def testSameResults(self):
+        self.assertEqual(_ids(self.client.filter_associations()), _ids(self.sequential.filter_associations()))
+
+    def testQueueBounded(self):
+        result = self.client.filter_associations()
+        first_page = len(result._data)
+        for _ in range(first_page + 1):
+            next(result)
+        thread, pages, stop = result._prefetcher
+        self.assertEqual(pages.maxsize, 2)
+        time.sleep(.5)
+        # the page being consumed, two queued and one waiting for room in the queue
+        self.assertEqual(result._fetched, first_page + 4 * 1000)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(len(list(result)), 10000 - first_page - 1)
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def testStopsWhenDiscarded(self):
+        result = self.client.filter_associations()
+        for _ in range(len(result._data) + 1):
+            next(result)
+        thread = result._prefetcher[0]
+        del result
+        gc.collect()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def testErrorPropagates(self):
+        result = self.client.filter_associations()
+        self.server.fail_status, self.server.fail_from = 400, 3000
+        self.assertRaises(requests.exceptions.HTTPError, list, result)
+        self.assertIsNone(result._prefetcher)
+
+
+class PartitionedTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=10000).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.fail_status = None
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                        cache_max_entries=0)
+        self.expected = _ids(self.client.filter_associations())
+
+    def tearDown(self):
+        self.client.close()
+
+    def testOrdered(self):
+        result = self.client.filter_associations().partitioned(workers=3, slice_size=1500)
+        self.assertEqual(_ids(result), self.expected)
+        self.assertEqual(result.current, 10000)
+
+    def testUnordered(self):
+        result = self.client.filter_associations().partitioned(workers=3, ordered=False)
+        self.assertEqual(sorted(_ids(result)), sorted(self.expected))
+
+    def testFirstPageReused(self):
+        result = self.client.filter_associations().partitioned(workers=2, slice_size=1000)
+        requests_before = self.server.requests
+        self.assertEqual(_ids(result), self.expected)
+        # the first page is fetched to know the total, the other nine partitions of one page are fetched once
+        self.assertEqual(self.server.requests - requests_before, 9)
+
+    def testPartitionBy(self):
+        values = ('unknown',) + DATASOURCES
+        result = self.client.filter_associations().partitioned(workers=3, partition_by='datasource',
+                                                               partition_values=values)
+        expected = []
+        for datasource in DATASOURCES:
+            expected.extend(_ids(self.client.filter_associations(datasource=datasource)))
+        self.assertEqual(_ids(result), expected)
+
+    def testPartitionByMissingResults(self):
+        result = self.client.filter_associations().partitioned(partition_by='datasource',
+                                                               partition_values=DATASOURCES[1:])
+        self.assertRaises(AttributeError, list, result)
+        self.assertRaises(AttributeError, self.client.filter_associations().partitioned, partition_by='datasource')
+
+    def testErrorPropagates(self):
+        for ordered in (True, False):
+            result = self.client.filter_associations().partitioned(workers=3, ordered=ordered)
+            self.server.fail_status, self.server.fail_from = 400, 6000
+            self.assertRaises(requests.exceptions.HTTPError, list, result)
+            self.server.fail_status = None
+
+    def testPendingPartitionsCancelled(self):
+        result = self.client.filter_associations().partitioned(workers=1, slice_size=3000)
+        for _ in range(10):
+            next(result)
+        result._close_stream()
+        requests_before = self.server.requests
+        time.sleep(.5)
+        # at most the pages of the running partition are fetched, none of the following partitions
+        self.assertLessEqual(self.server.requests - requests_before, 2)
+
+
+class ChunkedFilterTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=3000, targets=100).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.fail_status = None
+        self.client = self._client(self.server, filter_chunk_size=4, filter_chunk_workers=2)
+        self.unchunked = self._client(self.server, filter_chunk_size=None)
+
+    def _client(self, server, **kwargs):
+        client = OpenTargetsClient(host=server.host, port=server.port, spec_cache_dir=None, cache_max_entries=0,
+                                   **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def testChunks(self):
+        targets = ['ENSG%011d' % i for i in range(10)]
+        # a duplicate, and unknown targets making a chunk without results
+        values = targets[:5] + [targets[0]] + targets[5:] + ['ENSG99999999998', 'ENSG99999999999']
+        result = self.client.filter_associations(target=values)
+        self.assertIsNotNone(result._chunked)
+        self.assertEqual(len(result), 300)
+        expected = []
+        for i in range(0, 12, 4):
+            expected.extend(_ids(self.unchunked.filter_associations(target=(targets + values[-2:])[i:i + 4])))
+        self.assertEqual(len(expected), 300)
+        self.assertEqual(_ids(result), expected)
+
+    def testResultsReturnedOnce(self):
+        # association IDs repeat every 20 results when there are 4 targets and 5 diseases
+        server = SyntheticServer(total=200, targets=4, diseases=5).start()
+        self.addCleanup(server.stop)
+        client = self._client(server, filter_chunk_size=2)
+        result = client.filter_associations(target=['ENSG%011d' % i for i in range(4)])
+        # the total of the chunks is an upper bound
+        self.assertEqual(len(result), 200)
+        ids = _ids(result)
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(set(ids), set(_ids(self._client(server).filter_associations())))
+
+    def testErrorPropagates(self):
+        result = self.client.filter_associations(target=['ENSG%011d' % i for i in range(10)])
+        self.server.fail_status, self.server.fail_from = 400, 10
+        self.assertRaises(requests.exceptions.HTTPError, list, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
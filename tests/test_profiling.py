@@ -0,0 +1,108 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from opentargets import OpenTargetsClient
+from opentargets.profiling import ExportProfile, NULL_PROFILE, get_profile
+from opentargets.synthetic import SyntheticServer
+
+
+class ExportProfileTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=2500).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None)
+
+    def tearDown(self):
+        self.client.close()
+        shutil.rmtree(self.directory)
+
+    def testGetProfile(self):
+        profile = ExportProfile()
+        self.assertIs(get_profile(profile), profile)
+        self.assertIs(get_profile(None), NULL_PROFILE)
+        self.assertTrue(get_profile(True).log)
+
+    def testToDataframe(self):
+        profile = ExportProfile()
+        result = self.client.filter_associations()
+        first_page = len(result._data)
+        dataframe = result.to_dataframe(profile=profile, chunk_size=1000)
+        self.assertEqual(len(dataframe), 2500)
+        report = profile.report()
+        self.assertEqual(report['export'], 'to_dataframe')
+        self.assertEqual(list(report['stages']), ['network', 'decode', 'flatten', 'pandas'])
+        # the first page is fetched when the query is made, before the export
+        self.assertEqual(report['stages']['decode']['items'], 2500 - first_page)
+        self.assertEqual(report['stages']['flatten']['items'], 2500)
+        self.assertEqual(report['stages']['network']['runs'], report['stages']['decode']['runs'])
+        self.assertGreater(report['peak_memory'], 0)
+        self.assertGreater(report['wall'], 0)
+        self.assertLessEqual(sum(s['wall'] for s in report['stages'].values()), report['wall'] * 1.01)
+        self.assertEqual(self.client.conn.hooks, {'pre_request': [], 'post_request': []})
+        self.assertIn('flatten', profile.format())
+
+    def testPartitioned(self):
+        profile = ExportProfile(memory=False)
+        result = self.client.filter_associations().partitioned(workers=3, slice_size=1000)
+        first_page = len(result._data)
+        self.assertEqual(len(result.to_dataframe(profile=profile)), 2500)
+        stages = profile.report()['stages']
+        # the requests of the partitions, made by the threads fetching them
+        self.assertEqual(stages['decode']['items'], 2500 - first_page)
+        self.assertEqual(stages['network']['runs'], stages['decode']['runs'])
+
+    def testOtherRequestsNotCounted(self):
+        stop = threading.Event()
+
+        def request():
+            while not stop.is_set():
+                self.client.filter_associations(size=10)
+        thread = threading.Thread(target=request)
+        thread.start()
+        try:
+            profile = ExportProfile(memory=False)
+            self.client.filter_associations().to_dataframe(profile=profile)
+            stages = profile.report()['stages']
+            self.assertEqual(stages['network']['runs'], stages['decode']['runs'])
+            # a request of the same thread, not made by an export
+            profile.start('to_dataframe', self.client.conn)
+            self.client.filter_associations(size=10)
+            profile.stop()
+            self.assertEqual(profile.report()['stages']['network']['runs'], stages['network']['runs'])
+        finally:
+            stop.set()
+            thread.join()
+
+    def testToCsv(self):
+        profile = ExportProfile(memory=False)
+        self.client.filter_associations().to_csv(path_or_buf=os.path.join(self.directory, 'a.csv'),
+                                                 profile=profile)
+        report = profile.report()
+        self.assertEqual(report['export'], 'to_csv')
+        self.assertEqual(list(report['stages']), ['network', 'decode', 'flatten', 'pandas', 'write'])
+        self.assertIsNone(report['peak_memory'])
+
+    def testToFile(self):
+        path = os.path.join(self.directory, 'a.json.gz')
+        with self.assertLogs('opentargets.profiling', level='WARNING') as logs:
+            self.client.filter_associations().to_file(path, profile=True)
+        self.assertIn('profile of to_file', logs.output[0])
+        self.assertIn('compress', logs.output[0])
+        with gzip.open(path) as fh:
+            self.assertEqual(len(fh.readlines()), 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
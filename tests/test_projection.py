@@ -0,0 +1,79 @@
+import io
+import json
+import unittest
+
+import requests
+from urllib3 import HTTPResponse
+
+from opentargets.conn import Response, StreamingResponse, ijson_available
+from opentargets.projection import LIST_ITEM, Projection
+
+
+def make_response(body):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.raw = HTTPResponse(body=io.BytesIO(json.dumps(body).encode('utf-8')), preload_content=False)
+    return response
+
+
+class ProjectionTest(unittest.TestCase):
+    record = {'id': 'ENSG00000157764-EFO_0000270',
+              'target': {'id': 'ENSG00000157764', 'gene_info': {'symbol': 'BRAF', 'name': 'B-Raf'}},
+              'disease': {'id': 'EFO_0000270',
+                          'efo_info': {'label': 'asthma', 'therapeutic_area': {'codes': ['EFO_0000540']}}},
+              'sources': [{'id': 'gwas', 'score': 1}, {'id': 'chembl', 'score': 0.5}],
+              'association_score': {'overall': 0.5, 'datatypes': {'literature': 1}}}
+    fields = ['target.gene_info.symbol', 'association_score.*', 'sources.id', 'disease.efo_info.therapeutic_area']
+    expected = {'target': {'gene_info': {'symbol': 'BRAF'}},
+                'disease': {'efo_info': {'therapeutic_area': {'codes': ['EFO_0000540']}}},
+                'sources': [{'id': 'gwas'}, {'id': 'chembl'}],
+                'association_score': {'overall': 0.5, 'datatypes': {'literature': 1}}}
+
+    def testProject(self):
+        self.assertEqual(Projection(self.fields)(self.record), self.expected)
+
+    def testFieldsAsString(self):
+        self.assertEqual(Projection(','.join(self.fields))(self.record), self.expected)
+
+    def testNestedFieldOfSelectedObject(self):
+        projection = Projection(['target', 'target.id'])
+        self.assertEqual(projection(self.record), {'target': self.record['target']})
+
+    def testWholeResult(self):
+        for fields in ('*', ['target.id', '*']):
+            projection = Projection(fields)
+            self.assertEqual(projection(self.record), self.record)
+            self.assertTrue(projection.accepts(['disease', 'efo_info']))
+
+    def testKeyNamedItem(self):
+        record = {'item': {'id': 'a', 'name': 'b'}, 'items': [{'id': 'c', 'name': 'd'}]}
+        projection = Projection(['item.id', 'items.name'])
+        self.assertEqual(projection(record), {'item': {'id': 'a'}, 'items': [{'name': 'd'}]})
+        self.assertTrue(projection.accepts(['items', LIST_ITEM, 'name']))
+        self.assertFalse(projection.accepts(['items', 'item', 'name']))
+        self.assertFalse(projection.accepts(['item', 'name']))
+
+    @unittest.skipUnless(ijson_available, 'ijson is not installed')
+    def testStreamingKeyNamedItem(self):
+        record = {'item': {'id': 'a', 'item': {'id': 'b', 'name': 'c'}}, 'items': [{'item': 'd', 'id': 'e'}]}
+        body = {'data': [record]}
+        projection = Projection(['item.item.name', 'items.id'])
+        response = StreamingResponse(make_response(body), projection=projection)
+        self.assertEqual(list(response.records()), [{'item': {'item': {'name': 'c'}}, 'items': [{'id': 'e'}]}])
+
+    def testResponse(self):
+        body = {'total': 2, 'data': [self.record, self.record]}
+        response = Response(make_response(body), projection=Projection(self.fields))
+        self.assertEqual(response.data, [self.expected, self.expected])
+        self.assertEqual(response.info.total, 2)
+
+    @unittest.skipUnless(ijson_available, 'ijson is not installed')
+    def testStreamingResponse(self):
+        body = {'total': 2, 'data': [self.record, self.record], 'next': ['a']}
+        response = StreamingResponse(make_response(body), projection=Projection(self.fields))
+        self.assertEqual(list(response.records()), [self.expected, self.expected])
+        self.assertEqual(response.info.next_, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
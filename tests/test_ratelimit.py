@@ -0,0 +1,113 @@
+import time
+import unittest
+
+import requests
+
+from opentargets.conn import Connection
+from opentargets.ratelimit import RateLimiter
+from opentargets.synthetic import SyntheticServer
+
+
+class RateLimiterTest(unittest.TestCase):
+    def testUnlimitedByDefault(self):
+        limiter = RateLimiter()
+        for i in range(100):
+            self.assertEqual(limiter.reserve(), 0)
+
+    def testSpacesRequests(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertAlmostEqual(limiter.reserve(), .1, places=2)
+        self.assertAlmostEqual(limiter.reserve(), .2, places=2)
+        self.assertEqual(limiter.stats()['waits'], 2)
+
+    def testReleaseGivesTokenBack(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.reserve()
+        limiter.release()
+        self.assertEqual(limiter.reserve(), 0)
+
+    def testCappedByUsageHeaders(self):
+        limiter = RateLimiter(safety=1.)
+        limiter.update(200, {'X-Usage-Limit-10s': '50', 'X-Usage-Remaining-10s': '40'})
+        self.assertEqual(limiter.rate, 5)
+        limiter.update(200, {'X-Usage-Limit-10s': '50', 'X-Usage-Remaining-10s': '39'})
+        self.assertEqual(limiter.rate, 5)
+
+    def testBlockedWhenNoUsageLeft(self):
+        limiter = RateLimiter()
+        limiter.update(200, {'X-Usage-Limit-1m': '60', 'X-Usage-Remaining-1m': '0'})
+        self.assertGreater(limiter.reserve(), 59)
+
+    def testSlowsDownOnThrottling(self):
+        limiter = RateLimiter(rate=20)
+        limiter.update(429, {'Retry-After': '1'})
+        self.assertEqual(limiter.rate, 10)
+        self.assertGreater(limiter.reserve(), .9)
+        # responses to requests sent before the first 429 do not slow down further
+        limiter.update(429, {'Retry-After': '1'})
+        self.assertEqual(limiter.rate, 10)
+        self.assertEqual(limiter.stats()['throttled'], 2)
+
+    def testSpeedsUpAfterSuccess(self):
+        limiter = RateLimiter(rate=10, increase=.1)
+        limiter.update(429, {'Retry-After': '0'})
+        time.sleep(.01)
+        limiter.update(200, {})
+        self.assertAlmostEqual(limiter.rate, 5.5)
+        limiter.update(200, {})
+        self.assertLessEqual(limiter.rate, 10)
+
+
+class ThrottledConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SyntheticServer(total=100, fail_status=429).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _connection(self, **kwargs):
+        conn = Connection(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                          rate_limit=RateLimiter(backoff=.01, max_backoff=.02), **kwargs)
+        self.addCleanup(conn.close)
+        conn.get('/platform/public/utils/version')
+        return conn
+
+    def testGivesUpAfterRetries(self):
+        conn = self._connection(max_throttle_retries=3)
+        requests_before = self.server.requests
+        with self.assertRaises(requests.exceptions.HTTPError) as context:
+            conn.get('/platform/public/association/filter')
+        self.assertEqual(context.exception.response.status_code, 429)
+        self.assertEqual(self.server.requests - requests_before, 4)
+        self.assertEqual(conn.stats()['endpoints']['/platform/public/association/filter']['throttled'], 3)
+
+    def testGivesUpAfterWaiting(self):
+        conn = self._connection(max_throttle_retries=None, max_throttle_wait=.1)
+        start = time.time()
+        self.assertRaises(requests.exceptions.HTTPError, conn.get, '/platform/public/association/filter')
+        self.assertLess(time.time() - start, 5)
+        self.assertGreaterEqual(conn.rate_limiter.stats()['wait_time'], .1)
+
+    def testThrottledNotRetriedByUrllib3(self):
+        self.server.retry_after = 0
+        conn = self._connection(max_throttle_retries=2)
+        requests_before = self.server.requests
+        self.assertRaises(requests.exceptions.HTTPError, conn.get, '/platform/public/association/filter')
+        # only the rate limiter sends 429 requests again, even with a Retry-After header
+        self.assertEqual(self.server.requests - requests_before, 3)
+
+    def testRetriesUnavailableWithRetryAfter(self):
+        conn = self._connection()
+        self.server.fail_status, self.server.fail_times, self.server.retry_after = 503, 1, 0
+        requests_before = self.server.requests
+        self.assertEqual(len(conn.get('/platform/public/association/filter').data), 10)
+        self.assertEqual(self.server.requests - requests_before, 2)
+        self.assertEqual(conn.rate_limiter.stats()['throttled'], 0)
+
+    def testUnavailableWithoutRetryAfter(self):
+        conn = self._connection()
+        self.server.fail_status = 503
+        requests_before = self.server.requests
+        self.assertRaises(requests.exceptions.HTTPError, conn.get, '/platform/public/association/filter')
+        self.assertEqual(self.server.requests - requests_before, 1)
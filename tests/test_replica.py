@@ -0,0 +1,212 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import addict
+
+from opentargets import OpenTargetsClient
+from opentargets.codec import get_codec
+from opentargets.conn import IterableResult
+from opentargets.replica import AssociationReplica, ReplicaResult
+from opentargets.synthetic import DATASOURCES, SyntheticServer
+
+
+class AssociationsConnection(object):
+    """
+    Serves pages of associations from memory like the REST API
+    """
+    codec = get_codec('json')
+
+    def __init__(self, version='19.02', total=1500, scoreless=0):
+        self.version = version
+        self.associations = []
+        for i in range(total):
+            self.associations.append({
+                'id': 'ENSG%011d-EFO_%07d' % (i % 50, i // 50),
+                'target': {'id': 'ENSG%011d' % (i % 50)},
+                'disease': {'id': 'EFO_%07d' % (i // 50),
+                            'efo_info': {'therapeutic_area': {'codes': ['EFO_%07d' % (i % 3)]}}},
+                'is_direct': i % 2 == 0,
+                'association_score': {'overall': (i % 100) / 100.}})
+        self.associations.sort(key=lambda a: -a['association_score']['overall'])
+        for i in range(scoreless):
+            self.associations.append({'id': 'ENSG%011d-EFO_9%06d' % (i, i),
+                                       'target': {'id': 'ENSG%011d' % i},
+                                       'disease': {'id': 'EFO_9%06d' % i},
+                                       'is_direct': True,
+                                       'association_score': {}})
+
+    def _get_remote_version(self):
+        return self.version
+
+    def get(self, endpoint, params=None, stream=False, projection=None):
+        start = int(params.get('from', 0))
+        page = self.associations[start:start + int(params.get('size', 10))]
+        return addict.Dict(info=addict.Dict(total=len(self.associations), size=len(page)), data=page)
+
+
+class Client(object):
+    _filter_associations_endpoint = '/platform/public/association/filter'
+
+    def __init__(self, **kwargs):
+        self.conn = AssociationsConnection(**kwargs)
+
+
+class AssociationReplicaTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.client = Client()
+        cls.replica = AssociationReplica(os.path.join(cls.directory, 'associations.db'))
+        cls.stored = cls.replica.sync(cls.client)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.replica.close()
+        shutil.rmtree(cls.directory)
+
+    def query(self, **params):
+        return list(ReplicaResult(self.replica, self.client.conn)(self.client._filter_associations_endpoint,
+                                                                  **params))
+
+    def expected(self, match):
+        return [a['id'] for a in self.client.conn.associations if match(a)]
+
+    def testSync(self):
+        self.assertEqual(self.stored, 1500)
+        self.assertEqual(self.replica.version, '19.02')
+        self.assertTrue(self.replica.is_current('19.02'))
+        self.assertIsNone(self.replica.sync(self.client))
+
+    def testFilters(self):
+        results = self.query(target=['ENSG00000000001', 'ENSG00000000002'], direct=True, scorevalue_min=0.5)
+        self.assertEqual(sorted(a['id'] for a in results),
+                         sorted(self.expected(lambda a: a['target']['id'] in ('ENSG00000000001', 'ENSG00000000002')
+                                              and a['is_direct'] and a['association_score']['overall'] >= 0.5)))
+        results = self.query(therapeutic_area='EFO_0000001', disease='EFO_0000003')
+        self.assertEqual(sorted(a['id'] for a in results),
+                         sorted(self.expected(lambda a: a['disease']['id'] == 'EFO_0000003' and
+                                              'EFO_0000001' in a['disease']['efo_info']['therapeutic_area']['codes'])))
+
+    def testPaginationSortedByScore(self):
+        results = self.query(size=7)
+        self.assertEqual(len(results), 1500)
+        self.assertEqual(len(set(a['id'] for a in results)), 1500)
+        scores = [a['association_score']['overall'] for a in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def testFields(self):
+        results = self.query(target='ENSG00000000001', fields=['target.id'])
+        self.assertEqual(results[0], {'target': {'id': 'ENSG00000000001'}})
+
+    def testPaginationWithoutScores(self):
+        client = Client(total=20, scoreless=5)
+        replica = AssociationReplica(os.path.join(self.directory, 'scoreless.db'))
+        self.addCleanup(replica.close)
+        replica.sync(client)
+        expected = [a['id'] for a in client.conn.associations]
+        by_cursor = list(ReplicaResult(replica, client.conn)(client._filter_associations_endpoint, size=3))
+        self.assertEqual([a['id'] for a in by_cursor], expected)
+        by_offset = []
+        for offset in range(0, 25, 3):
+            by_offset.extend(a['id'] for a in replica.query(size=3, **{'from': offset}).data)
+        self.assertEqual(by_offset, expected)
+        # a cursor past the first scoreless association
+        page = replica.query(size=10, next=replica.query(size=21).info.next_)
+        self.assertEqual([a['id'] for a in page.data], expected[21:])
+
+    def testCloseAllThreads(self):
+        replica = AssociationReplica(os.path.join(self.directory, 'associations.db'))
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(replica._get_connection()))
+        thread.start()
+        thread.join()
+        connections.append(replica._get_connection())
+        replica.close()
+        for db in connections:
+            self.assertRaises(sqlite3.ProgrammingError, db.execute, 'SELECT 1')
+        self.assertFalse(replica._connections)
+
+    def testUnsupportedFilter(self):
+        self.assertFalse(self.replica.supports({'datasource': 'gwas'}))
+        with self.assertRaises(AttributeError):
+            self.replica.query(datasource='gwas')
+
+
+class ReplicaSyncTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=3500).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.version = '3.0.1'
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'associations.db')
+        self.offsets = []
+        self.client = self._client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _client(self, **kwargs):
+        client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                   cache_max_entries=0, **kwargs)
+        client.conn.add_hook('pre_request', self._record_offset)
+        self.addCleanup(client.close)
+        return client
+
+    def _record_offset(self, request):
+        self.offsets.append(dict(request['params'] or {}).get('from', 0))
+
+    def _ids(self, replica):
+        return sorted(a['id'] for a in ReplicaResult(replica, self.client.conn)(
+            self.client._filter_associations_endpoint, size=1000))
+
+    def testSyncByCursor(self):
+        replica = AssociationReplica(self.path)
+        self.addCleanup(replica.close)
+        self.assertEqual(replica.sync(self.client), 3500)
+        # pages follow each other by cursor, never with a deep offset
+        self.assertEqual(len(self.offsets), 4)
+        self.assertEqual(set(self.offsets), set([0]))
+        self.assertEqual(self._ids(replica), sorted(r['id'] for r in self.client.filter_associations(size=1000)))
+
+    def testSyncPartitioned(self):
+        replica = AssociationReplica(self.path)
+        self.addCleanup(replica.close)
+        self.assertEqual(replica.sync(self.client, workers=3, partition_by='datasource',
+                                      partition_values=DATASOURCES), 3500)
+        self.assertEqual(set(self.offsets), set([0]))
+        self.assertEqual(self._ids(replica), sorted(r['id'] for r in self.client.filter_associations(size=1000)))
+
+    def testSyncRequiresPartitions(self):
+        replica = AssociationReplica(self.path)
+        self.assertRaises(AttributeError, replica.sync, self.client, workers=2)
+        self.assertRaises(AttributeError, replica.sync, self.client, workers=2, partition_by='datasource',
+                          partition_values=DATASOURCES[1:])
+        self.assertIsNone(replica.version)
+
+    def testReplicaCheckedAgain(self):
+        AssociationReplica(self.path).sync(self.client)
+        client = self._client(replica=self.path, version_ttl=0)
+        self.addCleanup(client.replica.close)
+        self.assertIsInstance(client.filter_associations(target='ENSG00000000001'), ReplicaResult)
+        self.server.version = '3.1.0'
+        self.assertNotIsInstance(client.filter_associations(target='ENSG00000000001'), ReplicaResult)
+        self.assertIsInstance(client.filter_associations(target='ENSG00000000001'), IterableResult)
+        # synchronised by another process meanwhile
+        AssociationReplica(self.path).sync(self._client())
+        self.assertIsInstance(client.filter_associations(target='ENSG00000000001'), ReplicaResult)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from opentargets.conn import compile_validators
+from opentargets.specgen import generate_bindings
+
+SWAGGER_YAML = '''
+swagger: '2.0'
+paths:
+  /public/association/filter:
+    get:
+      parameters:
+        - name: target
+          type: string
+        - name: direct
+          type: boolean
+        - name: scorevalue_min
+          type: number
+    post:
+      parameters:
+        - name: body
+          in: body
+  /private/target/{target}:
+    get:
+      parameters:
+        - name: target
+          type: string
+'''
+
+
+class SpecGenTest(unittest.TestCase):
+    def setUp(self):
+        self.bindings = {}
+        exec(compile(generate_bindings(SWAGGER_YAML, '3.0.1'), '_endpoints.py', 'exec'), self.bindings)
+
+    def testVersions(self):
+        self.assertEqual(self.bindings['API_VERSION'], 'v3')
+        self.assertEqual(self.bindings['REMOTE_VERSION'], '3.0.1')
+        self.assertEqual(self.bindings['SWAGGER_YAML'], SWAGGER_YAML)
+
+    def testEndpoints(self):
+        endpoints = self.bindings['ENDPOINTS']
+        for path in ('/public/association/filter', '/platform/public/association/filter',
+                     '/private/target', '/platform/private/target'):
+            self.assertIn(path, endpoints)
+        endpoint = endpoints['/platform/public/association/filter']
+        self.assertEqual(endpoint.methods, ('get', 'post'))
+        self.assertEqual(endpoint.parameters['get'], {'target': 'string',
+                                                      'direct': 'boolean',
+                                                      'scorevalue_min': 'number'})
+
+    def testValidators(self):
+        validators = self.bindings['VALIDATORS']['/platform/public/association/filter']['get']
+        self.assertTrue(isinstance('ENSG00000157764', validators['target']))
+        self.assertTrue(isinstance(True, validators['direct']))
+        self.assertTrue(isinstance(0.2, validators['scorevalue_min']))
+        self.assertFalse(isinstance('0.2', validators['scorevalue_min']))
+
+    def testUnknownTypesAreNotValid(self):
+        validators = compile_validators({'/endpoint': {'get': {'param': 'array'}}})
+        self.assertFalse(isinstance([], validators['/endpoint']['get']['param']))
@@ -0,0 +1,44 @@
+import io
+import json
+import unittest
+
+import requests
+from urllib3 import HTTPResponse
+
+from opentargets.conn import StreamingResponse, ijson_available
+
+
+def make_response(body):
+    response = requests.models.Response()
+    response.status_code = 200
+    response.raw = HTTPResponse(body=io.BytesIO(json.dumps(body).encode('utf-8')), preload_content=False)
+    return response
+
+
+@unittest.skipUnless(ijson_available, 'ijson is not installed')
+class StreamingResponseTest(unittest.TestCase):
+    def testDecodesRecordsIncrementally(self):
+        body = {'total': 3, 'data': [{'id': 'a', 'score': 0.5}, {'id': 'b'}, {'id': 'c'}], 'next': ['c'], 'from': 0}
+        response = StreamingResponse(make_response(body))
+        self.assertEqual(response.get_info('total'), 3)
+        records = response.records()
+        self.assertEqual(next(records), {'id': 'a', 'score': 0.5})
+        self.assertNotIn('next_', response.info)
+        self.assertEqual([r['id'] for r in records], ['b', 'c'])
+        self.assertEqual(response.info.next_, ['c'])
+        self.assertEqual(response.info.from_, 0)
+
+    def testMetadataAfterData(self):
+        body = {'data': [{'id': 'a'}, {'id': 'b'}], 'total': 2}
+        response = StreamingResponse(make_response(body))
+        self.assertEqual(response.get_info('total'), 2)
+        self.assertEqual(len(list(response.records())), 2)
+
+    def testSingleObject(self):
+        response = StreamingResponse(make_response({'id': 'ENSG00000157764', 'approved_symbol': 'BRAF'}))
+        self.assertIsNone(response.get_info('total'))
+        self.assertEqual(list(response.records()), [{'id': 'ENSG00000157764', 'approved_symbol': 'BRAF'}])
+
+    def testNotAnObject(self):
+        response = StreamingResponse(make_response('3.0.1'))
+        self.assertEqual(list(response.records()), ['3.0.1'])
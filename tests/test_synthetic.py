@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient, benchmark
+from opentargets.benchmark import compare, format_report, main, percentile, run_benchmarks, tracemalloc_available
+from opentargets.synthetic import SyntheticServer
+
+
+class SyntheticServerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = SyntheticServer(total=2500, record_size=1500).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def _url(self, path):
+        return '{}:{}/v3/platform{}'.format(self.server.host, self.server.port, path)
+
+    def testOffsetAndCursorPagination(self):
+        first = requests.get(self._url('/public/association/filter'), params={'size': 1000}).json()
+        self.assertEqual(first['total'], 2500)
+        self.assertEqual(len(first['data']), 1000)
+        by_offset = requests.get(self._url('/public/association/filter'),
+                                 params={'size': 1000, 'from': 1000}).json()
+        by_cursor = requests.get(self._url('/public/association/filter'),
+                                 params={'size': 1000, 'next': first['next'][0]}).json()
+        self.assertEqual(by_offset['data'], by_cursor['data'])
+        scores = [a['association_score']['overall'] for a in first['data'] + by_cursor['data']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def testRecordSize(self):
+        association = requests.get(self._url('/public/association/filter'), params={'size': 1}).json()['data'][0]
+        self.assertAlmostEqual(len(json.dumps(association)), 1500, delta=10)
+
+    def testClient(self):
+        client = OpenTargetsClient(host=self.server.host, port=self.server.port, cache_max_entries=0)
+        try:
+            associations = list(client.filter_associations())
+            self.assertEqual(len(associations), 2500)
+            self.assertEqual(len(set(a['id'] for a in associations)), 2500)
+            target = associations[0]['target']['id']
+            filtered = client.filter_associations(target=target)
+            self.assertEqual(len(filtered), 3)
+            self.assertTrue(all(a['target']['id'] == target for a in filtered))
+            self.assertEqual(len(list(client.filter_evidence(datasource='chembl'))), len(range(1, 2500, 6)))
+            self.assertEqual(client.conn._get_remote_version(), self.server.version)
+        finally:
+            client.close()
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testPercentile(self):
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile([1, 2], 50), 1.5)
+        self.assertIsNone(percentile([], 99))
+
+    def testRunBenchmarks(self):
+        report = run_benchmarks(names=['paginate', 'flattener'], records=300, repeat=2)
+        self.assertEqual(list(report['results']), ['paginate', 'flattener'])
+        paginate = report['results']['paginate']
+        self.assertEqual(paginate['records'], 300)
+        self.assertGreater(paginate['records_per_second'], 0)
+        self.assertGreater(paginate['requests'], 0)
+        self.assertIsNotNone(paginate['request_seconds']['p99'])
+        if tracemalloc_available:
+            self.assertGreater(paginate['peak_memory'], 0)
+        self.assertEqual(compare(report, report), [])
+        self.assertRaises(AttributeError, run_benchmarks, names=['unknown'])
+
+    def testWithoutTracemalloc(self):
+        available = benchmark.tracemalloc_available
+        benchmark.tracemalloc_available = False
+        try:
+            report = run_benchmarks(names=['flattener'], records=100, repeat=1)
+        finally:
+            benchmark.tracemalloc_available = available
+        self.assertIsNone(report['results']['flattener']['peak_memory'])
+        self.assertIn('flattener', format_report(report))
+        self.assertEqual(compare(report, report), [])
+
+    def testCompare(self):
+        baseline = {'meta': {'records': 10}, 'results': {'decode': {'records_per_second': 1000.,
+                                                                    'peak_memory': 1000}}}
+        slower = {'meta': {'records': 10}, 'results': {'decode': {'records_per_second': 800.,
+                                                                  'peak_memory': 1050}}}
+        self.assertEqual(compare(baseline, slower, threshold=0.1),
+                         [('decode', 'records_per_second', 1000., 800., -0.2)])
+        self.assertEqual(compare(baseline, slower, threshold=0.3), [])
+
+    def testMain(self):
+        path = os.path.join(self.directory, 'baseline.json')
+        self.assertEqual(main(['decode', '--records', '200', '--repeat', '1', '--save', path]), 0)
+        with open(path) as fh:
+            baseline = json.load(fh)
+        # a baseline far faster than possible makes the current run a regression
+        baseline['results']['decode']['records_per_second'] *= 1000
+        with open(path, 'w') as fh:
+            json.dump(baseline, fh)
+        self.assertEqual(main(['decode', '--records', '200', '--repeat', '1', '--compare', path]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
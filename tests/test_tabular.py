@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from opentargets import OpenTargetsClient, tabular
+from opentargets.synthetic import SyntheticServer
+from opentargets.tabular import pyarrow_available
+
+if pyarrow_available:
+    import pyarrow
+    import pyarrow.parquet
+    from opentargets.tabular import RecordBatchBuilder, ParquetFileWriter, merge_types
+
+
+@unittest.skipUnless(pyarrow_available, 'pyarrow is not installed')
+class RecordBatchBuilderTest(unittest.TestCase):
+    def testMergeTypes(self):
+        self.assertEqual(merge_types(pyarrow.null(), pyarrow.string()), pyarrow.string())
+        self.assertEqual(merge_types(pyarrow.int64(), pyarrow.float64()), pyarrow.float64())
+        self.assertEqual(merge_types(pyarrow.int64(), pyarrow.string()), pyarrow.string())
+        self.assertEqual(merge_types(pyarrow.list_(pyarrow.null()), pyarrow.list_(pyarrow.int64())),
+                         pyarrow.list_(pyarrow.int64()))
+        self.assertEqual(merge_types(pyarrow.struct([('a', pyarrow.int64())]),
+                                     pyarrow.struct([('b', pyarrow.bool_())])),
+                         pyarrow.struct([('a', pyarrow.int64()), ('b', pyarrow.bool_())]))
+
+    def testSchemaEvolves(self):
+        builder = RecordBatchBuilder()
+        first = builder.build([{'id': 'a', 'score': 1}, {'id': 'b', 'codes': None}])
+        self.assertEqual(first.schema.names, ['id', 'score', 'codes'])
+        second = builder.build([{'id': 'c', 'score': 0.5, 'codes': ['x'], 'label': 'l'}])
+        self.assertEqual(second.schema.names, ['id', 'score', 'codes', 'label'])
+        self.assertEqual(second.schema.field('score').type, pyarrow.float64())
+        self.assertEqual(second.schema.field('codes').type, pyarrow.list_(pyarrow.string()))
+
+    def testMixedValuesStoredAsText(self):
+        batch = RecordBatchBuilder().build([{'v': 'a'}, {'v': 1}, {'v': [1]}])
+        self.assertEqual(batch.column(0).to_pylist(), ['a', '1', '[1]'])
+
+
+@unittest.skipUnless(pyarrow_available, 'pyarrow is not installed')
+class ParquetFileWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'test.parquet')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testRewritesWhenSchemaEvolves(self):
+        builder = RecordBatchBuilder()
+        with ParquetFileWriter(self.path) as writer:
+            writer.write(builder.build([{'id': 'a', 'score': 1}]))
+            writer.write(builder.build([{'id': 'b', 'score': 0.5, 'label': 'l'}]))
+        parquet_file = pyarrow.parquet.ParquetFile(self.path)
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        self.assertEqual(parquet_file.read().to_pylist(), [{'id': 'a', 'score': 1.0, 'label': None},
+                                                           {'id': 'b', 'score': 0.5, 'label': 'l'}])
+        self.assertEqual(os.listdir(self.dir), ['test.parquet'])
+
+    def testSingleSchema(self):
+        builder = RecordBatchBuilder()
+        with ParquetFileWriter(self.path) as writer:
+            for i in range(3):
+                writer.write(builder.build([{'id': str(i), 'score': i}]))
+            self.assertEqual(len(writer._parts), 1)
+        self.assertEqual(pyarrow.parquet.ParquetFile(self.path).num_row_groups, 3)
+        self.assertEqual(os.listdir(self.dir), ['test.parquet'])
+
+    def testSchemaChangesWriteParts(self):
+        builder = RecordBatchBuilder()
+        rows = [{'id': 'a'}, {'id': 'b', 'x': 1}, {'id': 'c', 'x': 1}, {'id': 'd', 'y': 'l'}, {'id': 'e', 'x': .5}]
+        with ParquetFileWriter(self.path) as writer:
+            for row in rows:
+                writer.write(builder.build([row]))
+            # earlier row groups are left untouched until the end
+            self.assertEqual(len(writer._parts), 4)
+        table = pyarrow.parquet.ParquetFile(self.path).read()
+        self.assertEqual(table.schema, writer.schema)
+        self.assertEqual(table.to_pylist(), [{'id': 'a', 'x': None, 'y': None},
+                                             {'id': 'b', 'x': 1.0, 'y': None},
+                                             {'id': 'c', 'x': 1.0, 'y': None},
+                                             {'id': 'd', 'x': None, 'y': 'l'},
+                                             {'id': 'e', 'x': .5, 'y': None}])
+        self.assertEqual(os.listdir(self.dir), ['test.parquet'])
+
+    def testPartsKeptWhenMergeFails(self):
+        builder = RecordBatchBuilder()
+        writer = ParquetFileWriter(self.path)
+        writer.write(builder.build([{'id': 'a'}]))
+        writer.write(builder.build([{'id': 'b', 'x': 1}]))
+        conform_table = tabular.conform_table
+
+        def fail(table, schema):
+            raise IOError('disk full')
+        tabular.conform_table = fail
+        try:
+            self.assertRaises(IOError, writer.close)
+        finally:
+            tabular.conform_table = conform_table
+        self.assertEqual(sorted(os.listdir(self.dir)), ['test.parquet.part0', 'test.parquet.part1'])
+        self.assertEqual(pyarrow.parquet.ParquetFile(self.path + '.part0').read().to_pylist(), [{'id': 'a'}])
+
+    def testNothingWrittenOnError(self):
+        builder = RecordBatchBuilder()
+        with self.assertRaises(ValueError):
+            with ParquetFileWriter(self.path) as writer:
+                writer.write(builder.build([{'id': 'a'}]))
+                writer.write(builder.build([{'id': 'b', 'x': 1}]))
+                raise ValueError('export failed')
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+@unittest.skipUnless(pyarrow_available, 'pyarrow is not installed')
+class ParquetExportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'associations.parquet')
+        self.server = SyntheticServer(total=3000).start()
+        self.client = OpenTargetsClient(host=self.server.host, port=self.server.port, spec_cache_dir=None,
+                                        cache_max_entries=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def testFailedExportLeavesNoFile(self):
+        self.server.fail_status, self.server.fail_from = 400, 2000
+        response = self.client.filter_associations()
+        self.assertRaises(requests.exceptions.HTTPError, response.to_parquet, self.path, row_group_size=500)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(os.listdir(self.dir), [])